@@ -29,11 +29,14 @@ Long description of module's purpose
         'data/medical_consultation_sequence.xml',
         'data/medical_therapy_sequence.xml',
         'data/medical_xray_sequence.xml',
+        'data/medical_cron.xml',
         'data/icd10_infectious_diseases_data.xml',
         'reports/medical_certificate_reports.xml',
         'reports/private_medical_certificate_template.xml',
         'reports/iess_medical_certificate_template.xml',
         'views/medical_consultation_views.xml',
+        'views/medical_certificate_batch_views.xml',
+        'views/medical_consultation_report_views.xml',
         'views/medical_history_views.xml',
         'views/medical_icd10_group_views.xml',
         'views/medical_affected_apparatus_views.xml',
@@ -45,7 +48,11 @@ Long description of module's purpose
         'views/medical_therapy_menus.xml',
         'views/medical_xray_area_views.xml',
         'views/medical_xray_order_views.xml',
+        'views/medical_xray_dicom_views.xml',
+        'views/medical_xray_archive_views.xml',
         'views/medical_xray_menus.xml',
+        'views/medical_revenue_report_views.xml',
+        'views/medical_vitals_series_views.xml',
         'views/res_partner_views.xml',
         'views/res_config_settings_views.xml',
     ],
@@ -55,5 +62,10 @@ Long description of module's purpose
         'demo/therapy_demo.xml',
         'demo/xray_demo.xml',
     ],
+    'assets': {
+        'web.assets_backend': [
+            'odoo_medical/static/src/**/*',
+        ],
+    },
 }
 
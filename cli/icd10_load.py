@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import optparse
+import sys
+from pathlib import Path
+
+import odoo
+from odoo import api, SUPERUSER_ID
+from odoo.cli import Command
+from odoo.modules.registry import Registry
+
+_logger = logging.getLogger(__name__)
+
+
+class Icd10Load(Command):
+    """Stream a CSV/TSV ICD-10 catalogue into the medical module of a database"""
+    name = 'icd10_load'
+
+    def run(self, args):
+        parser = odoo.tools.config.parser
+        parser.prog = f'{Path(sys.argv[0]).name} {self.name}'
+        group = optparse.OptionGroup(parser, "ICD-10 Load", "Load the ICD-10 catalogue file into the database specified by the `-d` argument.")
+        group.add_option("--file", dest="icd10_file", help="CSV or TSV catalogue file (kind, code, parent, name, description)")
+        group.add_option("--catalogue-lang", dest="icd10_lang", default="es_EC", help="Language of the names in the file (default: es_EC)")
+        group.add_option("--delimiter", dest="icd10_delimiter", help="Column delimiter, detected from the header when omitted")
+        parser.add_option_group(group)
+        opt = odoo.tools.config.parse_config(args, setup_logging=True)
+
+        dbname = odoo.tools.config['db_name']
+        if not dbname:
+            _logger.error('ICD-10 load command needs a database name. Use "-d" argument')
+            sys.exit(1)
+        if not opt.icd10_file:
+            _logger.error('ICD-10 load command needs a catalogue file. Use "--file" argument')
+            sys.exit(1)
+
+        registry = Registry(dbname)
+        with registry.cursor() as cr, open(opt.icd10_file, newline='', encoding='utf-8') as fileobj:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            result = env['medical.icd10.loader'].load_catalogue(
+                fileobj, lang=opt.icd10_lang, delimiter=opt.icd10_delimiter)
+        _logger.info("Loaded %(groups)s ICD-10 groups and %(codes)s codes", result)
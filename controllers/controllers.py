@@ -1,22 +1,82 @@
 # -*- coding: utf-8 -*-
-# from odoo import http
+from odoo import http
+from odoo.exceptions import UserError
+from odoo.http import request
 
 
-# class Odoo-medical(http.Controller):
-#     @http.route('/odoo-medical/odoo-medical', auth='public')
-#     def index(self, **kw):
-#         return "Hello, world"
+class MedicalController(http.Controller):
 
-#     @http.route('/odoo-medical/odoo-medical/objects', auth='public')
-#     def list(self, **kw):
-#         return http.request.render('odoo-medical.listing', {
-#             'root': '/odoo-medical/odoo-medical',
-#             'objects': http.request.env['odoo-medical.odoo-medical'].search([]),
-#         })
+    @http.route('/odoo_medical/patient/<int:partner_id>/timeline', type='json', auth='user')
+    def patient_timeline(self, partner_id, limit=20, cursor=None, **kw):
+        """Return one page of the patient clinical timeline, see
+        ``res.partner.get_clinical_timeline``"""
+        partner = request.env['res.partner'].browse(partner_id).exists()
+        if not partner:
+            raise request.not_found()
+        partner.check_access('read')
+        return partner.get_clinical_timeline(limit=max(1, min(int(limit), 100)), cursor=cursor)
 
-#     @http.route('/odoo-medical/odoo-medical/objects/<model("odoo-medical.odoo-medical"):obj>', auth='public')
-#     def object(self, obj, **kw):
-#         return http.request.render('odoo-medical.object', {
-#             'object': obj
-#         })
+    @http.route('/odoo_medical/clinical_search', type='json', auth='user')
+    def clinical_search(self, term, limit=20, **kw):
+        """Return the best matches of ``term`` in the clinical narrative, see
+        ``medical.fulltext.mixin.search_clinical_text``"""
+        return request.env['medical.fulltext.mixin'].search_clinical_text(term, limit=min(int(limit), 100))
 
+    @http.route('/odoo_medical/patient/<int:partner_id>/vitals', type='json', auth='user')
+    def patient_vitals(self, partner_id, date_from=None, date_to=None, **kw):
+        """Return the vital signs of the patient as arrays, see
+        ``res.partner.get_vitals_series``"""
+        partner = request.env['res.partner'].browse(partner_id).exists()
+        if not partner:
+            raise request.not_found()
+        partner.check_access('read')
+        return partner.get_vitals_series(date_from=date_from, date_to=date_to)
+
+    @http.route('/odoo_medical/xray_line/<int:line_id>/upload', type='json', auth='user')
+    def xray_upload_start(self, line_id, filename, size, checksum, mimetype=None, **kw):
+        """Start or resume the chunked upload of an X-ray image, see
+        ``medical.xray.upload``
+
+        :param size: size of the file in bytes
+        :param checksum: SHA-1 of the file, in hexadecimal
+        :return: the ``token`` of the upload and the ``offset`` of the next chunk
+        """
+        line = request.env['medical.xray.order.line'].browse(line_id).exists()
+        if not line:
+            raise request.not_found()
+        upload = request.env['medical.xray.upload']._start(line, filename, int(size), checksum, mimetype)
+        return upload._status()
+
+    # The upload token, only handed out by the JSON route above, protects
+    # the chunks against cross-site requests
+    @http.route('/odoo_medical/xray_upload/<string:token>', type='http', auth='user', methods=['GET', 'PUT'], csrf=False)
+    def xray_upload_chunk(self, token, offset=0, **kw):
+        """Stream the request body to the upload at ``offset`` (PUT), or
+        return the status of the upload to resume it (GET)"""
+        upload = request.env['medical.xray.upload'].search([
+            ('token', '=', token),
+            ('create_uid', '=', request.env.uid),
+        ], limit=1)
+        if not upload:
+            raise request.not_found()
+        if request.httprequest.method == 'PUT':
+            try:
+                upload._write_chunk(int(offset), request.httprequest.stream)
+            except UserError as e:
+                return request.make_json_response(dict(upload._status(), error=str(e)), status=409)
+        return request.make_json_response(upload._status())
+
+    @http.route('/odoo_medical/xray_preview/<int:image_id>/<string:level>', type='http', auth='user')
+    def xray_preview(self, image_id, level, **kw):
+        """Redirect to the preview of an X-ray image at ``level``, or to the
+        image itself while its previews are not generated yet"""
+        preview = request.env['medical.xray.preview'].search([
+            ('source_id', '=', image_id),
+            ('level', '=', level),
+            ('attachment_id', '!=', False),
+        ], limit=1)
+        attachment = preview.attachment_id or request.env['ir.attachment'].browse(image_id).exists()
+        if not attachment:
+            raise request.not_found()
+        attachment.check_access('read')
+        return request.redirect('/web/content/%s' % attachment.id)
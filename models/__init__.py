@@ -1,7 +1,18 @@
 # -*- coding: utf-8 -*-
 
+from . import ir_sequence
+from . import medical_settings
+from . import medical_invoice_mixin
+from . import medical_count_mixin
+from . import medical_fulltext_mixin
+from . import medical_tracking_mixin
 from . import medical_history
+from . import medical_icd10_loader
 from . import medical_consultation
+from . import medical_consultation_report
+from . import medical_vitals_series
+from . import medical_certificate_batch
+from . import ir_actions_report
 from . import res_partner
 from . import res_config_settings
 from . import medical_affected_apparatus
@@ -11,8 +22,14 @@ from . import medical_treatment
 from . import medical_session_record
 from . import medical_therapy
 from . import medical_xray_area
+from . import medical_xray_price
 from . import medical_xray_order_line
 from . import medical_xray_order
+from . import medical_xray_upload
+from . import medical_xray_preview
+from . import medical_xray_dicom
+from . import medical_xray_archive
+from . import ir_attachment
+from . import ir_binary
 from . import res_users
-
-
+from . import medical_revenue_report
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from markupsafe import Markup
+
+from odoo import models
+
+from .medical_consultation import CERTIFICATE_REPORTS
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_html(self, report_ref, docids, data=None):
+        """Serve medical certificates from their cached rendering when the
+        consultation did not change since it was last printed"""
+        report = self._get_report(report_ref)
+        if (report.report_name not in CERTIFICATE_REPORTS.values() or not docids or len(docids) != 1
+                or any(key != 'context' for key in data or {})):
+            return super()._render_qweb_html(report_ref, docids, data=data)
+
+        consultation = self.env['medical.consultation'].browse(docids)
+        cached = consultation._get_cached_certificate(report.report_name)
+        if cached is not None:
+            return Markup(cached), 'html'
+        content, report_format = super()._render_qweb_html(report_ref, docids, data=data)
+        consultation._cache_certificate(report.report_name, content, report_format)
+        return content, report_format
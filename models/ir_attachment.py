@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import hashlib
+import os
+import shutil
+import zipfile
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+# Size of the blocks read to compute the checksum of a file
+FILE_BUFFER_SIZE = 1024 * 1024
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    medical_archive_id = fields.Many2one(
+        'medical.xray.archive',
+        string='Cold Storage Bundle',
+        readonly=True,
+        index='btree_not_null',
+        ondelete='restrict',
+    )
+    medical_archive_missing = fields.Boolean(
+        string='Missing From Filestore',
+        readonly=True,
+        help='The file was missing from the filestore when the X-ray images were archived',
+    )
+
+    @api.model
+    def _medical_create_from_file(self, path, values, checksum=None):
+        """Create an attachment with ``values`` holding the file at ``path``,
+        without reading the file in memory on the default file storage.
+
+        The file is linked, or copied, into the filestore and removed once the
+        transaction is committed, so a rollback leaves it in place.
+
+        :param checksum: SHA-1 of the file, computed when omitted
+        """
+        self.env.cr.postcommit.add(lambda: os.path.exists(path) and os.unlink(path))
+        if self._storage() != 'file':
+            with open(path, 'rb') as source:
+                return self.create(dict(values, raw=source.read()))
+
+        if not checksum:
+            sha = hashlib.sha1()
+            with open(path, 'rb') as source:
+                for block in iter(lambda: source.read(FILE_BUFFER_SIZE), b''):
+                    sha.update(block)
+            checksum = sha.hexdigest()
+        # Same layout as ir.attachment._get_path. The file is identified by its
+        # checksum, so a file already in the filestore has the same content.
+        fname = '%s/%s' % (checksum[:2], checksum)
+        full_path = self._full_path(fname)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(path, full_path)
+            except OSError:
+                shutil.copyfile(path, full_path)
+        self._mark_for_gc(fname)
+        attachment = self.create(dict(values, type='binary'))
+        self.env.cr.execute(SQL(
+            "UPDATE ir_attachment SET store_fname = %s, file_size = %s, checksum = %s WHERE id = %s",
+            fname, os.path.getsize(path), checksum, attachment.id,
+        ))
+        attachment.invalidate_recordset(['store_fname', 'file_size', 'checksum', 'raw', 'datas'])
+        return attachment
+
+    def _medical_archive(self, fname):
+        """Return the cold storage bundle holding the file ``fname`` when it
+        was archived and is no longer in the filestore"""
+        if os.path.exists(self._full_path(fname)):
+            return self.env['medical.xray.archive']
+        archived = self.sudo().search([('store_fname', '=', fname), ('medical_archive_id', '!=', False)], limit=1)
+        return archived.medical_archive_id
+
+    def _medical_restore(self, fname):
+        """Bring the file ``fname`` back from cold storage when it was
+        archived and is no longer in the filestore"""
+        bundle = self._medical_archive(fname)
+        if bundle:
+            bundle._restore(fname, self._full_path(fname))
+
+    @contextlib.contextmanager
+    def _medical_open(self, fname):
+        """Open the file ``fname`` for reading. An archived file is read
+        from its cold storage bundle, without restoring it."""
+        bundle = self._medical_archive(fname)
+        if bundle:
+            with zipfile.ZipFile(bundle.path) as archive, archive.open(fname) as stream:
+                yield stream
+        else:
+            with open(self._full_path(fname), 'rb') as stream:
+                yield stream
+
+    def unlink(self):
+        # The database cascade removes the previews of the deleted images
+        # without MedicalXrayPreview.unlink, so their own files are removed here
+        previews = self.env['medical.xray.preview'].sudo().search([('source_id', 'in', self.ids)])
+        derived = previews.attachment_id - self
+        res = super().unlink()
+        derived.unlink()
+        return res
+
+    def _file_read(self, fname):
+        self._medical_restore(fname)
+        return super()._file_read(fname)
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+
+class IrBinary(models.AbstractModel):
+    _inherit = 'ir.binary'
+
+    def _record_to_stream(self, record, field_name):
+        """Restore archived X-ray images before streaming them from the filestore"""
+        if record._name == 'ir.attachment' and record.store_fname:
+            record._medical_restore(record.store_fname)
+        return super()._record_to_stream(record, field_name)
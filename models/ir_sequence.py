@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+def _reserve_nextval(cr, seq_name, count):
+    """Draw ``count`` values from the PostgreSQL sequence ``seq_name`` in one statement"""
+    cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)", (seq_name, count))
+    return sorted(row[0] for row in cr.fetchall())
+
+
+def _reserve_nogap(record, number_increment, count):
+    """Reserve ``count`` consecutive numbers on a no-gap sequence (or date range) row"""
+    record.flush_recordset(['number_next'])
+    record._cr.execute(
+        "SELECT number_next FROM %s WHERE id=%%s FOR UPDATE NOWAIT" % record._table, [record.id])
+    number_next = record._cr.fetchone()[0]
+    record._cr.execute(
+        "UPDATE %s SET number_next=number_next+%%s WHERE id=%%s " % record._table,
+        (number_increment * count, record.id))
+    record.invalidate_recordset(['number_next'])
+    return [number_next + number_increment * i for i in range(count)]
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def next_batch_by_code(self, sequence_code, count, sequence_date=None):
+        """Reserve ``count`` numbers of the sequence ``sequence_code`` at once.
+
+        Batched equivalent of :meth:`next_by_code`: the numbers are drawn with
+        a constant number of statements whatever ``count`` is, which keeps
+        bulk imports from taking the sequence lock once per record.
+
+        :return: list of ``count`` formatted references, or of ``False`` when
+                 no sequence matches ``sequence_code``
+        """
+        if count <= 0:
+            return []
+        self.check_access('read')
+        company_id = self.env.company.id
+        seq_ids = self.search([('code', '=', sequence_code), ('company_id', 'in', [company_id, False])], order='company_id')
+        if not seq_ids:
+            _logger.debug("No ir.sequence has been found for code '%s'. Please make sure a sequence is set for current company." % sequence_code)
+            return [False] * count
+        return seq_ids[0]._next_batch(count, sequence_date=sequence_date)
+
+    def _next_batch(self, count, sequence_date=None):
+        self.ensure_one()
+        if not self.use_date_range:
+            return [self.get_next_char(number) for number in self._reserve_numbers(count)]
+        dt = sequence_date or self._context.get('ir_sequence_date', fields.Date.today())
+        seq_date = self.env['ir.sequence.date_range'].search(
+            [('sequence_id', '=', self.id), ('date_from', '<=', dt), ('date_to', '>=', dt)], limit=1)
+        if not seq_date:
+            seq_date = self._create_date_range_seq(dt)
+        return seq_date.with_context(ir_sequence_date_range=seq_date.date_from)._next_batch(count)
+
+    def _reserve_numbers(self, count):
+        if self.implementation == 'standard':
+            return _reserve_nextval(self._cr, 'ir_sequence_%03d' % self.id, count)
+        return _reserve_nogap(self, self.number_increment, count)
+
+
+class IrSequenceDateRange(models.Model):
+    _inherit = 'ir.sequence.date_range'
+
+    def _next_batch(self, count):
+        sequence = self.sequence_id
+        if sequence.implementation == 'standard':
+            numbers = _reserve_nextval(self._cr, 'ir_sequence_%03d_%03d' % (sequence.id, self.id), count)
+        else:
+            numbers = _reserve_nogap(self, sequence.number_increment, count)
+        return [sequence.get_next_char(number) for number in numbers]
@@ -6,8 +6,13 @@ from odoo import models, fields, api
 class MedicalAffectedApparatus(models.Model):
     _name = 'medical.affected.apparatus'
     _description = 'Medical Affected Apparatus'
+    _inherit = ['medical.count.mixin']
     _order = 'name'
 
+    _related_count_fields = {
+        'therapy_count': 'therapy_ids',
+    }
+
     name = fields.Char(
         string='Apparatus Name',
         required=True,
@@ -29,15 +34,10 @@ class MedicalAffectedApparatus(models.Model):
     
     therapy_count = fields.Integer(
         string='Therapy Count',
-        compute='_compute_therapy_count',
+        compute='_compute_related_counts',
         help='Number of therapies using this apparatus'
     )
     
-    @api.depends('therapy_ids')
-    def _compute_therapy_count(self):
-        for record in self:
-            record.therapy_count = len(record.therapy_ids)
-    
     therapy_ids = fields.One2many(
         comodel_name='medical.therapy',
         inverse_name='affected_apparatus_id',
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+# Directory of the ZIP files being written, inside the filestore of the database
+BATCH_DIRECTORY = 'medical_certificate_batches'
+
+
+class MedicalCertificateBatch(models.Model):
+    """Batch rendering of medical certificates into one ZIP file.
+
+    Batches are processed in the background by the certificate batch cron,
+    ``_batch_chunk_size`` certificates per run. Each chunk is rendered by a
+    pool of worker threads, each with its own cursor, and appended to a ZIP
+    file in the filestore; the consultations rendered are recorded, so an
+    interrupted batch resumes where it stopped. The ZIP attachment of the
+    batch is created from that file once every certificate is rendered.
+    Certificates are only queued for consultations the user can read. The
+    pool size is read from the ``odoo_medical.certificate_workers``
+    parameter (4 by default).
+    """
+    _name = 'medical.certificate.batch'
+    _description = 'Medical Certificate Batch'
+    _order = 'id desc'
+
+    # Number of certificates rendered per cron run
+    _batch_chunk_size = 50
+
+    name = fields.Char(string='Name', compute='_compute_name', store=True)
+    certificate_type = fields.Selection([
+        ('private', 'Private Certificate'),
+        ('iess', 'IESS Certificate'),
+    ], string='Certificate Type', required=True, readonly=True)
+    consultation_ids = fields.Many2many('medical.consultation', string='Consultations', readonly=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='queued', required=True, readonly=True)
+    total_count = fields.Integer(string='Certificates', compute='_compute_progress')
+    rendered_consultation_ids = fields.Many2many(
+        'medical.consultation', 'medical_certificate_batch_rendered_rel', 'batch_id', 'consultation_id',
+        string='Rendered Consultations', readonly=True)
+    done_count = fields.Integer(string='Rendered', compute='_compute_progress')
+    progress = fields.Float(string='Progress', compute='_compute_progress')
+    attachment_id = fields.Many2one('ir.attachment', string='ZIP File', readonly=True, ondelete='set null')
+    error_message = fields.Text(string='Error', readonly=True)
+
+    @api.depends('certificate_type', 'create_date')
+    def _compute_name(self):
+        types = dict(self._fields['certificate_type']._description_selection(self.env))
+        for batch in self:
+            batch.name = '%s - %s' % (types.get(batch.certificate_type, ''), fields.Datetime.to_string(batch.create_date or fields.Datetime.now()))
+
+    @api.depends('consultation_ids', 'rendered_consultation_ids')
+    def _compute_progress(self):
+        for batch in self:
+            batch.total_count = len(batch.consultation_ids)
+            batch.done_count = len(batch.rendered_consultation_ids)
+            batch.progress = 100.0 * batch.done_count / batch.total_count if batch.total_count else 0.0
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        batches = super().create(vals_list)
+        # The batches are rendered by the cron, as superuser
+        batches.consultation_ids.check_access('read')
+        return batches
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'consultation_ids' in vals:
+            self.consultation_ids.check_access('read')
+        return res
+
+    def unlink(self):
+        paths = [batch._zip_path() for batch in self]
+        res = super().unlink()
+        for path in paths:
+            _remove_file(path)
+        return res
+
+    def _zip_path(self):
+        directory = os.path.join(self.env['ir.attachment']._filestore(), BATCH_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, 'certificates_%s.zip' % self.id)
+
+    def _schedule(self):
+        self.env.ref('odoo_medical.ir_cron_medical_certificate_batch')._trigger()
+
+    def action_retry(self):
+        self.filtered(lambda b: b.state == 'failed').write({'state': 'queued', 'error_message': False})
+        self._schedule()
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % self.attachment_id.id,
+            'target': 'self',
+        }
+
+    @api.model
+    def _cron_process_batches(self):
+        """Render the next chunk of the oldest pending batch and report the progress"""
+        batch = self.search([('state', 'in', ('queued', 'running'))], order='id', limit=1)
+        if not batch:
+            return
+        done = batch._process_chunk()
+        pending = self.search([('state', 'in', ('queued', 'running'))])
+        remaining = sum(pending.mapped('total_count')) - sum(pending.mapped('done_count'))
+        self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+
+    def _process_chunk(self):
+        """Render the next certificates of the batch and append them to its ZIP file
+
+        :return: number of certificates rendered
+        """
+        self.ensure_one()
+        pending = sorted(set(self.consultation_ids.ids) - set(self.rendered_consultation_ids.ids))
+        chunk = pending[:self._batch_chunk_size]
+        report = self.env['medical.consultation']._get_certificate_report(self.certificate_type)
+        if not report:
+            self.write({'state': 'failed', 'error_message': _('The certificate report is not available. Please update the module.')})
+            return 0
+
+        self.state = 'running'
+        try:
+            with self.env.cr.savepoint():
+                certificates = self._render_certificates(report.report_name, chunk)
+        except Exception as e:
+            _logger.exception("Certificate batch %s failed", self.id)
+            self.write({'state': 'failed', 'error_message': str(e)})
+            return 0
+
+        # Appending only rewrites the central directory of the file. Entries
+        # written by a run whose transaction was rolled back are not added twice.
+        path = self._zip_path()
+        with zipfile.ZipFile(path, 'a' if os.path.exists(path) else 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            written = set(archive.namelist())
+            for filename, content in certificates:
+                if filename not in written:
+                    archive.writestr(filename, content)
+        self.rendered_consultation_ids = [(4, consultation_id) for consultation_id in chunk]
+
+        if len(chunk) == len(pending):
+            self.attachment_id = self.env['ir.attachment']._medical_create_from_file(path, {
+                'name': 'certificates_%s.zip' % self.id,
+                'mimetype': 'application/zip',
+                'res_model': self._name,
+                'res_id': self.id,
+            })
+            self.state = 'done'
+            self.create_uid.partner_id._bus_send('simple_notification', {
+                'type': 'success',
+                'title': self.name,
+                'message': _('%s certificates are ready to download.', self.done_count),
+            })
+        return len(chunk)
+
+    def _certificate_workers(self):
+        """Return the number of threads rendering the certificates. The
+        workers use their own cursors, which do not see the data of the
+        tests: certificates are rendered in the current thread in test mode."""
+        if self.env.registry.in_test_mode():
+            return 1
+        return int(self.env['medical.settings'].get_param('odoo_medical.certificate_workers', 4))
+
+    def _render_certificates(self, report_name, consultation_ids):
+        """Render the certificate ``report_name`` of each consultation
+
+        :return: list of (filename, content) in the order of ``consultation_ids``
+        """
+        workers = self._certificate_workers()
+        if workers <= 1 or len(consultation_ids) <= 1:
+            return [_render_certificate(self.env, report_name, consultation_id) for consultation_id in consultation_ids]
+
+        # The workers read committed data with their own cursors
+        self.env.flush_all()
+        slices = [consultation_ids[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='medical_certificates') as executor:
+            futures = [
+                executor.submit(self._render_certificates_worker, report_name, ids)
+                for ids in slices if ids
+            ]
+            rendered = {}
+            for future, ids in zip(futures, [ids for ids in slices if ids]):
+                rendered.update(zip(ids, future.result()))
+        return [rendered[consultation_id] for consultation_id in consultation_ids]
+
+    def _render_certificates_worker(self, report_name, consultation_ids):
+        thread = threading.current_thread()
+        thread.dbname = self.env.cr.dbname
+        thread.uid = self.env.uid
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            return [_render_certificate(env, report_name, consultation_id) for consultation_id in consultation_ids]
+
+
+def _render_certificate(env, report_name, consultation_id):
+    """Render one certificate, return its ZIP entry (filename, content)"""
+    content, report_format = env['ir.actions.report']._render(report_name, [consultation_id])
+    consultation = env['medical.consultation'].browse(consultation_id)
+    filename = '%s.%s' % ((consultation.name or str(consultation_id)).replace('/', '_'), report_format)
+    return filename, content
+
+
+def _remove_file(path):
+    if os.path.exists(path):
+        os.unlink(path)
@@ -1,25 +1,72 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+import hashlib
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
 from datetime import date
 
+CERTIFICATE_REPORTS = {
+    'private': 'odoo_medical.report_private_medical_certificate',
+    'iess': 'odoo_medical.report_iess_medical_certificate',
+}
+# Description prefix and res_field of the attachments holding rendered
+# certificates. The res_field keeps them out of the chatter of the consultation.
+CERTIFICATE_CACHE_PREFIX = 'medical_certificate_cache'
+CERTIFICATE_CACHE_FIELD = 'medical_certificate_cache'
+# Fields of the consultation, of its prescription lines and of its patient
+# and doctor, shown on the certificates: the cached certificates are keyed on
+# their values, and changing them drops the cached certificates
+CERTIFICATE_FIELDS = [
+    'name', 'patient_id', 'patient_vat', 'birth_date', 'age', 'consultation_date', 'doctor_id', 'doctor_license',
+    'cie10_code', 'diagnosis', 'has_symptoms', 'medical_cause', 'next_appointment_date', 'observations',
+    'prescription_line_ids', 'rest_days', 'rest_start_date', 'rest_end_date', 'treatment_description',
+    'work_restriction_type',
+]
+CERTIFICATE_PRESCRIPTION_FIELDS = [
+    'medication_name', 'pharmaceutical_form', 'concentration', 'concentration_unit', 'quantity_to_dispense',
+    'posology',
+]
+CERTIFICATE_PARTNER_FIELDS = ['name', 'vat', 'birthdate_date', 'doctor_license']
+# Fields shown on the waiting-room board
+WAITING_ROOM_FIELDS = ['name', 'patient_id', 'consultation_date', 'consultation_type', 'state', 'doctor_id']
+# Fields copied to the vital signs series of finished consultations
+VITALS_SERIES_FIELDS = ['state', 'patient_id', 'consultation_date', 'systolic_pressure', 'diastolic_pressure', 'weight_kg']
+
 
 class MedicalConsultation(models.Model):
     _name = 'medical.consultation'
     _description = 'Medical Consultation'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['medical.tracking.mixin', 'mail.activity.mixin', 'medical.invoice.mixin', 'medical.fulltext.mixin']
     _order = 'consultation_date desc'
 
+    _fulltext_fields = {
+        'consultation_reason': 'A',
+        'diagnosis': 'A',
+        'evolution': 'B',
+        'treatment_description': 'B',
+        'observations': 'C',
+    }
+
+    _tracking_groups = {
+        'clinical': ['consultation_reason', 'cie10_code', 'diagnosis', 'treatment_description',
+                     'evolution', 'observations', 'has_symptoms'],
+        'vitals': ['systolic_pressure', 'diastolic_pressure', 'weight_kg', 'weight_lb'],
+        'leave': ['work_restriction_type', 'medical_cause', 'rest_days', 'rest_start_date', 'rest_end_date'],
+        'billing': ['consultation_fee', 'discount_percentage', 'total_to_pay', 'consultation_product_id',
+                    'consultation_tax_id', 'consultation_journal_id'],
+    }
+
     # Basic Information
     name = fields.Char(string='Consultation Reference', required=True, copy=False, readonly=True, default=lambda self: _('New'))
-    patient_id = fields.Many2one('res.partner', string='Patient', required=True, tracking=True,
+    patient_id = fields.Many2one('res.partner', string='Patient', required=True, tracking=True, index=True,
                                 domain="[('is_company', '=', False)]")
     patient_vat = fields.Char(string='Patient VAT', related='patient_id.vat', store=True, readonly=True)
     birth_date = fields.Date(string='Birth Date', related='patient_id.birthdate_date', store=True, readonly=False)
     age = fields.Integer(string='Age', compute='_compute_age', store=True)
     consultation_date = fields.Datetime(string='Consultation Date', required=True, default=fields.Datetime.now, tracking=True)
-    doctor_id = fields.Many2one('res.users', string='Doctor', required=True, default=lambda self: self.env.user, tracking=True)
+    doctor_id = fields.Many2one('res.users', string='Doctor', required=True, default=lambda self: self.env.user, tracking=True, index=True)
     doctor_license = fields.Char(
         string='Doctor License Number',
         related='doctor_id.doctor_license',
@@ -35,17 +82,81 @@ class MedicalConsultation(models.Model):
     start_datetime = fields.Datetime(string='Start Time', readonly=True)
     end_datetime = fields.Datetime(string='End Time', readonly=True)
     duration_minutes = fields.Float(string='Consultation Duration (min)', compute='_compute_duration', store=True, readonly=True)
+
+    def _lock_waiting(self):
+        """Lock the waiting consultations of self, skipping the ones another
+        transaction is already starting"""
+        if not self.ids:
+            return self.browse()
+        self.flush_recordset(['state'])
+        self.env.cr.execute(SQL("""
+            SELECT id FROM medical_consultation
+             WHERE id IN %s AND state = 'waiting'
+               FOR UPDATE SKIP LOCKED
+        """, tuple(self.ids)))
+        locked = self.browse(row[0] for row in self.env.cr.fetchall())
+        locked.invalidate_recordset(['state'])
+        return locked.filtered(lambda rec: rec.state == 'waiting')
+
+    def _start(self):
+        self.write({'state': 'in_progress', 'start_datetime': fields.Datetime.now()})
+
     def action_start_consultation(self):
-        for rec in self:
-            if rec.state == 'waiting':
-                rec.state = 'in_progress'
-                rec.start_datetime = fields.Datetime.now()
+        consultations = self._lock_waiting()
+        if len(self) == 1 and not consultations and self.state == 'waiting':
+            raise UserError(_('This patient has already been called by another doctor.'))
+        consultations._start()
+
+    @api.model
+    def call_next_patient(self, domain=None):
+        """Start the consultation of the first waiting patient, in order of arrival.
+
+        The queue is read with ``FOR UPDATE SKIP LOCKED``: doctors calling the
+        next patient at the same time never get the same consultation. The
+        caller becomes the doctor of the consultation.
+
+        :param domain: optional domain restricting the queue
+        :return: the started consultation, empty when nobody is waiting
+        """
+        self.flush_model(['state', 'consultation_date'])
+        self.env.cr.execute(SQL("""
+            SELECT id FROM medical_consultation
+             WHERE state = 'waiting' AND id IN %s
+          ORDER BY consultation_date, id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """, self._search(domain or []).subselect()))
+        row = self.env.cr.fetchone()
+        if not row:
+            return self.browse()
+        consultation = self.browse(row[0])
+        consultation.invalidate_recordset(['state'])
+        if consultation.doctor_id != self.env.user:
+            consultation.doctor_id = self.env.user
+        consultation._start()
+        return consultation
+
+    def action_call_next_patient(self):
+        consultation = self.call_next_patient()
+        if not consultation:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'message': _('No patient is waiting.'),
+                    'type': 'info',
+                }
+            }
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': consultation.id,
+            'view_mode': 'form',
+        }
 
     def action_finish_consultation(self):
-        for rec in self:
-            if rec.state == 'in_progress':
-                rec.state = 'finished'
-                rec.end_datetime = fields.Datetime.now()
+        in_progress = self.filtered(lambda rec: rec.state == 'in_progress')
+        in_progress.write({'state': 'finished', 'end_datetime': fields.Datetime.now()})
 
     @api.depends('start_datetime', 'end_datetime')
     def _compute_duration(self):
@@ -117,60 +228,137 @@ class MedicalConsultation(models.Model):
     consultation_product_id = fields.Many2one(
         'product.product',
         string='Default Consultation Item',
-        default=lambda self: self.env['ir.config_parameter'].sudo().get_param('odoo_medical.default_consultation_product_id') and int(self.env['ir.config_parameter'].sudo().get_param('odoo_medical.default_consultation_product_id')) or False,
+        default=lambda self: self.env['medical.settings'].get_id_param('odoo_medical.default_consultation_product_id'),
         required=True,
         tracking=True,
     )
     consultation_tax_id = fields.Many2one(
         'account.tax',
         string='Default Consultation Tax',
-        default=lambda self: self.env['ir.config_parameter'].sudo().get_param('odoo_medical.default_consultation_tax_id') and int(self.env['ir.config_parameter'].sudo().get_param('odoo_medical.default_consultation_tax_id')) or False,
+        default=lambda self: self.env['medical.settings'].get_id_param('odoo_medical.default_consultation_tax_id'),
         tracking=True,
     )
     consultation_journal_id = fields.Many2one(
         'account.journal',
         string='Default Consultation Journal',
-        default=lambda self: self.env['ir.config_parameter'].sudo().get_param('odoo_medical.default_consultation_journal_id') and int(self.env['ir.config_parameter'].sudo().get_param('odoo_medical.default_consultation_journal_id')) or False,
+        default=lambda self: self.env['medical.settings'].get_id_param('odoo_medical.default_consultation_journal_id'),
         tracking=True,
     )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        compute='_compute_company_id',
+        store=True,
+        readonly=False,
+        precompute=True,
+        index=True,
+        help='Company billing the consultation, the company of its journal by default'
+    )
 
-    def action_create_invoice(self):
+    # Invoice tracking
+    invoice_id = fields.Many2one(
+        'account.move',
+        string='Invoice',
+        readonly=True,
+        copy=False,
+        help='Generated invoice for this consultation'
+    )
+    invoice_state = fields.Selection(
+        related='invoice_id.state',
+        string='Invoice State',
+        readonly=True
+    )
+
+    @api.depends('consultation_journal_id')
+    def _compute_company_id(self):
+        for record in self:
+            record.company_id = record.consultation_journal_id.company_id or record.company_id or self.env.company
+
+    def _get_invoice_journal(self):
+        self.ensure_one()
+        return self.consultation_journal_id
+
+    def _check_invoiceable(self):
+        for record in self:
+            if record.state != 'finished':
+                raise ValidationError(_('You can only create invoices for finished consultations.'))
+            if not record.consultation_product_id or not record.consultation_journal_id:
+                raise ValidationError(_('You must configure the consultation item and journal.'))
+
+    def _prepare_invoice_line_vals(self):
         self.ensure_one()
-        if not self.consultation_product_id or not self.consultation_journal_id:
-            raise ValidationError(_('You must configure the consultation item and journal.'))
-        invoice_vals = {
-            'move_type': 'out_invoice',
-            'partner_id': self.patient_id.id,
-            'journal_id': self.consultation_journal_id.id,
-            'invoice_date': fields.Date.context_today(self),
-            'invoice_line_ids': [
-                (0, 0, {
-                    'product_id': self.consultation_product_id.id,
-                    'name': self.consultation_product_id.name,
-                    'quantity': 1,
-                    'price_unit': self.consultation_fee,
-                    'discount': self.discount_percentage or 0.0,
-                    'tax_ids': [(6, 0, [self.consultation_tax_id.id]) if self.consultation_tax_id else (5,)],
-                })
-            ],
-            'ref': self.name,
-        }
-        invoice = self.env['account.move'].create(invoice_vals)
         return {
-            'type': 'ir.actions.act_window',
-            'name': _('Consultation Invoice'),
-            'res_model': 'account.move',
-            'res_id': invoice.id,
-            'view_mode': 'form',
-            'target': 'current',
+            'product_id': self.consultation_product_id.id,
+            'name': self.consultation_product_id.name,
+            'quantity': 1,
+            'price_unit': self.consultation_fee,
+            'discount': self.discount_percentage or 0.0,
+            'tax_ids': [(6, 0, self.consultation_tax_id.ids)],
         }
 
+    def action_create_invoice(self):
+        self.ensure_one()
+        invoice = self.invoice_id or self._create_invoices()
+        action = self._get_invoices_action(invoice)
+        action['name'] = _('Consultation Invoice')
+        return action
+
+    def init(self):
+        super().init()
+        # Waiting queue of call_next_patient, in order of arrival
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS medical_consultation_waiting_queue_idx
+                ON medical_consultation (consultation_date, id)
+             WHERE state = 'waiting'
+        """)
+
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('medical.consultation') or _('New')
-        return super(MedicalConsultation, self).create(vals_list)
+        pending = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence'].next_batch_by_code('medical.consultation', len(pending))
+        for vals, name in zip(pending, names):
+            vals['name'] = name or _('New')
+        records = super(MedicalConsultation, self).create(vals_list)
+        records._notify_waiting_room()
+        return records
+
+    def write(self, vals):
+        res = super(MedicalConsultation, self).write(vals)
+        if not vals.keys().isdisjoint(CERTIFICATE_FIELDS):
+            self._clear_certificate_cache()
+        if not vals.keys().isdisjoint(WAITING_ROOM_FIELDS):
+            self._notify_waiting_room()
+        if not vals.keys().isdisjoint(VITALS_SERIES_FIELDS):
+            self.env['medical.vitals.series'].sudo()._append_consultations(self)
+        return res
+
+    def unlink(self):
+        self._notify_waiting_room(deleted=True)
+        self._clear_certificate_cache()
+        self.env['medical.consultation.report']._remove_consultations(self.ids)
+        return super(MedicalConsultation, self).unlink()
+
+    def _notify_waiting_room(self, deleted=False):
+        """Push the changed cards of self to the waiting-room boards. The
+        changes of the transaction are sent in one message, before commit."""
+        if not self:
+            return
+        pending = self.env.cr.precommit.data.get('odoo_medical.waiting_room')
+        if pending is None:
+            pending = self.env.cr.precommit.data['odoo_medical.waiting_room'] = {'changed': set(), 'deleted': set()}
+            self.env.cr.precommit.add(self._send_waiting_room_notification)
+        pending['deleted' if deleted else 'changed'].update(self.ids)
+
+    def _send_waiting_room_notification(self):
+        pending = self.env.cr.precommit.data.pop('odoo_medical.waiting_room', None)
+        group = self.env.ref('odoo_medical.group_medical_history_user', raise_if_not_found=False)
+        if not pending or not group:
+            return
+        cards = self.sudo().browse(pending['changed'] - pending['deleted']).exists()
+        self.env['bus.bus']._sendone(group, 'odoo_medical.waiting_room', {
+            'cards': cards.read(WAITING_ROOM_FIELDS),
+            'deleted_ids': sorted(pending['deleted']),
+        })
 
     @api.model
     def _name_search(self, name='', args=None, operator='ilike', limit=100, name_get_uid=None):
@@ -195,6 +383,10 @@ class MedicalConsultation(models.Model):
             else:
                 record.age = 0
 
+    def _recompute_age(self):
+        self.env.add_to_compute(self._fields['age'], self)
+        self.flush_recordset(['age'])
+
     @api.depends('weight_kg')
     def _compute_weight_lb(self):
         for record in self:
@@ -257,17 +449,87 @@ class MedicalConsultation(models.Model):
             delta = self.rest_end_date - self.rest_start_date
             self.rest_days = delta.days + 1
 
-    def action_print_private_certificate(self):
-        """Generate private medical certificate"""
+    @api.model
+    @tools.ormcache('report_name')
+    def _get_certificate_report_id(self, report_name):
+        """Return the id of the certificate report ``report_name``.
+
+        Cached in the registry; creating, changing or removing a report action
+        clears the cache.
+        """
+        return self.env['ir.actions.report'].sudo().search([('report_name', '=', report_name)], limit=1).id
+
+    def _certificate_cache_key(self, report_name):
+        """Key of the cached rendering of ``report_name``: a hash of the values
+        the certificate prints and of the last change of its template. Any
+        change of them misses the cache, stored recomputes such as the age
+        included, which ``write`` does not see."""
+        report = self.env['ir.actions.report']._get_report(report_name)
+        consultation = self.sudo()
+        printed = [
+            consultation.read(CERTIFICATE_FIELDS),
+            consultation.cie10_code.read(['code', 'name']),
+            consultation.prescription_line_ids.read(CERTIFICATE_PRESCRIPTION_FIELDS),
+            report.sudo().write_date,
+            self.env['ir.ui.view'].sudo()._read_group(
+                ['|', ('key', '=', report_name), ('inherit_id.key', '=', report_name)],
+                aggregates=['write_date:max'],
+            ),
+        ]
+        return '%s:%s:%s:%s' % (
+            CERTIFICATE_CACHE_PREFIX, report_name, self.env.lang or 'en_US',
+            hashlib.sha1(repr(printed).encode()).hexdigest(),
+        )
+
+    def _certificate_cache_domain(self, pattern=CERTIFICATE_CACHE_PREFIX + ':%'):
+        return [
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('res_field', '=', CERTIFICATE_CACHE_FIELD),
+            ('description', '=like', pattern),
+        ]
+
+    def _get_cached_certificate(self, report_name):
+        """Return the cached rendering of ``report_name`` (str), or None"""
+        self.check_access('read')
+        attachment = self.env['ir.attachment'].sudo().search(
+            self._certificate_cache_domain(self._certificate_cache_key(report_name)), limit=1)
+        return attachment.raw.decode() if attachment else None
+
+    def _cache_certificate(self, report_name, content, report_format):
+        """Store the rendering of ``report_name``, replacing the outdated
+        renderings of the report in the current language"""
+        report = self.env['ir.actions.report']._get_report(report_name)
+        Attachment = self.env['ir.attachment'].sudo()
+        Attachment.search(self._certificate_cache_domain(
+            '%s:%s:%s:%%' % (CERTIFICATE_CACHE_PREFIX, report_name, self.env.lang or 'en_US'))).unlink()
+        Attachment.create({
+            'name': '%s - %s.%s' % (report.name, self.name, report_format),
+            'description': self._certificate_cache_key(report_name),
+            'raw': content.encode() if isinstance(content, str) else content,
+            'mimetype': 'text/html',
+            'res_model': self._name,
+            'res_id': self.id,
+            'res_field': CERTIFICATE_CACHE_FIELD,
+        })
+
+    def _clear_certificate_cache(self):
+        """Drop the cached certificates of self, outdated by a change of the consultation"""
+        if not self:
+            return
+        self.env['ir.attachment'].sudo().search(self._certificate_cache_domain()).unlink()
+
+    @api.model
+    def _get_certificate_report(self, certificate_type):
+        report_id = self._get_certificate_report_id(CERTIFICATE_REPORTS[certificate_type])
+        return self.env['ir.actions.report'].browse(report_id)
+
+    def _action_print_certificate(self, certificate_type, missing_message):
         self.ensure_one()
         if self.state != 'finished':
             raise ValidationError(_('Medical certificate can only be generated for finished consultations.'))
-        
-        # Buscar el reporte por su nombre
-        report = self.env['ir.actions.report'].search([
-            ('report_name', '=', 'odoo_medical.report_private_medical_certificate')
-        ], limit=1)
-        
+
+        report = self._get_certificate_report(certificate_type)
         if report:
             return report.report_action(self)
         else:
@@ -276,34 +538,38 @@ class MedicalConsultation(models.Model):
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
                 'params': {
-                    'message': _('Private medical certificate report is not available yet. Please update the module.'),
+                    'message': missing_message,
                     'type': 'warning',
                 }
             }
 
+    def action_print_private_certificate(self):
+        """Generate private medical certificate"""
+        return self._action_print_certificate(
+            'private', _('Private medical certificate report is not available yet. Please update the module.'))
+
     def action_print_iess_certificate(self):
         """Generate IESS medical certificate"""
-        self.ensure_one()
-        if self.state != 'finished':
+        return self._action_print_certificate(
+            'iess', _('IESS medical certificate report is not available yet. Please update the module.'))
+
+    def action_create_certificate_batch(self, certificate_type):
+        """Queue the certificates of the finished consultations of self for
+        rendering into one ZIP file, and open the batch"""
+        consultations = self.filtered(lambda c: c.state == 'finished')
+        if not consultations:
             raise ValidationError(_('Medical certificate can only be generated for finished consultations.'))
-        
-        # Buscar el reporte por su nombre
-        report = self.env['ir.actions.report'].search([
-            ('report_name', '=', 'odoo_medical.report_iess_medical_certificate')
-        ], limit=1)
-        
-        if report:
-            return report.report_action(self)
-        else:
-            # Fallback si el reporte no está disponible
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'message': _('IESS medical certificate report is not available yet. Please update the module.'),
-                    'type': 'warning',
-                }
-            }
+        batch = self.env['medical.certificate.batch'].create({
+            'certificate_type': certificate_type,
+            'consultation_ids': [(6, 0, consultations.ids)],
+        })
+        batch._schedule()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'medical.certificate.batch',
+            'res_id': batch.id,
+            'view_mode': 'form',
+        }
 
 
 class MedicalPrescriptionLine(models.Model):
@@ -336,6 +602,22 @@ class MedicalPrescriptionLine(models.Model):
     quantity_to_dispense = fields.Float(string='Quantity to Dispense', required=True)
     posology = fields.Text(string='Posology', required=True)
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super(MedicalPrescriptionLine, self).create(vals_list)
+        lines.consultation_id._clear_certificate_cache()
+        return lines
+
+    def write(self, vals):
+        consultations = self.consultation_id
+        res = super(MedicalPrescriptionLine, self).write(vals)
+        (consultations | self.consultation_id)._clear_certificate_cache()
+        return res
+
+    def unlink(self):
+        self.consultation_id._clear_certificate_cache()
+        return super(MedicalPrescriptionLine, self).unlink()
+
     @api.constrains('concentration', 'quantity_to_dispense')
     def _check_positive_values(self):
         for record in self:
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+# Consultations changed this long before the last refresh are refreshed again,
+# to catch the transactions that were still running during that refresh
+REFRESH_OVERLAP = '5 minutes'
+
+
+class MedicalConsultationReport(models.Model):
+    """Consultation analytics, one row per consultation.
+
+    The rows are defined by the ``medical_consultation_report_query`` view.
+    By default the report reads it live. When the
+    ``odoo_medical.consultation_report_materialized`` parameter is set, the
+    rows are copied into a table instead. That table is indexed for the
+    dashboards and refreshed incrementally by :meth:`_cron_refresh`. The time
+    of the last refresh is kept in the ``medical_consultation_report_refresh``
+    table, and deleted consultations leave the table right away, see
+    :meth:`_remove_consultations`.
+
+    Dates are bucketed by day, week and month in the clinic timezone
+    (``odoo_medical.clinic_tz``, UTC by default). Changing the timezone or
+    the materialization rebuilds the report.
+    """
+    _name = 'medical.consultation.report'
+    _description = 'Consultation Analysis'
+    _auto = False
+    _rec_name = 'consultation_id'
+    _order = 'consultation_date desc'
+
+    consultation_id = fields.Many2one('medical.consultation', string='Consultation', readonly=True)
+    consultation_date = fields.Datetime(string='Consultation Date', readonly=True)
+    date_day = fields.Date(string='Day', readonly=True)
+    date_week = fields.Date(string='Week', readonly=True)
+    date_month = fields.Date(string='Month', readonly=True)
+    doctor_id = fields.Many2one('res.users', string='Doctor', readonly=True)
+    patient_id = fields.Many2one('res.partner', string='Patient', readonly=True)
+    consultation_type = fields.Selection(
+        selection=lambda self: self.env['medical.consultation']._fields['consultation_type'].selection,
+        string='Consultation Type', readonly=True)
+    medical_cause = fields.Selection(
+        selection=lambda self: self.env['medical.consultation']._fields['medical_cause'].selection,
+        string='Medical Cause', readonly=True)
+    state = fields.Selection(
+        selection=lambda self: self.env['medical.consultation']._fields['state'].selection,
+        string='Status', readonly=True)
+    duration_minutes = fields.Float(string='Average Duration (min)', aggregator='avg', readonly=True)
+    total_to_pay = fields.Float(string='Revenue', readonly=True)
+
+    @api.model
+    def _is_materialized(self):
+        return bool(self.env['medical.settings'].get_param('odoo_medical.consultation_report_materialized'))
+
+    @api.model
+    def _query(self):
+        tz = self.env['medical.settings'].get_param('odoo_medical.clinic_tz') or 'UTC'
+        local_date = SQL("(c.consultation_date AT TIME ZONE 'UTC' AT TIME ZONE %s)", tz)
+        return SQL("""
+            SELECT c.id AS id,
+                   c.id AS consultation_id,
+                   c.consultation_date,
+                   %(local_date)s::date AS date_day,
+                   date_trunc('week', %(local_date)s)::date AS date_week,
+                   date_trunc('month', %(local_date)s)::date AS date_month,
+                   c.doctor_id,
+                   c.patient_id,
+                   c.consultation_type,
+                   c.medical_cause,
+                   c.state,
+                   c.duration_minutes,
+                   c.total_to_pay,
+                   c.write_date AS source_write_date
+              FROM medical_consultation c
+        """, local_date=local_date)
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("""
+            CREATE TABLE IF NOT EXISTS medical_consultation_report_refresh (
+                refreshed_at timestamp NOT NULL
+            )
+        """)
+        # The report is a view or a table depending on the materialization
+        cr.execute("SELECT relkind FROM pg_class WHERE relname = %s", [self._table])
+        row = cr.fetchone()
+        if row:
+            kind = SQL('TABLE') if row[0] == 'r' else SQL('VIEW')
+            cr.execute(SQL("DROP %s %s", kind, SQL.identifier(self._table)))
+        tools.drop_view_if_exists(cr, 'medical_consultation_report_query')
+        cr.execute(SQL("CREATE VIEW medical_consultation_report_query AS (%s)", self._query()))
+        if not self._is_materialized():
+            cr.execute(SQL("CREATE VIEW %s AS (SELECT * FROM medical_consultation_report_query)", SQL.identifier(self._table)))
+            return
+
+        cr.execute(SQL("CREATE TABLE %s AS (SELECT * FROM medical_consultation_report_query)", SQL.identifier(self._table)))
+        for index, columns in [
+            ('id', 'id'),
+            ('date_day', 'date_day'),
+            ('date_month', 'date_month'),
+            ('doctor_id', 'doctor_id, date_day'),
+            ('source_write_date', 'source_write_date'),
+        ]:
+            unique = SQL('UNIQUE') if index == 'id' else SQL('')
+            cr.execute(SQL(
+                "CREATE %s INDEX %s ON %s (%s)",
+                unique, SQL.identifier('%s_%s_idx' % (self._table, index)),
+                SQL.identifier(self._table), SQL(columns),
+            ))
+        self._set_refreshed_at(SQL("now() AT TIME ZONE 'UTC'"))
+
+    def _set_refreshed_at(self, refreshed_at):
+        # A table of its own: a config parameter would clear the registry
+        # caches of every worker at each refresh
+        cr = self.env.cr
+        cr.execute("DELETE FROM medical_consultation_report_refresh")
+        cr.execute(SQL("INSERT INTO medical_consultation_report_refresh (refreshed_at) VALUES (%s)", refreshed_at))
+
+    @api.model
+    def _remove_consultations(self, ids):
+        """Remove the consultations ``ids``, being deleted, from the materialized report"""
+        if ids and self._is_materialized():
+            self.env.cr.execute(SQL("DELETE FROM %s WHERE id = ANY(%s)", SQL.identifier(self._table), list(ids)))
+
+    @api.model
+    def _cron_refresh(self):
+        """Bring the materialized report up to date with the consultations
+        changed since the last refresh"""
+        if not self._is_materialized():
+            return
+        self.env.flush_all()
+        cr = self.env.cr
+        cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+        started_at = cr.fetchone()[0]
+        table = SQL.identifier(self._table)
+        changed = SQL("""
+            SELECT id FROM medical_consultation
+             WHERE write_date >= (SELECT COALESCE(max(refreshed_at), '-infinity')
+                                    FROM medical_consultation_report_refresh) - interval %s
+        """, REFRESH_OVERLAP)
+        cr.execute(SQL("DELETE FROM %s WHERE id IN (%s)", table, changed))
+        cr.execute(SQL("""
+            INSERT INTO %s
+            SELECT * FROM medical_consultation_report_query
+             WHERE id IN (%s)
+        """, table, changed))
+        _logger.info("Consultation report refreshed: %s rows", cr.rowcount)
+        self._set_refreshed_at(started_at)
+        self.env.invalidate_all()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+from odoo.tools import SQL
+
+
+class MedicalCountMixin(models.AbstractModel):
+    """Smart-button counters computed with one grouped query per relation.
+
+    Inheriting models list their counters in ``_related_count_fields``,
+    mapping each integer count field to the one2many or many2many field it
+    counts, and declare the count fields with
+    ``compute='_compute_related_counts'``::
+
+        _related_count_fields = {'therapy_count': 'therapy_ids'}
+        therapy_count = fields.Integer(compute='_compute_related_counts')
+    """
+    _name = 'medical.count.mixin'
+    _description = 'Medical Related Count Mixin'
+
+    _related_count_fields = {}
+
+    def _read_related_counts(self, field_name):
+        """Count the records of the x2many ``field_name`` for all of self at once
+
+        :return: dict mapping record ids to their count
+        """
+        field = self._fields[field_name]
+        record_ids = [record_id for record_id in self.ids if record_id]
+        if not record_ids:
+            return {}
+        comodel = self.env[field.comodel_name].with_context(**field.context)
+        domain = list(field.domain) if isinstance(field.domain, list) else []
+        if field.type == 'one2many':
+            groups = comodel._read_group(domain + [(field.inverse_name, 'in', record_ids)], [field.inverse_name], ['__count'])
+            return {record.id: count for record, count in groups}
+
+        # Many2many fields are counted on their relation table, the comodel
+        # does not need a field pointing back to self
+        self.flush_model([field_name])
+        self.env.cr.execute(SQL(
+            "SELECT %s, COUNT(*) FROM %s WHERE %s IN %s AND %s IN %s GROUP BY %s",
+            SQL.identifier(field.column1),
+            SQL.identifier(field.relation),
+            SQL.identifier(field.column1),
+            tuple(record_ids),
+            SQL.identifier(field.column2),
+            comodel._search(domain).subselect(),
+            SQL.identifier(field.column1),
+        ))
+        return dict(self.env.cr.fetchall())
+
+    @api.depends(lambda self: list(self._related_count_fields.values()))
+    def _compute_related_counts(self):
+        for count_field, relation_field in self._related_count_fields.items():
+            counts = self._read_related_counts(relation_field)
+            for record in self:
+                if record.id:
+                    record[count_field] = counts.get(record.id, 0)
+                else:
+                    # Unsaved record (onchange): count the lines in memory
+                    record[count_field] = len(record[relation_field])
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+from markupsafe import escape
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+from odoo.tools.query import Query
+
+# Text search configuration of the clinical narrative
+FULLTEXT_CONFIG = 'spanish'
+# Markers of the matches in the snippets, replaced by HTML tags once the
+# clinical text is escaped
+SNIPPET_START = '[[match]]'
+SNIPPET_STOP = '[[/match]]'
+
+
+class MedicalFulltextMixin(models.AbstractModel):
+    """Spanish full-text search over the clinical narrative of a model.
+
+    Inheriting models list their narrative fields and the weight of each one
+    (``A`` to ``D``, ``A`` ranking highest) in ``_fulltext_fields``::
+
+        _fulltext_fields = {'diagnosis': 'A', 'observations': 'C'}
+
+    A GIN index on the weighted ``tsvector`` of these fields is created when
+    the module is installed or updated. Translated fields are indexed in all
+    their languages.
+    """
+    _name = 'medical.fulltext.mixin'
+    _description = 'Medical Full-Text Search Mixin'
+
+    _fulltext_fields = {}
+
+    fulltext_search = fields.Char(
+        string='Clinical Text',
+        compute='_compute_fulltext_search',
+        search='_search_fulltext',
+    )
+
+    def init(self):
+        super().init()
+        if self._abstract or not self._fulltext_fields:
+            return
+        self.env.cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS %s ON %s USING gin ((%s))",
+            SQL.identifier('%s_fulltext_idx' % self._table),
+            SQL.identifier(self._table),
+            self._fulltext_vector(),
+        ))
+
+    def _fulltext_vector(self, alias=None):
+        """Return the weighted ``tsvector`` expression matched by the full-text index"""
+        vectors = []
+        for field_name, weight in self._fulltext_fields.items():
+            column = SQL.identifier(alias, field_name) if alias else SQL.identifier(field_name)
+            empty = SQL("'{}'::jsonb") if self._fields[field_name].translate else SQL("''")
+            vectors.append(SQL(
+                "setweight(to_tsvector(%s::regconfig, COALESCE(%s, %s)), %s)",
+                FULLTEXT_CONFIG, column, empty, weight,
+            ))
+        return SQL(" || ").join(vectors)
+
+    def _fulltext_text(self, alias, lang):
+        """Return the plain text of the narrative fields in ``lang``, for snippets"""
+        texts = []
+        for field_name in self._fulltext_fields:
+            column = SQL.identifier(alias, field_name)
+            if self._fields[field_name].translate:
+                texts.append(SQL("COALESCE(%s->>%s, %s->>'en_US', '')", column, lang, column))
+            else:
+                texts.append(SQL("COALESCE(%s, '')", column))
+        return SQL(" || ' ' || ").join(texts)
+
+    def _compute_fulltext_search(self):
+        self.fulltext_search = False
+
+    def _search_fulltext(self, operator, value):
+        positive = operator in ('ilike', '=', 'like')
+        if not positive and operator not in ('not ilike', '!=', 'not like'):
+            raise UserError(_('Unsupported operator %s for the clinical text search.', operator))
+        if not isinstance(value, str) or not value.strip():
+            # Like an empty ilike, an empty search matches every record
+            return [] if positive else [('id', 'in', [])]
+        query = Query(self.env, self._table)
+        query.add_where(SQL(
+            "%s @@ websearch_to_tsquery(%s::regconfig, %s)",
+            self._fulltext_vector(self._table), FULLTEXT_CONFIG, value,
+        ))
+        return [('id', 'in' if positive else 'not in', query)]
+
+    @api.model
+    def search_fulltext(self, term, domain=None, limit=20):
+        """Search the clinical narrative of this model, best matches first.
+
+        :param term: words to look for, in web search syntax (``"quoted
+                     phrases"``, ``or`` and ``-excluded`` words)
+        :param domain: optional domain restricting the records searched
+        :return: list of dicts with ``res_model``, ``res_id``, ``name``,
+                 ``rank`` and an HTML ``snippet`` around the matches
+        """
+        if not term or not term.strip() or not self._fulltext_fields:
+            return []
+        table = self._table
+        self.env.flush_all()
+        self.env.cr.execute(SQL("""
+            SELECT rec.id, ts_rank_cd(%(vector)s, query) AS rank,
+                   ts_headline(%(config)s::regconfig, %(text)s, query,
+                               %(options)s)
+              FROM %(table)s rec, websearch_to_tsquery(%(config)s::regconfig, %(term)s) query
+             WHERE %(vector)s @@ query
+               AND rec.id IN %(visible)s
+          ORDER BY rank DESC, rec.id DESC
+             LIMIT %(limit)s
+        """,
+            vector=self._fulltext_vector('rec'),
+            config=FULLTEXT_CONFIG,
+            options='MaxWords=30, MinWords=10, MaxFragments=2, StartSel="%s", StopSel="%s"' % (SNIPPET_START, SNIPPET_STOP),
+            text=self._fulltext_text('rec', self.env.lang or 'en_US'),
+            table=SQL.identifier(table),
+            term=term,
+            visible=self._search(domain or []).subselect(),
+            limit=limit,
+        ))
+        rows = self.env.cr.fetchall()
+        names = {rec.id: rec.display_name for rec in self.browse([row[0] for row in rows])}
+        return [{
+            'res_model': self._name,
+            'res_id': res_id,
+            'name': names.get(res_id),
+            'rank': rank,
+            'snippet': _snippet_html(snippet),
+        } for res_id, rank, snippet in rows]
+
+    @api.model
+    def search_clinical_text(self, term, limit=20):
+        """Search the clinical narrative of every model using this mixin.
+
+        Only the records the current user can read are searched.
+
+        :return: the best ``limit`` hits of all models, as :meth:`search_fulltext`
+        """
+        hits = []
+        for model_name in self.env.registry.descendants([self._name], '_inherit'):
+            Model = self.env[model_name]
+            if Model._abstract or not Model._fulltext_fields or not Model.has_access('read'):
+                continue
+            hits += Model.search_fulltext(term, limit=limit)
+        hits.sort(key=lambda hit: hit['rank'], reverse=True)
+        return hits[:limit]
+
+
+def _snippet_html(headline):
+    """Return the escaped ``ts_headline`` snippet, with its matches in bold"""
+    return str(escape(headline or '')).replace(SNIPPET_START, '<b>').replace(SNIPPET_STOP, '</b>')
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 # pyright: reportMissingImports=false
+import calendar
+from datetime import timedelta
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools import SQL
 
 
 class MedicalIcd10Group(models.Model):
@@ -25,8 +29,8 @@ class MedicalIcd10Group(models.Model):
     icd10_ids = fields.One2many('medical.icd10', 'group_id', string='ICD-10 Codes')
     
     # Statistics
-    icd10_count = fields.Integer(string='Direct ICD-10 Codes', compute='_compute_icd10_count')
-    total_icd10_count = fields.Integer(string='Total ICD-10 Codes', compute='_compute_total_icd10_count')
+    icd10_count = fields.Integer(string='Direct ICD-10 Codes', compute='_compute_icd10_counts')
+    total_icd10_count = fields.Integer(string='Total ICD-10 Codes', compute='_compute_icd10_counts')
 
     _sql_constraints = [
         ('code_unique', 'unique(code)', 'Group code must be unique.'),
@@ -40,15 +44,26 @@ class MedicalIcd10Group(models.Model):
             else:
                 rec.display_name = rec.name or rec.code
 
-    def _compute_icd10_count(self):
-        for group in self:
-            group.icd10_count = self.env['medical.icd10'].search_count([('group_id', '=', group.id)])
-
-    def _compute_total_icd10_count(self):
+    def _compute_icd10_counts(self):
+        """Count direct and descendant ICD-10 codes of all groups with a single query"""
+        counts = {}
+        group_ids = tuple(group_id for group_id in self.ids if group_id)
+        if group_ids:
+            self.flush_model(['parent_path'])
+            self.env['medical.icd10'].flush_model(['group_id'])
+            self.env.cr.execute("""
+                SELECT grp.id,
+                       COUNT(code.id) FILTER (WHERE code.group_id = grp.id),
+                       COUNT(code.id)
+                  FROM medical_icd10_group grp
+                  JOIN medical_icd10_group sub ON sub.parent_path LIKE grp.parent_path || '%%'
+                  LEFT JOIN medical_icd10 code ON code.group_id = sub.id
+                 WHERE grp.id IN %s
+              GROUP BY grp.id
+            """, [group_ids])
+            counts = {group_id: (direct, total) for group_id, direct, total in self.env.cr.fetchall()}
         for group in self:
-            # Count ICD-10 codes in this group and all child groups
-            child_groups = self.search([('parent_path', '=like', group.parent_path + '%')])
-            group.total_icd10_count = self.env['medical.icd10'].search_count([('group_id', 'in', child_groups.ids)])
+            group.icd10_count, group.total_icd10_count = counts.get(group.id, (0, 0))
 
     @api.constrains('parent_id')
     def _check_parent_recursion(self):
@@ -81,13 +96,106 @@ class MedicalIcd10(models.Model):
             else:
                 rec.display_name = rec.code or rec.description
 
+    def init(self):
+        """Create the indexes used by :meth:`search_ranked`.
+
+        The description index is built per active language on the unaccented,
+        lowercased translation, so it is recreated when the module is updated
+        after a new language is activated.
+        """
+        cr = self.env.cr
+        if self.env.registry.has_unaccent:
+            cr.execute("""
+                CREATE OR REPLACE FUNCTION medical_icd10_unaccent(text) RETURNS text
+                AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+                LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+            """)
+        else:
+            cr.execute("""
+                CREATE OR REPLACE FUNCTION medical_icd10_unaccent(text) RETURNS text
+                AS $$ SELECT $1 $$
+                LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+            """)
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS medical_icd10_code_prefix_idx
+                ON medical_icd10 (upper(code) text_pattern_ops)
+        """)
+        if not self.env.registry.has_trigram:
+            return
+        for lang in self.env['res.lang'].with_context(active_test=True).search([]).mapped('code'):
+            cr.execute(SQL(
+                "CREATE INDEX IF NOT EXISTS %s ON medical_icd10 USING gin ((%s) gin_trgm_ops)",
+                SQL.identifier('medical_icd10_description_%s_trgm_idx' % lang.lower()),
+                self._description_search_expr(lang),
+            ))
+
+    @api.model
+    def _description_search_expr(self, lang):
+        # Must match the expression of the per-language trigram indexes created in init()
+        return SQL(
+            "medical_icd10_unaccent(lower(COALESCE(description->>%s, description->>'en_US')))",
+            lang,
+        )
+
+    @api.model
+    def search_ranked(self, term, domain=None, limit=20):
+        """Search ICD-10 codes for autocompletion.
+
+        Matches codes starting with ``term`` and descriptions containing it,
+        ignoring case and accents, in the user language. Exact codes rank
+        first, then code prefixes, then the closest descriptions.
+
+        :return: ``medical.icd10`` recordset in rank order
+        """
+        term = (term or '').strip()
+        if not term:
+            return self.search(domain or [], limit=limit)
+        self.flush_model(['code', 'description'])
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        code_prefix = escaped.upper() + '%'
+        description = self._description_search_expr(self.env.lang or 'en_US')
+        normalized_term = SQL("medical_icd10_unaccent(lower(%s))", term)
+        similarity = SQL("similarity(%s, %s) DESC,", description, normalized_term) \
+            if self.env.registry.has_trigram else SQL("")
+        self.env.cr.execute(SQL("""
+            SELECT id
+              FROM medical_icd10
+             WHERE id IN %s
+               AND (upper(code) LIKE %s
+                    OR %s LIKE '%%' || medical_icd10_unaccent(lower(%s)) || '%%')
+          ORDER BY upper(code) = %s DESC,
+                   upper(code) LIKE %s DESC,
+                   %s
+                   code
+             LIMIT %s
+        """, self._search(domain or []).subselect(), code_prefix,
+            description, escaped,
+            term.upper(), code_prefix, similarity, limit))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _name_search(self, name, domain=None, operator='ilike', limit=None, order=None):
+        """Use the ranked, index-backed search for many2one autocompletion"""
+        if name and operator == 'ilike':
+            return self.search_ranked(name, domain, limit=limit).ids
+        return super()._name_search(name, domain, operator, limit=limit, order=order)
+
 
 class MedicalHistory(models.Model):
     _name = 'medical.history'
     _description = 'Patient History Entry'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['medical.tracking.mixin', 'mail.activity.mixin', 'medical.fulltext.mixin']
     _order = 'date_record desc, id desc'
 
+    _tracking_groups = {
+        'clinical': ['category', 'icd10_id', 'name'],
+    }
+
+    _fulltext_fields = {
+        'name': 'A',
+        'description': 'B',
+    }
+
     partner_id = fields.Many2one('res.partner', string='Patient', required=True, index=True, ondelete='restrict')
 
     category = fields.Selection(
@@ -132,6 +240,17 @@ class MedicalHistory(models.Model):
         raise UserError(_('History entries cannot be deleted. Set status to "Inactive" or "Resolved" instead.'))
 
 
+def _birthday_keys(days):
+    """Return the sorted (month, day) birthdays whose age changes on one of ``days``"""
+    keys = set()
+    for day in days:
+        keys.add((day.month, day.day))
+        # Patients born on February 29 get one year older on March 1 in common years
+        if (day.month, day.day) == (3, 1) and not calendar.isleap(day.year):
+            keys.add((2, 29))
+    return sorted(keys)
+
+
 class ResPartner(models.Model):
     _inherit = 'res.partner'
 
@@ -167,3 +286,81 @@ class ResPartner(models.Model):
                 record.age = today.year - record.birthdate_date.year - ((today.month, today.day) < (record.birthdate_date.month, record.birthdate_date.day))
             else:
                 record.age = 0
+
+    def init(self):
+        super().init()
+        # Birthday lookups of _cron_update_patient_ages
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS res_partner_birthday_idx
+                ON res_partner ((extract(month FROM birthdate_date)), (extract(day FROM birthdate_date)))
+             WHERE birthdate_date IS NOT NULL
+        """)
+
+    def _recompute_age(self):
+        self.env.add_to_compute(self._fields['age'], self)
+        self.flush_recordset(['age'])
+
+    @api.model
+    def _get_birthday_partner_ids(self, birthdays, after_id, limit):
+        """Return up to ``limit`` ids of partners born on ``birthdays``, after ``after_id``
+
+        :param birthdays: list of (month, day) tuples, or None for every partner with a birth date
+        :return: tuple (ids, number of matching partners left including the returned ones)
+        """
+        birthday_filter = SQL("")
+        if birthdays is not None:
+            if not birthdays:
+                return [], 0
+            birthday_filter = SQL(
+                "AND (extract(month FROM birthdate_date), extract(day FROM birthdate_date)) IN %s",
+                tuple(birthdays),
+            )
+        self.env.cr.execute(SQL("""
+            SELECT id, count(*) OVER ()
+              FROM res_partner
+             WHERE birthdate_date IS NOT NULL
+               %s
+               AND id > %s
+          ORDER BY id
+             LIMIT %s
+        """, birthday_filter, after_id, limit))
+        rows = self.env.cr.fetchall()
+        return [row[0] for row in rows], (rows[0][1] if rows else 0)
+
+    @api.model
+    def _cron_update_patient_ages(self, batch_size=5000):
+        """Refresh the stored ages of the patients whose birthday passed since the last run.
+
+        Only partners born on the days elapsed since the last run are
+        recomputed, with their consultations. On the first run, or after more
+        than a year of downtime, every partner with a birth date is caught up.
+        Each run handles at most ``batch_size`` partners and reports the
+        remaining ones, so the scheduler resumes the catch-up right away.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        today = fields.Date.today()
+        last_update = fields.Date.to_date(params.get_param('odoo_medical.age_last_update'))
+        if last_update and last_update >= today:
+            return
+
+        # Resume an interrupted catch-up of the same day
+        cursor_date, __, cursor_id = (params.get_param('odoo_medical.age_update_cursor') or '').partition(':')
+        after_id = int(cursor_id) if cursor_date == fields.Date.to_string(today) else 0
+
+        birthdays = None
+        if last_update and (today - last_update).days <= 366:
+            birthdays = _birthday_keys(
+                last_update + timedelta(days=offset) for offset in range(1, (today - last_update).days + 1))
+        partner_ids, matching = self._get_birthday_partner_ids(birthdays, after_id, batch_size)
+
+        if partner_ids:
+            self.browse(partner_ids)._recompute_age()
+            self.env['medical.consultation'].search([('patient_id', 'in', partner_ids)])._recompute_age()
+
+        remaining = matching - len(partner_ids)
+        if remaining:
+            params.set_param('odoo_medical.age_update_cursor', '%s:%s' % (fields.Date.to_string(today), partner_ids[-1]))
+        else:
+            params.set_param('odoo_medical.age_update_cursor', False)
+            params.set_param('odoo_medical.age_last_update', fields.Date.to_string(today))
+        self.env['ir.cron']._notify_progress(done=len(partner_ids), remaining=remaining)
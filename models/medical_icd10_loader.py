@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import logging
+
+from odoo import models, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+CATALOGUE_COLUMNS = ('kind', 'code', 'parent', 'name', 'description')
+
+
+class MedicalIcd10Loader(models.AbstractModel):
+    """Bulk loader for the full ICD-10 catalogue.
+
+    The catalogue is a CSV or TSV file with a header row and the columns:
+
+    * ``kind``: ``group`` or ``code``
+    * ``code``: group code (e.g. ``A1``) or ICD-10 code (e.g. ``A15.0``)
+    * ``parent``: code of the parent group (groups) or of the group the code belongs to
+    * ``name``: group name or code description, in the catalogue language
+    * ``description``: optional long description of a group
+
+    Rows are streamed into a temporary table with ``COPY`` and upserted on
+    ``code``, so loading the same file again only updates what changed.
+    """
+    _name = 'medical.icd10.loader'
+    _description = 'ICD-10 Catalogue Loader'
+
+    # Number of rows sent to PostgreSQL per COPY
+    _copy_chunk_size = 5000
+
+    @api.model
+    def load_catalogue(self, fileobj, lang='es_EC', delimiter=None):
+        """Load an ICD-10 catalogue file into ``medical.icd10`` and ``medical.icd10.group``
+
+        :param fileobj: text file object opened on the catalogue
+        :param lang: language of the names in the file. New groups and codes
+            get the names in ``en_US`` too, existing ones only in ``lang``.
+        :param delimiter: column delimiter, sniffed from the header when omitted
+        :return: dict with the number of ``groups`` and ``codes`` loaded
+        """
+        header = fileobj.readline()
+        if not delimiter:
+            delimiter = '\t' if '\t' in header else ','
+        columns = [column.strip().lower() for column in next(csv.reader([header], delimiter=delimiter))]
+        missing = set(CATALOGUE_COLUMNS[:4]) - set(columns)
+        if missing:
+            raise UserError(_('The ICD-10 catalogue is missing the columns: %s', ', '.join(sorted(missing))))
+
+        cr = self.env.cr
+        cr.execute("DROP TABLE IF EXISTS medical_icd10_import")
+        cr.execute("""
+            CREATE TEMP TABLE medical_icd10_import (
+                seq serial,
+                kind varchar,
+                code varchar,
+                parent varchar,
+                name varchar,
+                description text
+            ) ON COMMIT DROP
+        """)
+        reader = csv.DictReader(fileobj, fieldnames=columns, delimiter=delimiter)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter='\t', quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+        pending = 0
+        for row in reader:
+            kind = (row.get('kind') or '').strip().lower()
+            code = (row.get('code') or '').strip()
+            if kind not in ('group', 'code') or not code:
+                continue
+            writer.writerow([
+                kind,
+                code,
+                (row.get('parent') or '').strip(),
+                (row.get('name') or '').strip(),
+                (row.get('description') or '').strip(),
+            ])
+            pending += 1
+            if pending >= self._copy_chunk_size:
+                self._copy_import_chunk(buffer)
+                pending = 0
+        if pending:
+            self._copy_import_chunk(buffer)
+
+        self.env.flush_all()
+        params = {'lang': lang, 'uid': self.env.uid}
+        groups = self._upsert_groups(params)
+        codes = self._upsert_codes(params)
+        self.env.invalidate_all()
+        _logger.info("ICD-10 catalogue loaded: %s groups, %s codes", groups, codes)
+        return {'groups': groups, 'codes': codes}
+
+    def _copy_import_chunk(self, buffer):
+        buffer.seek(0)
+        self.env.cr._obj.copy_expert(
+            "COPY medical_icd10_import (kind, code, parent, name, description) "
+            "FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t', NULL '')",
+            buffer,
+        )
+        buffer.seek(0)
+        buffer.truncate()
+
+    def _upsert_groups(self, params):
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO medical_icd10_group (code, name, description, sequence,
+                                             create_uid, create_date, write_uid, write_date)
+                 SELECT DISTINCT ON (code) code,
+                        jsonb_build_object('en_US', name, %(lang)s, name),
+                        CASE WHEN description IS NULL THEN NULL
+                             ELSE jsonb_build_object('en_US', description, %(lang)s, description) END,
+                        seq, %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+                   FROM medical_icd10_import
+                  WHERE kind = 'group'
+                    AND name IS NOT NULL
+               ORDER BY code, seq DESC
+            ON CONFLICT (code) DO UPDATE
+                    SET name = medical_icd10_group.name || jsonb_build_object(%(lang)s, EXCLUDED.name->>%(lang)s),
+                        description = CASE WHEN EXCLUDED.description IS NULL THEN medical_icd10_group.description
+                                           ELSE COALESCE(medical_icd10_group.description, '{}'::jsonb)
+                                                || jsonb_build_object(%(lang)s, EXCLUDED.description->>%(lang)s) END,
+                        write_uid = EXCLUDED.write_uid,
+                        write_date = EXCLUDED.write_date
+        """, params)
+        count = cr.rowcount
+
+        # Link each group to the parent of its last row, or unlink it when
+        # the file no longer gives it a known parent
+        cr.execute("""
+            UPDATE medical_icd10_group grp
+               SET parent_id = parent.id
+              FROM (SELECT DISTINCT ON (code) code, parent
+                      FROM medical_icd10_import
+                     WHERE kind = 'group'
+                  ORDER BY code, seq DESC) imp
+         LEFT JOIN medical_icd10_group parent ON parent.code = imp.parent
+             WHERE grp.code = imp.code
+               AND grp.parent_id IS DISTINCT FROM parent.id
+               AND grp.id IS DISTINCT FROM parent.id
+        """)
+
+        # Rebuild parent_path for the whole hierarchy in one statement
+        cr.execute("""
+            WITH RECURSIVE tree (id, path) AS (
+                SELECT id, id::varchar || '/'
+                  FROM medical_icd10_group
+                 WHERE parent_id IS NULL
+                 UNION ALL
+                SELECT child.id, tree.path || child.id || '/'
+                  FROM medical_icd10_group child
+                  JOIN tree ON child.parent_id = tree.id
+            )
+            UPDATE medical_icd10_group grp
+               SET parent_path = tree.path
+              FROM tree
+             WHERE grp.id = tree.id
+               AND grp.parent_path IS DISTINCT FROM tree.path
+        """)
+
+        # Same value as MedicalIcd10Group._compute_display_name, in the catalogue language
+        cr.execute("""
+            UPDATE medical_icd10_group grp
+               SET display_name = CASE WHEN grp.code IS NOT NULL
+                                       THEN grp.code || ' - ' || COALESCE(grp.name->>%(lang)s, grp.name->>'en_US')
+                                       ELSE COALESCE(grp.name->>%(lang)s, grp.name->>'en_US') END
+              FROM medical_icd10_import imp
+             WHERE imp.kind = 'group'
+               AND grp.code = imp.code
+        """, params)
+        return count
+
+    def _upsert_codes(self, params):
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO medical_icd10 (code, description, group_id,
+                                       create_uid, create_date, write_uid, write_date)
+                 SELECT DISTINCT ON (imp.code) imp.code,
+                        jsonb_build_object('en_US', imp.name, %(lang)s, imp.name),
+                        grp.id,
+                        %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+                   FROM medical_icd10_import imp
+              LEFT JOIN medical_icd10_group grp ON grp.code = imp.parent
+                  WHERE imp.kind = 'code'
+                    AND imp.name IS NOT NULL
+               ORDER BY imp.code, imp.seq DESC
+            ON CONFLICT (code) DO UPDATE
+                    SET description = medical_icd10.description || jsonb_build_object(%(lang)s, EXCLUDED.description->>%(lang)s),
+                        group_id = COALESCE(EXCLUDED.group_id, medical_icd10.group_id),
+                        write_uid = EXCLUDED.write_uid,
+                        write_date = EXCLUDED.write_date
+        """, params)
+        count = cr.rowcount
+
+        # Same value as MedicalIcd10._compute_display_name, in the catalogue language
+        cr.execute("""
+            UPDATE medical_icd10 icd
+               SET display_name = icd.code || ' - ' || COALESCE(icd.description->>%(lang)s, icd.description->>'en_US')
+              FROM medical_icd10_import imp
+             WHERE imp.kind = 'code'
+               AND icd.code = imp.code
+        """, params)
+        return count
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.tools import SQL, split_every
+
+
+class MedicalInvoiceMixin(models.AbstractModel):
+    """Shared invoicing engine for billable medical records.
+
+    Inheriting models must define an ``invoice_id`` many2one to
+    ``account.move`` and implement ``_get_invoice_journal``,
+    ``_check_invoiceable`` and ``_prepare_invoice_line_vals``.
+    """
+    _name = 'medical.invoice.mixin'
+    _description = 'Medical Invoicing Mixin'
+
+    # Number of invoices sent to a single account.move.create() call
+    _invoice_batch_size = 200
+
+    def _get_invoice_journal(self):
+        """Return the journal used to invoice this record (may be empty)"""
+        self.ensure_one()
+        return self.env['account.journal']
+
+    def _get_invoice_company(self):
+        """Return the company the invoice of this record belongs to"""
+        self.ensure_one()
+        journal = self._get_invoice_journal()
+        if journal:
+            return journal.company_id
+        if 'company_id' in self._fields and self.company_id:
+            return self.company_id
+        return self.env.company
+
+    def _check_invoiceable(self):
+        """Raise if any record in self cannot be invoiced"""
+        return True
+
+    def _get_invoice_grouping_key(self):
+        self.ensure_one()
+        return (self.patient_id.id, self._get_invoice_journal().id, self._get_invoice_company().id)
+
+    @api.model
+    def _prepare_invoice_vals(self, patient_id, journal_id, company_id, records):
+        """Return the values of one invoice billing all ``records``"""
+        origin = ', '.join(records.mapped('name'))
+        vals = {
+            'move_type': 'out_invoice',
+            'partner_id': patient_id,
+            'company_id': company_id,
+            'invoice_date': fields.Date.context_today(self),
+            'invoice_origin': origin,
+            'ref': origin,
+            'invoice_line_ids': [(0, 0, record._prepare_invoice_line_vals()) for record in records],
+        }
+        if journal_id:
+            vals['journal_id'] = journal_id
+        return vals
+
+    def _create_invoices(self):
+        """Create one invoice per patient, journal and company for the records in self.
+
+        Records already linked to an invoice are skipped. Invoice values are built
+        in memory and created in batches, then the records of each batch are linked
+        to their invoices with a single UPDATE.
+
+        :return: the created ``account.move`` records
+        """
+        records = self.filtered(lambda r: not r.invoice_id)
+        if not records:
+            return self.env['account.move']
+        records._check_invoiceable()
+
+        groups = {}
+        for record in records:
+            key = record._get_invoice_grouping_key()
+            groups.setdefault(key, self.browse())
+            groups[key] |= record
+
+        invoices = self.env['account.move']
+        for batch in split_every(self._invoice_batch_size, list(groups.items())):
+            vals_list = [
+                self._prepare_invoice_vals(patient_id, journal_id, company_id, group)
+                for (patient_id, journal_id, company_id), group in batch
+            ]
+            batch_invoices = self.env['account.move'].create(vals_list)
+            self._link_invoices([group for key, group in batch], batch_invoices)
+            invoices |= batch_invoices
+        return invoices
+
+    def _link_invoices(self, groups, invoices):
+        """Set the ``invoice_id`` of each group of records in ``groups`` to the
+        invoice at the same position in ``invoices``, in one statement"""
+        records = self.browse().union(*groups)
+        records.flush_recordset(['invoice_id'])
+        self.env.cr.execute(SQL("""
+            UPDATE %(table)s record
+               SET invoice_id = link.invoice_id, write_date = %(now)s, write_uid = %(uid)s
+              FROM (VALUES %(links)s) AS link (id, invoice_id)
+             WHERE record.id = link.id
+        """, table=SQL.identifier(self._table), now=self.env.cr.now(), uid=self.env.uid, links=SQL(', ').join(
+            SQL("(%s, %s)", record_id, invoice.id)
+            for group, invoice in zip(groups, invoices)
+            for record_id in group.ids
+        )))
+        records.invalidate_recordset(['invoice_id', 'write_date', 'write_uid'])
+        records.modified(['invoice_id'])
+
+    def _get_invoices_action(self, invoices):
+        """Return an action displaying ``invoices``"""
+        if len(invoices) == 1:
+            return {
+                'name': _('Invoice'),
+                'type': 'ir.actions.act_window',
+                'res_model': 'account.move',
+                'res_id': invoices.id,
+                'view_mode': 'form',
+                'target': 'current',
+            }
+        return {
+            'name': _('Invoices'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'domain': [('id', 'in', invoices.ids)],
+            'view_mode': 'list,form',
+            'target': 'current',
+        }
+
+    def action_create_invoices(self):
+        """Invoice all selected records, used by the list view server actions"""
+        invoices = self._create_invoices()
+        if not invoices:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'message': _('All selected records are already invoiced.'),
+                    'type': 'warning',
+                }
+            }
+        return self._get_invoices_action(invoices)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+from odoo.tools.sql import make_identifier
+
+# Source models of the revenue report, in the order of their id offset
+REVENUE_SOURCES = [
+    ('medical.consultation', 'Consultation'),
+    ('medical.therapy', 'Therapy'),
+    ('medical.xray.order', 'X-ray Order'),
+]
+
+
+class MedicalRevenueReport(models.Model):
+    """Billing of consultations, therapies and X-ray orders in one place.
+
+    One row per billable record, with its amount, the invoice it is billed on
+    and the amount posted. The report is a view over the three source tables:
+    the filters on date, company, patient and doctor are pushed down to
+    indexes of the source tables. The company is the billing company of the
+    source record. The service date is taken in the clinic timezone
+    (``odoo_medical.clinic_tz``), like the consultation analysis.
+    """
+    _name = 'medical.revenue.report'
+    _description = 'Medical Revenue Analysis'
+    _auto = False
+    _rec_name = 'name'
+    _order = 'date desc, id desc'
+
+    res_model = fields.Selection(REVENUE_SOURCES, string='Source', readonly=True)
+    res_id = fields.Integer(string='Source ID', readonly=True)
+    name = fields.Char(string='Reference', readonly=True)
+    date = fields.Date(string='Service Date', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    patient_id = fields.Many2one('res.partner', string='Patient', readonly=True)
+    doctor_id = fields.Many2one('res.users', string='Doctor', readonly=True)
+    invoice_id = fields.Many2one('account.move', string='Invoice', readonly=True)
+    invoice_date = fields.Date(string='Invoice Date', readonly=True)
+    invoice_state = fields.Selection([
+        ('not_invoiced', 'Not Invoiced'),
+        ('draft', 'Draft'),
+        ('posted', 'Posted'),
+        ('cancel', 'Cancelled'),
+    ], string='Invoice Status', readonly=True)
+    payment_state = fields.Selection(
+        selection=lambda self: self.env['account.move']._fields['payment_state'].selection,
+        string='Payment Status', readonly=True)
+    amount = fields.Float(string='Amount', readonly=True)
+    posted_amount = fields.Float(string='Posted Amount', readonly=True)
+
+    @api.model
+    def _local_date(self, column):
+        tz = self.env['medical.settings'].get_param('odoo_medical.clinic_tz') or 'UTC'
+        return SQL("((%s AT TIME ZONE 'UTC' AT TIME ZONE %s)::date)", column, tz)
+
+    @api.model
+    def _query(self):
+        invoice_columns = SQL("""
+                   move.id AS invoice_id,
+                   move.invoice_date,
+                   COALESCE(move.state, 'not_invoiced') AS invoice_state,
+                   move.payment_state
+        """)
+        return SQL("""
+            SELECT c.id * 3 AS id, 'medical.consultation' AS res_model, c.id AS res_id, c.name,
+                   %(consultation_date)s AS date,
+                   c.company_id,
+                   c.patient_id, c.doctor_id, %(invoice_columns)s,
+                   c.total_to_pay AS amount,
+                   CASE WHEN move.state = 'posted' THEN c.total_to_pay ELSE 0 END AS posted_amount
+              FROM medical_consultation c
+         LEFT JOIN account_move move ON move.id = c.invoice_id
+             UNION ALL
+            SELECT t.id * 3 + 1, 'medical.therapy', t.id, t.name,
+                   t.therapy_date,
+                   t.company_id,
+                   t.patient_id, t.attending_physician_id, %(invoice_columns)s,
+                   t.price,
+                   CASE WHEN move.state = 'posted' THEN t.price ELSE 0 END
+              FROM medical_therapy t
+         LEFT JOIN account_move move ON move.id = t.invoice_id
+             UNION ALL
+            SELECT x.id * 3 + 2, 'medical.xray.order', x.id, x.name,
+                   %(xray_date)s,
+                   x.company_id,
+                   x.patient_id, NULL, %(invoice_columns)s,
+                   x.total_price,
+                   CASE WHEN move.state = 'posted' THEN x.total_price ELSE 0 END
+              FROM medical_xray_order x
+         LEFT JOIN account_move move ON move.id = x.invoice_id
+        """,
+            consultation_date=self._local_date(SQL('c.consultation_date')),
+            xray_date=self._local_date(SQL('x.date')),
+            invoice_columns=invoice_columns,
+        )
+
+    def init(self):
+        cr = self.env.cr
+        tz = self.env['medical.settings'].get_param('odoo_medical.clinic_tz') or 'UTC'
+        # Service dates of consultations and X-ray orders, in the clinic
+        # timezone. The indexes are named after the timezone, the indexes of
+        # a previous timezone are replaced.
+        for table, column in [('medical_consultation', 'consultation_date'), ('medical_xray_order', 'date')]:
+            prefix = '%s_local_date_' % table
+            index_name = make_identifier(prefix + re.sub(r'\W', '_', tz.lower()))
+            cr.execute(SQL(
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname LIKE %s",
+                table, prefix.replace('_', r'\_') + '%',
+            ))
+            existing = {row[0] for row in cr.fetchall()}
+            for name in existing - {index_name}:
+                cr.execute(SQL("DROP INDEX %s", SQL.identifier(name)))
+            if index_name not in existing:
+                expression = self._local_date(SQL.identifier(column))
+                cr.execute(SQL("CREATE INDEX %s ON %s (%s)", SQL.identifier(index_name), SQL.identifier(table), expression))
+        tools.drop_view_if_exists(cr, self._table)
+        cr.execute(SQL("CREATE VIEW %s AS (%s)", SQL.identifier(self._table), self._query()))
+
+    def action_open_source(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+        }
@@ -6,9 +6,14 @@ from odoo import models, fields, api
 class MedicalSessionRecord(models.Model):
     _name = 'medical.session.record'
     _description = 'Medical Session Record'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'medical.fulltext.mixin']
     _order = 'therapy_id, session_sequence, entry_datetime desc'
 
+    _fulltext_fields = {
+        'evolution': 'A',
+        'observations': 'B',
+    }
+
     name = fields.Char(
         string='Record Name',
         compute='_compute_name',
@@ -82,6 +87,7 @@ class MedicalSessionRecord(models.Model):
         related='therapy_id.patient_id',
         string='Patient',
         store=True,
+        index=True,
         help='Patient receiving the therapy'
     )
     
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api, tools
+
+MEDICAL_PARAM_PREFIX = 'odoo_medical.'
+
+
+class MedicalSettings(models.AbstractModel):
+    """Cached access to the ``odoo_medical.*`` system parameters.
+
+    All medical parameters are loaded with a single query and kept in the
+    registry ormcache, so record defaults and computes do not hit
+    ``ir.config_parameter`` once per field and per record. The cache is
+    cleared whenever a system parameter or the settings form is saved.
+    """
+    _name = 'medical.settings'
+    _description = 'Medical Settings'
+
+    @api.model
+    @tools.ormcache()
+    def _get_params(self):
+        params = self.env['ir.config_parameter'].sudo().search_read(
+            [('key', '=like', MEDICAL_PARAM_PREFIX + '%')], ['key', 'value'])
+        return tools.frozendict((param['key'], param['value']) for param in params)
+
+    @api.model
+    def get_param(self, key, default=False):
+        """Return the value of the medical parameter ``key``"""
+        return self._get_params().get(key, default)
+
+    @api.model
+    def get_id_param(self, key):
+        """Return the record id stored in the medical parameter ``key``, or False"""
+        value = self.get_param(key)
+        try:
+            return int(value) if value else False
+        except ValueError:
+            return False
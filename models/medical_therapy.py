@@ -8,16 +8,20 @@ from datetime import datetime
 class MedicalTherapy(models.Model):
     _name = 'medical.therapy'
     _description = 'Medical Therapy'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['medical.tracking.mixin', 'mail.activity.mixin', 'medical.invoice.mixin']
     _order = 'therapy_date desc, name'
 
+    _tracking_groups = {
+        'clinical': ['affected_apparatus_id', 'treatment_id'],
+    }
+
     name = fields.Char(
         string='Therapy Reference',
         required=True,
         copy=False,
         readonly=True,
-        default=lambda self: self.env['ir.sequence'].next_by_code('medical.therapy') or 'New',
-        help='Unique reference for this therapy'
+        default='New',
+        help='Unique reference for this therapy, assigned when the therapy is saved'
     )
     
     patient_id = fields.Many2one(
@@ -25,6 +29,7 @@ class MedicalTherapy(models.Model):
         string='Patient',
         required=True,
         tracking=True,
+        index=True,
         help='Patient receiving the therapy'
     )
     
@@ -33,6 +38,7 @@ class MedicalTherapy(models.Model):
         required=True,
         default=fields.Date.context_today,
         tracking=True,
+        index=True,
         help='Date when the therapy is scheduled'
     )
     
@@ -89,7 +95,7 @@ class MedicalTherapy(models.Model):
     
     total_sessions = fields.Integer(
         string='Total Sessions',
-        compute='_compute_session_stats',
+        compute='_compute_total_sessions',
         store=True,
         help='Total number of sessions in this therapy'
     )
@@ -111,6 +117,7 @@ class MedicalTherapy(models.Model):
     attending_physician_id = fields.Many2one(
         comodel_name='res.users',
         string='Attending Physician',
+        index=True,
         help='Physician responsible for this therapy'
     )
     
@@ -137,6 +144,16 @@ class MedicalTherapy(models.Model):
         string='Therapy Journal',
         help='Journal for therapy invoicing'
     )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        compute='_compute_company_id',
+        store=True,
+        readonly=False,
+        precompute=True,
+        index=True,
+        help='Company billing the therapy, the company of its journal by default'
+    )
     
     # Invoice tracking
     invoice_id = fields.Many2one(
@@ -151,13 +168,41 @@ class MedicalTherapy(models.Model):
         readonly=True
     )
     
-    @api.depends('session_record_ids', 'session_record_ids.state')
+    def _count_session_records(self, domain=None):
+        """Count the session records of the therapies in self with one grouped query.
+
+        Unsaved therapies (e.g. in onchange) are counted from their in-memory lines.
+
+        :return: dict mapping each therapy to its number of matching session records
+        """
+        stored = self.filtered('id')
+        counts = {}
+        if stored:
+            groups = self.env['medical.session.record']._read_group(
+                [('therapy_id', 'in', stored.ids)] + (domain or []), ['therapy_id'], ['__count'])
+            counts = {therapy.id: count for therapy, count in groups}
+        result = {}
+        for record in self:
+            if record.id:
+                result[record] = counts.get(record.id, 0)
+            else:
+                result[record] = len(record.session_record_ids.filtered_domain(domain or []))
+        return result
+    
+    @api.depends('session_record_ids')
+    def _compute_total_sessions(self):
+        totals = self._count_session_records()
+        for record in self:
+            record.total_sessions = totals[record]
+    
+    @api.depends('total_sessions', 'session_record_ids.state')
     def _compute_session_stats(self):
+        # A state change only touches the completed counter, total_sessions is left as is
+        completed_counts = self._count_session_records([('state', '=', 'completed')])
         for record in self:
-            total = len(record.session_record_ids)
-            completed = len(record.session_record_ids.filtered(lambda s: s.state == 'completed'))
+            total = record.total_sessions
+            completed = completed_counts[record]
             
-            record.total_sessions = total
             record.completed_sessions = completed
             record.progress_percentage = (completed / total * 100) if total > 0 else 0.0
     
@@ -186,64 +231,74 @@ class MedicalTherapy(models.Model):
         """Load default values for therapy fields"""
         res = super(MedicalTherapy, self).default_get(fields_list)
         
-        # Load default therapy product
-        if 'therapy_product_id' in fields_list:
-            default_product = self.env['ir.config_parameter'].sudo().get_param(
-                'odoo_medical.default_therapy_product_id'
-            )
-            if default_product:
-                res['therapy_product_id'] = int(default_product)
-        
-        # Load default therapy tax
-        if 'therapy_tax_id' in fields_list:
-            default_tax = self.env['ir.config_parameter'].sudo().get_param(
-                'odoo_medical.default_therapy_tax_id'
-            )
-            if default_tax:
-                res['therapy_tax_id'] = int(default_tax)
-        
-        # Load default therapy journal
-        if 'therapy_journal_id' in fields_list:
-            default_journal = self.env['ir.config_parameter'].sudo().get_param(
-                'odoo_medical.default_therapy_journal_id'
-            )
-            if default_journal:
-                res['therapy_journal_id'] = int(default_journal)
+        settings = self.env['medical.settings']
+        for field_name in ('therapy_product_id', 'therapy_tax_id', 'therapy_journal_id'):
+            if field_name in fields_list:
+                default_id = settings.get_id_param('odoo_medical.default_%s' % field_name)
+                if default_id:
+                    res[field_name] = default_id
         
         return res
     
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', 'New') == 'New':
-                vals['name'] = self.env['ir.sequence'].next_by_code('medical.therapy') or 'New'
+        pending = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        names = self.env['ir.sequence'].next_batch_by_code('medical.therapy', len(pending))
+        for vals, name in zip(pending, names):
+            vals['name'] = name or 'New'
         
         therapies = super(MedicalTherapy, self).create(vals_list)
         
         # Create session records if treatment is specified
-        for therapy in therapies:
-            if therapy.treatment_id:
-                therapy._create_session_records()
+        therapies.filtered('treatment_id')._create_session_records()
         
         return therapies
     
+    @api.model
+    def create_from_treatment(self, patients, treatment, values=None):
+        """Create one therapy per patient following the given treatment protocol.
+
+        :param patients: ``res.partner`` recordset of the patients to treat
+        :param treatment: ``medical.treatment`` record to apply
+        :param values: optional dict of extra field values shared by all
+                       therapies (e.g. ``affected_apparatus_id``)
+        :return: the created therapies, with their session records
+        """
+        treatment.ensure_one()
+        vals_list = [{
+            'price': treatment.price,
+            **(values or {}),
+            'patient_id': patient.id,
+            'treatment_id': treatment.id,
+        } for patient in patients]
+        return self.create(vals_list)
+    
     def _create_session_records(self):
         """Create session records based on treatment sessions"""
-        self.ensure_one()
-        
-        if not self.treatment_id:
+        therapies = self.filtered('treatment_id')
+        if not therapies:
             return
         
+        # Session records are generated from a template: skip chatter and tracking
+        SessionRecord = self.env['medical.session.record'].with_context(tracking_disable=True)
+        
         # Clear existing session records
-        self.session_record_ids.unlink()
+        therapies.session_record_ids.unlink()
         
         # Create new session records
-        for session in self.treatment_id.session_ids.sorted('sequence'):
-            self.env['medical.session.record'].create({
-                'therapy_id': self.id,
-                'session_id': session.id,
-                'state': 'draft',
-            })
+        sessions_by_treatment = {
+            treatment: treatment.session_ids.sorted('sequence')
+            for treatment in therapies.treatment_id
+        }
+        vals_list = []
+        for therapy in therapies:
+            for session in sessions_by_treatment[therapy.treatment_id]:
+                vals_list.append({
+                    'therapy_id': therapy.id,
+                    'session_id': session.id,
+                    'state': 'draft',
+                })
+        SessionRecord.create(vals_list)
     
     def action_schedule(self):
         """Mark therapy as scheduled"""
@@ -297,54 +352,38 @@ class MedicalTherapy(models.Model):
             }
         }
     
-    def action_create_invoice(self):
-        """Create an invoice for this therapy"""
+    @api.depends('therapy_journal_id')
+    def _compute_company_id(self):
+        for therapy in self:
+            therapy.company_id = therapy.therapy_journal_id.company_id or therapy.company_id or self.env.company
+
+    def _get_invoice_journal(self):
+        self.ensure_one()
+        return self.therapy_journal_id
+
+    def _check_invoiceable(self):
+        for record in self:
+            if not record.patient_id:
+                raise UserError(_("Patient is required to create an invoice"))
+            if not record.price:
+                raise UserError(_("Price must be set to create an invoice"))
+            if not record.therapy_product_id:
+                raise UserError(_("Therapy product is required to create an invoice"))
+
+    def _prepare_invoice_line_vals(self):
         self.ensure_one()
-        
-        if self.invoice_id:
-            return {
-                'name': 'Therapy Invoice',
-                'type': 'ir.actions.act_window',
-                'view_mode': 'form',
-                'res_model': 'account.move',
-                'res_id': self.invoice_id.id,
-                'target': 'current',
-            }
-        
-        # Validate required fields
-        if not self.patient_id:
-            raise UserError(_("Patient is required to create an invoice"))
-        if not self.price:
-            raise UserError(_("Price must be set to create an invoice"))
-        if not self.therapy_product_id:
-            raise UserError(_("Therapy product is required to create an invoice"))
-        
-        # Prepare invoice values
-        invoice_vals = {
-            'move_type': 'out_invoice',
-            'partner_id': self.patient_id.id,
-            'invoice_date': fields.Date.context_today(self),
-            'invoice_origin': self.name,
-            'journal_id': self.therapy_journal_id.id if self.therapy_journal_id else False,
-            'invoice_line_ids': [(0, 0, {
-                'product_id': self.therapy_product_id.id,
-                'name': f'Medical Therapy - {self.treatment_id.name}' if self.treatment_id else 'Medical Therapy',
-                'quantity': 1,
-                'price_unit': self.price,
-                'tax_ids': [(6, 0, [self.therapy_tax_id.id])] if self.therapy_tax_id else [],
-            })],
-        }
-        
-        # Create the invoice
-        invoice = self.env['account.move'].create(invoice_vals)
-        self.invoice_id = invoice.id
-        
-        # Return action to open the created invoice
         return {
-            'name': 'Therapy Invoice',
-            'type': 'ir.actions.act_window',
-            'view_mode': 'form',
-            'res_model': 'account.move',
-            'res_id': invoice.id,
-            'target': 'current',
+            'product_id': self.therapy_product_id.id,
+            'name': f'Medical Therapy - {self.treatment_id.name}' if self.treatment_id else 'Medical Therapy',
+            'quantity': 1,
+            'price_unit': self.price,
+            'tax_ids': [(6, 0, [self.therapy_tax_id.id])] if self.therapy_tax_id else [],
         }
+
+    def action_create_invoice(self):
+        """Create an invoice for this therapy"""
+        self.ensure_one()
+        invoice = self.invoice_id or self._create_invoices()
+        action = self._get_invoices_action(invoice)
+        action['name'] = 'Therapy Invoice'
+        return action
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+from textwrap import shorten
+
+from markupsafe import Markup
+
+from odoo import models
+
+TRACKING_POLICIES = [
+    ('full', 'Full'),
+    ('summary', 'Summary'),
+    ('off', 'Off'),
+]
+
+# Field groups whose tracking policy is configurable, read from the
+# odoo_medical.tracking_<group> parameters
+TRACKING_GROUPS = ('clinical', 'vitals', 'leave', 'billing')
+
+
+class MedicalTrackingMixin(models.AbstractModel):
+    """Chatter tracking with a configurable policy per field group.
+
+    Inheriting models assign their tracked fields to the groups of
+    ``TRACKING_GROUPS`` in ``_tracking_groups``::
+
+        _tracking_groups = {'vitals': ['weight_kg', 'systolic_pressure']}
+
+    Depending on the policy of its group, a change of a tracked field is:
+
+    * ``full``: logged with one tracking value per field, as usual
+    * ``summary``: logged with the other summary changes of the same save in
+      one message with a compact diff, without tracking values
+    * ``off``: not tracked
+
+    Fields outside the groups are always fully tracked.
+    """
+    _name = 'medical.tracking.mixin'
+    _inherit = ['mail.thread']
+    _description = 'Medical Tracking Policy Mixin'
+
+    _tracking_groups = {}
+
+    def _get_tracking_policies(self):
+        """Return the tracking policy of each grouped field"""
+        settings = self.env['medical.settings']
+        return {
+            field_name: settings.get_param('odoo_medical.tracking_%s' % group, 'full')
+            for group, field_names in self._tracking_groups.items()
+            for field_name in field_names
+        }
+
+    def _track_get_fields(self):
+        tracked = super()._track_get_fields()
+        policies = self._get_tracking_policies()
+        return {field_name for field_name in tracked if policies.get(field_name, 'full') != 'off'}
+
+    def _mail_track(self, tracked_fields, initial_values):
+        policies = self._get_tracking_policies()
+        summary_fields = [field_name for field_name in tracked_fields if policies.get(field_name) == 'summary']
+        if not summary_fields:
+            return super()._mail_track(tracked_fields, initial_values)
+
+        full_fields = {name: desc for name, desc in tracked_fields.items() if name not in summary_fields}
+        changes, tracking_value_ids = super()._mail_track(full_fields, initial_values)
+        diff = []
+        for field_name in summary_fields:
+            if field_name not in initial_values:
+                continue
+            initial_value, new_value = initial_values[field_name], self[field_name]
+            if new_value != initial_value and (new_value or initial_value):
+                diff.append((
+                    tracked_fields[field_name]['string'],
+                    self._tracking_summary_value(field_name, initial_value),
+                    self._tracking_summary_value(field_name, new_value),
+                ))
+        if diff:
+            self._message_log(body=Markup('<ul class="o_medical_tracking_summary">%s</ul>') % Markup().join(
+                Markup('<li>%s: %s &#8594; %s</li>') % change for change in diff))
+        return changes, tracking_value_ids
+
+    def _tracking_summary_value(self, field_name, value):
+        field = self._fields[field_name]
+        if field.type == 'boolean':
+            return self.env._('Yes') if value else self.env._('No')
+        if field.relational:
+            return ', '.join(value.mapped('display_name'))
+        if value is False or value is None:
+            return ''
+        if field.type == 'selection':
+            return dict(field._description_selection(self.env)).get(value, value)
+        return shorten(str(value), width=60, placeholder='...')
@@ -6,8 +6,14 @@ from odoo import models, fields, api
 class MedicalTreatment(models.Model):
     _name = 'medical.treatment'
     _description = 'Medical Treatment'
+    _inherit = ['medical.count.mixin']
     _order = 'name'
 
+    _related_count_fields = {
+        'session_count': 'session_ids',
+        'therapy_count': 'therapy_ids',
+    }
+
     name = fields.Char(
         string='Treatment Name',
         required=True,
@@ -59,7 +65,7 @@ class MedicalTreatment(models.Model):
     
     session_count = fields.Integer(
         string='Sessions Count',
-        compute='_compute_session_count',
+        compute='_compute_related_counts',
         help='Number of sessions in this treatment'
     )
     
@@ -72,15 +78,10 @@ class MedicalTreatment(models.Model):
     
     therapy_count = fields.Integer(
         string='Therapy Count',
-        compute='_compute_therapy_count',
+        compute='_compute_related_counts',
         help='Number of therapies using this treatment'
     )
     
-    @api.depends('session_ids')
-    def _compute_session_count(self):
-        for record in self:
-            record.session_count = len(record.session_ids)
-    
     @api.depends('session_ids.estimated_duration')
     def _compute_total_estimated_duration(self):
         for record in self:
@@ -90,11 +91,6 @@ class MedicalTreatment(models.Model):
             )
             record.total_estimated_duration = total_duration
     
-    @api.depends('therapy_ids')
-    def _compute_therapy_count(self):
-        for record in self:
-            record.therapy_count = len(record.therapy_ids)
-    
     therapy_ids = fields.One2many(
         comodel_name='medical.therapy',
         inverse_name='treatment_id',
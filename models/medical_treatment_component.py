@@ -6,8 +6,13 @@ from odoo import models, fields, api
 class MedicalTreatmentComponent(models.Model):
     _name = 'medical.treatment.component'
     _description = 'Medical Treatment Component'
+    _inherit = ['medical.count.mixin']
     _order = 'sequence, name'
 
+    _related_count_fields = {
+        'session_count': 'session_ids',
+    }
+
     name = fields.Char(
         string='Component Name',
         required=True,
@@ -55,15 +60,10 @@ class MedicalTreatmentComponent(models.Model):
     
     session_count = fields.Integer(
         string='Sessions Count',
-        compute='_compute_session_count',
+        compute='_compute_related_counts',
         help='Number of sessions using this component'
     )
     
-    @api.depends('session_ids')
-    def _compute_session_count(self):
-        for record in self:
-            record.session_count = len(record.session_ids)
-    
     def action_view_sessions(self):
         """Open sessions that use this component"""
         self.ensure_one()
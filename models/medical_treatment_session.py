@@ -6,8 +6,13 @@ from odoo import models, fields, api
 class MedicalTreatmentSession(models.Model):
     _name = 'medical.treatment.session'
     _description = 'Medical Treatment Session'
+    _inherit = ['medical.count.mixin']
     _order = 'sequence, name'
 
+    _related_count_fields = {
+        'component_count': 'treatment_component_ids',
+    }
+
     name = fields.Char(
         string='Session Name',
         required=True,
@@ -58,15 +63,10 @@ class MedicalTreatmentSession(models.Model):
     
     component_count = fields.Integer(
         string='Components Count',
-        compute='_compute_component_count',
+        compute='_compute_related_counts',
         help='Number of components in this session'
     )
     
-    @api.depends('treatment_component_ids')
-    def _compute_component_count(self):
-        for record in self:
-            record.component_count = len(record.treatment_component_ids)
-    
     @api.depends('treatment_component_ids.duration_minutes')
     def _compute_estimated_duration(self):
         for record in self:
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+# Vital signs recorded in the series, as named on the consultation
+VITALS_FIELDS = ['systolic_pressure', 'diastolic_pressure', 'weight_kg']
+
+
+class MedicalVitalsSeries(models.Model):
+    """Vital signs of the patients, one row per measurement.
+
+    Measurements are appended in bulk when consultations are finished, and
+    when the weight of a patient is changed on the patient form. The series
+    of a patient is read from the ``(patient_id, date)`` index, without
+    going through the consultations, see :meth:`get_series`.
+    """
+    _name = 'medical.vitals.series'
+    _description = 'Vital Signs Series'
+    _order = 'date desc, id desc'
+    _rec_name = 'patient_id'
+    _log_access = False
+
+    patient_id = fields.Many2one('res.partner', string='Patient', required=True, ondelete='cascade')
+    date = fields.Datetime(string='Date', required=True, default=fields.Datetime.now)
+    source = fields.Selection([
+        ('consultation', 'Consultation'),
+        ('patient', 'Patient Form'),
+    ], string='Source', required=True, default='patient')
+    consultation_id = fields.Many2one('medical.consultation', string='Consultation', ondelete='cascade')
+    systolic_pressure = fields.Integer(string='Systolic Pressure (mmHg)', aggregator='avg')
+    diastolic_pressure = fields.Integer(string='Diastolic Pressure (mmHg)', aggregator='avg')
+    weight_kg = fields.Float(string='Weight (Kg)', digits=(5, 2), aggregator='avg')
+
+    _sql_constraints = [
+        ('consultation_uniq', 'UNIQUE(consultation_id)', 'A consultation can only be recorded once in the vital signs series!'),
+    ]
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS medical_vitals_series_patient_date_idx
+                ON medical_vitals_series (patient_id, date)
+        """)
+        # Series of the consultations finished before the series existed
+        cr.execute("SELECT 1 FROM medical_vitals_series LIMIT 1")
+        if not cr.fetchone():
+            cr.execute("""
+                INSERT INTO medical_vitals_series
+                       (patient_id, date, source, consultation_id, systolic_pressure, diastolic_pressure, weight_kg)
+                SELECT patient_id, consultation_date, 'consultation', id,
+                       NULLIF(systolic_pressure, 0), NULLIF(diastolic_pressure, 0), NULLIF(weight_kg, 0)
+                  FROM medical_consultation
+                 WHERE state = 'finished'
+                   AND (systolic_pressure > 0 OR diastolic_pressure > 0 OR weight_kg > 0)
+            """)
+
+    @api.model
+    def _append_consultations(self, consultations):
+        """Record the vital signs of the finished ``consultations``, replacing
+        the measurements already recorded for ``consultations``"""
+        self.search([('consultation_id', 'in', consultations.ids)]).unlink()
+        return self.create([{
+            'patient_id': consultation.patient_id.id,
+            'date': consultation.consultation_date,
+            'source': 'consultation',
+            'consultation_id': consultation.id,
+            'systolic_pressure': consultation.systolic_pressure,
+            'diastolic_pressure': consultation.diastolic_pressure,
+            'weight_kg': consultation.weight_kg,
+        } for consultation in consultations
+            if consultation.state == 'finished' and any(consultation[name] for name in VITALS_FIELDS)])
+
+    @api.model
+    def get_series(self, patient_id, date_from=None, date_to=None):
+        """Return the vital signs of a patient as arrays, oldest first.
+
+        Raises if the user cannot read the vital signs series.
+
+        :param date_from: optional lower bound of the measurement dates
+        :param date_to: optional upper bound of the measurement dates
+        :return: dict with the ``dates`` of the measurements and one array of
+                 values per vital sign, ``None`` where it was not measured
+        """
+        self.check_access('read')
+        self.flush_model()
+        # Only the measurements the user can read, under the record rules
+        conditions = [SQL("id IN %s", self._search([('patient_id', '=', patient_id)]).subselect())]
+        if date_from:
+            conditions.append(SQL("date >= %s", fields.Datetime.to_datetime(date_from)))
+        if date_to:
+            conditions.append(SQL("date <= %s", fields.Datetime.to_datetime(date_to)))
+        self.env.cr.execute(SQL("""
+            SELECT array_agg(date ORDER BY date, id),
+                   array_agg(NULLIF(systolic_pressure, 0) ORDER BY date, id),
+                   array_agg(NULLIF(diastolic_pressure, 0) ORDER BY date, id),
+                   array_agg(NULLIF(weight_kg, 0) ORDER BY date, id)
+              FROM medical_vitals_series
+             WHERE %s
+        """, SQL(" AND ").join(conditions)))
+        dates, systolic, diastolic, weight = self.env.cr.fetchone()
+        return {
+            'dates': [fields.Datetime.to_string(date) for date in dates or []],
+            'systolic_pressure': systolic or [],
+            'diastolic_pressure': diastolic or [],
+            'weight_kg': weight or [],
+        }
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+# Default directory of the bundles, inside the filestore of the database
+ARCHIVE_DIRECTORY = 'medical_xray_archive'
+
+
+class MedicalXrayArchive(models.Model):
+    """Cold-storage bundle of X-ray images.
+
+    The archive cron moves the images of the X-ray orders done for more than
+    ``odoo_medical.xray_archive_days`` days out of the filestore, into
+    compressed ZIP bundles written to ``odoo_medical.xray_archive_path``
+    (a directory of the filestore by default). The entries of a bundle are
+    named after the filestore files, which are addressed by checksum.
+
+    Archived attachments keep their ``store_fname``: when the file of an
+    archived attachment is read and is no longer in the filestore, it is
+    restored from its bundle first, see ``ir.attachment._medical_restore``.
+    """
+    _name = 'medical.xray.archive'
+    _description = 'X-ray Cold Storage Bundle'
+    _order = 'id desc'
+
+    # Number of files moved into one bundle
+    _archive_batch_size = 200
+
+    name = fields.Char(string='Name', required=True, readonly=True)
+    path = fields.Char(string='Path', readonly=True)
+    file_count = fields.Integer(string='Files', readonly=True)
+    size_mb = fields.Float(string='Size (MB)', digits=(12, 1), readonly=True)
+    attachment_ids = fields.One2many('ir.attachment', 'medical_archive_id', string='Attachments')
+
+    @api.model
+    def _archive_directory(self):
+        directory = (self.env['medical.settings'].get_param('odoo_medical.xray_archive_path')
+                     or os.path.join(self.env['ir.attachment']._filestore(), ARCHIVE_DIRECTORY))
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @api.model
+    def _archivable_files_query(self, cutoff):
+        """Return the query of the filestore files of the images of the X-ray
+        orders done before ``cutoff`` that are not archived yet"""
+        return SQL("""
+            SELECT DISTINCT attachment.store_fname
+              FROM xray_line_attachment_rel rel
+              JOIN medical_xray_order_line line ON line.id = rel.line_id
+              JOIN medical_xray_order xray_order ON xray_order.id = line.xray_order_id
+              JOIN ir_attachment attachment ON attachment.id = rel.attachment_id
+             WHERE xray_order.state = 'done'
+               AND xray_order.date < %s
+               AND attachment.store_fname IS NOT NULL
+               AND attachment.medical_archive_id IS NULL
+               AND attachment.medical_archive_missing IS NOT TRUE
+        """, cutoff)
+
+    @api.model
+    def _archivable_files(self, cutoff, limit=None):
+        self.env.flush_all()
+        self.env.cr.execute(SQL("%s %s", self._archivable_files_query(cutoff), SQL("LIMIT %s", limit) if limit else SQL()))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _count_archivable_files(self, cutoff):
+        self.env.flush_all()
+        self.env.cr.execute(SQL("SELECT COUNT(*) FROM (%s) files", self._archivable_files_query(cutoff)))
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _cron_archive_images(self):
+        """Move the next batch of old X-ray images into a new bundle"""
+        days = int(self.env['medical.settings'].get_param('odoo_medical.xray_archive_days') or 0)
+        if days <= 0:
+            return
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+        fnames = self._archivable_files(cutoff, limit=self._archive_batch_size)
+        if not fnames:
+            return
+
+        Attachment = self.env['ir.attachment'].sudo()
+        archived = [fname for fname in fnames if os.path.exists(Attachment._full_path(fname))]
+        missing = set(fnames) - set(archived)
+        if missing:
+            # Flagged, so that the next runs do not pick them again
+            _logger.warning("X-ray images %s are missing from the filestore, not archived", ', '.join(sorted(missing)))
+            Attachment.search([('store_fname', 'in', list(missing))]).write({'medical_archive_missing': True})
+
+        if archived:
+            bundle = self.create({'name': '/'})
+            path = os.path.join(self._archive_directory(), 'xray_archive_%s.zip' % bundle.id)
+            # Files are streamed into the bundle, one block at a time
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                for fname in archived:
+                    archive.write(Attachment._full_path(fname), fname)
+            bundle.write({
+                'name': 'xray_archive_%s' % bundle.id,
+                'path': path,
+                'file_count': len(archived),
+                'size_mb': os.path.getsize(path) / (1024 * 1024),
+            })
+            Attachment.search([('store_fname', 'in', archived)]).write({'medical_archive_id': bundle.id})
+
+            # The hot copies are removed once the archival is committed
+            full_paths = [Attachment._full_path(fname) for fname in archived]
+            self.env.cr.postcommit.add(lambda: _remove_hot_copies(full_paths))
+            _logger.info("Archived %s X-ray images into %s", len(archived), path)
+        self.env['ir.cron']._notify_progress(done=len(fnames), remaining=self._count_archivable_files(cutoff))
+
+    def _restore(self, fname, full_path):
+        """Copy the file ``fname`` of the bundle back to ``full_path``"""
+        self.ensure_one()
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Concurrent restores of the same file each write their own copy
+        fd, temporary_path = tempfile.mkstemp(dir=directory, prefix='.restore_')
+        try:
+            with os.fdopen(fd, 'wb') as target, zipfile.ZipFile(self.path) as archive, \
+                    archive.open(fname) as source:
+                shutil.copyfileobj(source, target)
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.unlink(temporary_path)
+            raise
+        _logger.info("Restored X-ray image %s from %s", fname, self.path)
+
+
+def _remove_hot_copies(full_paths):
+    for full_path in full_paths:
+        try:
+            os.unlink(full_path)
+        except OSError:
+            _logger.info("Cannot remove the archived X-ray image %s", full_path, exc_info=True)
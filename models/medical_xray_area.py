@@ -26,3 +26,10 @@ class MedicalXrayArea(models.Model):
         translate=True,
         help='Additional information about the X-ray area'
     )
+
+    price_ids = fields.One2many(
+        'medical.xray.price',
+        'area_id',
+        string='Prices',
+        help='Price of the X-rays of this area by projection type'
+    )
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+import io
+import logging
+import struct
+import zipfile
+from datetime import datetime
+
+import pytz
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Tags read from the DICOM headers, in ascending order
+DICOM_TAGS = {
+    (0x0008, 0x0005): 'charset',
+    (0x0008, 0x0018): 'sop_instance_uid',
+    (0x0008, 0x0020): 'study_date',
+    (0x0008, 0x0022): 'acquisition_date',
+    (0x0008, 0x0030): 'study_time',
+    (0x0008, 0x0032): 'acquisition_time',
+    (0x0008, 0x0060): 'modality',
+    (0x0008, 0x1030): 'study_description',
+    (0x0010, 0x0010): 'patient_name',
+    (0x0010, 0x0020): 'patient_identifier',
+    (0x0018, 0x0015): 'body_part',
+    (0x0018, 0x5101): 'view_position',
+    (0x0020, 0x000D): 'study_instance_uid',
+    (0x0020, 0x000E): 'series_instance_uid',
+    (0x0028, 0x0010): 'rows',
+    (0x0028, 0x0011): 'columns',
+}
+# Tags of the file meta information
+META_TRANSFER_SYNTAX = (0x0002, 0x0010)
+META_SOP_INSTANCE_UID = (0x0002, 0x0003)
+# Transfer syntaxes whose dataset is not explicit VR little endian
+IMPLICIT_LITTLE_ENDIAN = '1.2.840.10008.1.2'
+EXPLICIT_BIG_ENDIAN = '1.2.840.10008.1.2.2'
+DEFLATED_LITTLE_ENDIAN = '1.2.840.10008.1.2.1.99'
+# Explicit VRs with a 4-byte length
+LONG_VRS = {b'OB', b'OD', b'OF', b'OL', b'OV', b'OW', b'SQ', b'SV', b'UC', b'UN', b'UR', b'UT', b'UV'}
+UNDEFINED_LENGTH = 0xFFFFFFFF
+ITEM = (0xFFFE, 0xE000)
+ITEM_DELIMITER = (0xFFFE, 0xE00D)
+SEQUENCE_DELIMITER = (0xFFFE, 0xE0DD)
+# Values of the tags read are short, longer ones are malformed
+MAX_VALUE_LENGTH = 1024
+
+
+class MedicalXrayDicom(models.Model):
+    """Study metadata read from the DICOM header of an X-ray image.
+
+    The headers of the images are read when they are attached to an X-ray
+    line, see :func:`parse_dicom_header`. An image whose SOP Instance UID is
+    already on the line is detached again. The same image attached to
+    another line is linked to the first metadata of its SOP Instance UID
+    by ``duplicate_of_id``.
+    """
+    _name = 'medical.xray.dicom'
+    _description = 'X-ray DICOM Metadata'
+    _order = 'study_date desc, id desc'
+    _rec_name = 'sop_instance_uid'
+
+    line_id = fields.Many2one('medical.xray.order.line', string='X-ray Line', required=True, ondelete='cascade', index=True)
+    xray_order_id = fields.Many2one(related='line_id.xray_order_id', string='X-ray Order', store=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Image', required=True, ondelete='cascade', index=True)
+    sop_instance_uid = fields.Char(string='SOP Instance UID', index=True)
+    study_instance_uid = fields.Char(string='Study Instance UID', index=True)
+    series_instance_uid = fields.Char(string='Series Instance UID')
+    modality = fields.Char(string='Modality', index=True)
+    study_date = fields.Date(string='Study Date', index=True)
+    acquisition_datetime = fields.Datetime(string='Acquisition Date')
+    body_part = fields.Char(string='Body Part', index=True)
+    view_position = fields.Char(string='View Position')
+    study_description = fields.Char(string='Study Description')
+    patient_name = fields.Char(string='DICOM Patient Name')
+    patient_identifier = fields.Char(string='DICOM Patient ID')
+    rows = fields.Integer(string='Rows')
+    columns = fields.Integer(string='Columns')
+    transfer_syntax = fields.Char(string='Transfer Syntax')
+    duplicate_of_id = fields.Many2one('medical.xray.dicom', string='Duplicate Of', readonly=True, ondelete='set null', index='btree_not_null')
+
+    _sql_constraints = [
+        ('line_attachment_uniq', 'UNIQUE(line_id, attachment_id)', 'An image can only have one DICOM metadata per X-ray line!'),
+    ]
+
+    @api.model
+    def _read_header(self, attachment):
+        """Parse the DICOM header of ``attachment``, reading the file from the
+        filestore or its cold storage bundle instead of loading its content
+
+        :return: dict of the tags, None if the attachment is not a DICOM file
+        """
+        attachment = attachment.sudo()
+        try:
+            if attachment.store_fname:
+                # Archived images are read from their cold storage bundle
+                with attachment._medical_open(attachment.store_fname) as stream:
+                    return parse_dicom_header(stream)
+            return parse_dicom_header(io.BytesIO(attachment.raw or b''))
+        except (OSError, ValueError, KeyError, struct.error, zipfile.BadZipFile) as e:
+            _logger.info("Cannot read the DICOM header of attachment %s: %s", attachment.id, e)
+            return None
+
+    @api.model
+    def _values_from_header(self, header):
+        tz = pytz.timezone(self.env['medical.settings'].get_param('odoo_medical.clinic_tz') or 'UTC')
+        acquisition = _parse_datetime(header.get('acquisition_date') or header.get('study_date'),
+                                      header.get('acquisition_time') or header.get('study_time'))
+        study_date = _parse_datetime(header.get('study_date'))
+        return {
+            'sop_instance_uid': header.get('sop_instance_uid'),
+            'study_instance_uid': header.get('study_instance_uid'),
+            'series_instance_uid': header.get('series_instance_uid'),
+            'modality': header.get('modality'),
+            'study_date': study_date and study_date.date(),
+            'acquisition_datetime': acquisition and tz.localize(acquisition).astimezone(pytz.utc).replace(tzinfo=None),
+            'body_part': header.get('body_part'),
+            'view_position': header.get('view_position'),
+            'study_description': header.get('study_description'),
+            'patient_name': header.get('patient_name'),
+            'patient_identifier': header.get('patient_identifier'),
+            'rows': header.get('rows') or 0,
+            'columns': header.get('columns') or 0,
+            'transfer_syntax': header.get('transfer_syntax'),
+        }
+
+    @api.model
+    def _extract(self, lines):
+        """Read the DICOM headers of the images of ``lines`` not read yet
+
+        :return: the duplicate images to detach, by line
+        """
+        done = {(dicom.line_id.id, dicom.attachment_id.id) for dicom in self.search([('line_id', 'in', lines.ids)])}
+        values, duplicates = [], {}
+        for line in lines:
+            uids = set(line.dicom_ids.mapped('sop_instance_uid'))
+            for attachment in line.images:
+                if (line.id, attachment.id) in done:
+                    continue
+                header = self._read_header(attachment)
+                if not header:
+                    continue
+                vals = dict(self._values_from_header(header), line_id=line.id, attachment_id=attachment.id)
+                uid = vals['sop_instance_uid']
+                if uid and uid in uids:
+                    duplicates.setdefault(line, self.env['ir.attachment'])
+                    duplicates[line] |= attachment
+                    continue
+                uids.add(uid)
+                values.append(vals)
+
+        sop_uids = [vals['sop_instance_uid'] for vals in values if vals['sop_instance_uid']]
+        originals = {}
+        for dicom in self.search([('sop_instance_uid', 'in', sop_uids), ('duplicate_of_id', '=', False)], order='id'):
+            originals.setdefault(dicom.sop_instance_uid, dicom.id)
+        for vals in values:
+            vals['duplicate_of_id'] = originals.get(vals['sop_instance_uid'])
+        self.create(values)
+        return duplicates
+
+
+def parse_dicom_header(stream):
+    """Read the tags of ``DICOM_TAGS`` from the DICOM file ``stream``.
+
+    Only the preamble, the file meta information and the data elements up to
+    the last tag of ``DICOM_TAGS`` are read: the pixel data, at the end of
+    the file, is never reached. Values of other elements are skipped with
+    ``seek``.
+
+    :return: dict of the tags found, by name, and the ``transfer_syntax``;
+             None when ``stream`` is not a DICOM file
+    :raise ValueError: if the header is malformed
+    """
+    preamble = stream.read(132)
+    if len(preamble) < 132 or preamble[128:] != b'DICM':
+        return None
+    values = {}
+
+    # File meta information, always explicit VR little endian, its length
+    # given by its first element
+    header = _read_element_header(stream, True, '<')
+    if not header or header[0] != (0x0002, 0x0000):
+        raise ValueError("missing file meta information")
+    meta_length = struct.unpack('<I', _read(stream, header[2]))[0]
+    meta = io.BytesIO(_read(stream, meta_length))
+    while (header := _read_element_header(meta, True, '<')):
+        tag, vr, length = header
+        value = _read(meta, length)
+        if tag == META_TRANSFER_SYNTAX:
+            values['transfer_syntax'] = _decode_text(value)
+        elif tag == META_SOP_INSTANCE_UID:
+            values['sop_instance_uid'] = _decode_text(value)
+
+    transfer_syntax = values.get('transfer_syntax') or ''
+    if transfer_syntax == DEFLATED_LITTLE_ENDIAN:
+        # The dataset is compressed, only the meta information is readable
+        return values
+    explicit = transfer_syntax != IMPLICIT_LITTLE_ENDIAN
+    order = '>' if transfer_syntax == EXPLICIT_BIG_ENDIAN else '<'
+    last_tag = max(DICOM_TAGS)
+    while (header := _read_element_header(stream, explicit, order)):
+        tag, vr, length = header
+        if tag > last_tag:
+            break
+        name = DICOM_TAGS.get(tag)
+        if not name or length == UNDEFINED_LENGTH or length > MAX_VALUE_LENGTH:
+            _skip_value(stream, explicit, order, length)
+            continue
+        value = _read(stream, length)
+        if name in ('rows', 'columns'):
+            values[name] = struct.unpack(order + 'H', value[:2])[0] if len(value) >= 2 else 0
+        else:
+            values[name] = _decode_text(value, values.get('charset'))
+    if values.get('patient_name'):
+        values['patient_name'] = ' '.join(values['patient_name'].replace('^', ' ').split())
+    return values
+
+
+def _read(stream, length):
+    data = stream.read(length)
+    if len(data) != length:
+        raise ValueError("unexpected end of file")
+    return data
+
+
+def _read_element_header(stream, explicit, order):
+    """Return the (tag, VR, length) of the next data element, None at the end"""
+    raw = stream.read(4)
+    if len(raw) < 4:
+        return None
+    tag = struct.unpack(order + 'HH', raw)
+    if tag[0] == 0xFFFE:
+        # Items and delimiters have no VR
+        return tag, None, struct.unpack(order + 'I', _read(stream, 4))[0]
+    if not explicit:
+        return tag, None, struct.unpack(order + 'I', _read(stream, 4))[0]
+    vr = _read(stream, 2)
+    if vr in LONG_VRS:
+        _read(stream, 2)
+        return tag, vr, struct.unpack(order + 'I', _read(stream, 4))[0]
+    return tag, vr, struct.unpack(order + 'H', _read(stream, 2))[0]
+
+
+def _skip_value(stream, explicit, order, length):
+    """Skip a value, walking through the items of the sequences of
+    undefined length"""
+    if length != UNDEFINED_LENGTH:
+        stream.seek(length, io.SEEK_CUR)
+        return
+    while (header := _read_element_header(stream, explicit, order)):
+        tag, vr, item_length = header
+        if tag == SEQUENCE_DELIMITER:
+            return
+        if tag != ITEM or item_length != UNDEFINED_LENGTH:
+            _skip_value(stream, explicit, order, item_length)
+            continue
+        # Item of undefined length: its elements, up to the item delimiter
+        while (element := _read_element_header(stream, explicit, order)):
+            if element[0] == ITEM_DELIMITER:
+                break
+            _skip_value(stream, explicit, order, element[2])
+    raise ValueError("unterminated sequence")
+
+
+def _decode_text(value, charset=None):
+    encoding = 'utf-8' if charset and 'ISO_IR 192' in charset else 'latin-1'
+    return value.decode(encoding, errors='replace').strip('\x00 ') or False
+
+
+def _parse_datetime(date_value, time_value=None):
+    """Return the naive datetime of DICOM DA and TM values, None if invalid"""
+    if not date_value:
+        return None
+    try:
+        return datetime.strptime(date_value[:8] + (time_value or '000000').split('.')[0].ljust(6, '0')[:6], '%Y%m%d%H%M%S')
+    except ValueError:
+        return None
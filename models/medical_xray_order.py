@@ -5,10 +5,14 @@ from odoo.exceptions import ValidationError, UserError
 class MedicalXrayOrder(models.Model):
     _name = 'medical.xray.order'
     _description = 'X-ray Order'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['medical.tracking.mixin', 'mail.activity.mixin', 'medical.invoice.mixin']
     _rec_name = 'name'
     _order = 'date desc, id desc'
 
+    _tracking_groups = {
+        'billing': ['total_price'],
+    }
+
     name = fields.Char(
         string='Order Number',
         required=True,
@@ -35,6 +39,7 @@ class MedicalXrayOrder(models.Model):
         required=True,
         domain=[('is_company', '=', False)],
         tracking=True,
+        index=True,
         help='Patient for whom the X-ray is ordered'
     )
     
@@ -110,14 +115,16 @@ class MedicalXrayOrder(models.Model):
         'res.company',
         string='Company',
         required=True,
+        index=True,
         default=lambda self: self.env.company
     )
 
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('medical.xray.order') or _('New')
+        pending = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence'].next_batch_by_code('medical.xray.order', len(pending))
+        for vals, name in zip(pending, names):
+            vals['name'] = name or _('New')
         return super().create(vals_list)
 
     @api.depends('line_ids.price')
@@ -127,14 +134,19 @@ class MedicalXrayOrder(models.Model):
 
     @api.depends('company_id')
     def _compute_default_invoice_fields(self):
+        # Get default values from system parameters
+        settings = self.env['medical.settings']
+        journal_id = settings.get_id_param('odoo_medical.default_xray_journal_id')
+        product_id = settings.get_id_param('odoo_medical.default_xray_product_id')
+        tax_id = settings.get_id_param('odoo_medical.default_xray_tax_id')
         for order in self:
-            # Get default values from system parameters
-            order.journal_id = self.env['ir.config_parameter'].sudo().get_param(
-                'odoo_medical.default_xray_journal_id', False)
-            order.product_id = self.env['ir.config_parameter'].sudo().get_param(
-                'odoo_medical.default_xray_product_id', False)
-            order.tax_id = self.env['ir.config_parameter'].sudo().get_param(
-                'odoo_medical.default_xray_tax_id', False)
+            order.journal_id = journal_id
+            order.product_id = product_id
+            order.tax_id = tax_id
+
+    def action_update_prices(self):
+        """Apply the X-ray price list to the lines of the draft orders"""
+        self.env['medical.xray.price']._reprice_draft_orders(self.filtered(lambda order: order.state == 'draft'))
 
     def action_confirm(self):
         """Confirm the X-ray order"""
@@ -168,12 +180,12 @@ class MedicalXrayOrder(models.Model):
             order.state = 'cancelled'
         return True
 
-    def action_create_invoice(self):
-        """Create invoice for the X-ray order"""
+    def _get_invoice_journal(self):
+        self.ensure_one()
+        return self.journal_id
+
+    def _check_invoiceable(self):
         for order in self:
-            if order.invoice_id:
-                raise UserError(_("Invoice already exists for this order."))
-            
             if order.state not in ['done']:
                 raise ValidationError(_("You can only create invoices for completed orders."))
             
@@ -182,35 +194,23 @@ class MedicalXrayOrder(models.Model):
             
             if not order.product_id:
                 raise ValidationError(_("Please configure the default X-ray product in settings."))
-            
-            # Prepare invoice values
-            invoice_vals = {
-                'partner_id': order.patient_id.id,
-                'move_type': 'out_invoice',
-                'journal_id': int(order.journal_id),
-                'invoice_date': fields.Date.today(),
-                'ref': order.name,
-                'invoice_line_ids': [(0, 0, {
-                    'name': f"X-ray Order: {order.name}",
-                    'product_id': int(order.product_id),
-                    'quantity': 1,
-                    'price_unit': order.total_price,
-                    'tax_ids': [(6, 0, [int(order.tax_id)])] if order.tax_id else [],
-                })],
-            }
-            
-            # Create invoice
-            invoice = self.env['account.move'].create(invoice_vals)
-            order.invoice_id = invoice.id
-            
-            return {
-                'name': _('Invoice'),
-                'type': 'ir.actions.act_window',
-                'res_model': 'account.move',
-                'res_id': invoice.id,
-                'view_mode': 'form',
-                'target': 'current',
-            }
+
+    def _prepare_invoice_line_vals(self):
+        self.ensure_one()
+        return {
+            'name': f"X-ray Order: {self.name}",
+            'product_id': self.product_id.id,
+            'quantity': 1,
+            'price_unit': self.total_price,
+            'tax_ids': [(6, 0, [self.tax_id.id])] if self.tax_id else [],
+        }
+
+    def action_create_invoice(self):
+        """Create invoices for the X-ray orders"""
+        if any(order.invoice_id for order in self):
+            raise UserError(_("Invoice already exists for this order."))
+        invoices = self._create_invoices()
+        return self._get_invoices_action(invoices)
 
     def action_view_invoice(self):
         """View the generated invoice"""
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
 
 class MedicalXrayOrderLine(models.Model):
     _name = 'medical.xray.order.line'
@@ -46,8 +47,11 @@ class MedicalXrayOrderLine(models.Model):
         string='Price',
         digits='Product Price',
         required=True,
-        default=0.0,
-        help='Price for this X-ray'
+        compute='_compute_price',
+        store=True,
+        readonly=False,
+        precompute=True,
+        help='Price for this X-ray, from the X-ray price list by default'
     )
     
     images = fields.Many2many(
@@ -64,6 +68,31 @@ class MedicalXrayOrderLine(models.Model):
         compute='_compute_image_count',
         store=True
     )
+
+    preview_ids = fields.One2many(
+        'medical.xray.preview',
+        'line_id',
+        string='Previews'
+    )
+
+    thumbnail_ids = fields.One2many(
+        'medical.xray.preview',
+        'line_id',
+        string='Thumbnails',
+        domain=[('level', '=', 'thumbnail'), ('attachment_id', '!=', False)]
+    )
+
+    dicom_ids = fields.One2many(
+        'medical.xray.dicom',
+        'line_id',
+        string='DICOM Metadata'
+    )
+
+    thumbnail = fields.Binary(
+        string='Thumbnail',
+        compute='_compute_thumbnail',
+        help='Thumbnail of the first image, shown in the lists'
+    )
     
     @api.depends('area_id', 'projection_type')
     def _compute_name(self):
@@ -74,11 +103,84 @@ class MedicalXrayOrderLine(models.Model):
             else:
                 line.name = _("X-ray Line")
     
+    @api.depends('area_id', 'projection_type', 'xray_order_id.company_id')
+    def _compute_price(self):
+        Price = self.env['medical.xray.price']
+        for line in self:
+            # Confirmed orders keep the prices they were confirmed with
+            if line._origin and line.xray_order_id.state not in (False, 'draft'):
+                line.price = line.price
+                continue
+            company = line.xray_order_id.company_id or self.env.company
+            price = Price._get_price(line.area_id, line.projection_type, company)
+            # Lines without list price keep the price typed in
+            line.price = price if price is not None else line.price or 0.0
+
     @api.depends('images')
     def _compute_image_count(self):
         for line in self:
             line.image_count = len(line.images)
     
+    @api.depends('thumbnail_ids.image')
+    def _compute_thumbnail(self):
+        for line in self:
+            line.thumbnail = line.thumbnail_ids[:1].image
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        if lines.images:
+            lines._deduplicate_images()
+            lines._extract_dicom_metadata()
+            self.env['medical.xray.preview']._schedule()
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'images' in vals:
+            self._deduplicate_images()
+            # Previews of the removed images
+            self.preview_ids.filtered(lambda preview: preview.source_id not in preview.line_id.images).unlink()
+            self.dicom_ids.filtered(lambda dicom: dicom.attachment_id not in dicom.line_id.images).unlink()
+            self._extract_dicom_metadata()
+            self.env['medical.xray.preview']._schedule()
+        return res
+
+    def _deduplicate_images(self):
+        """Detach the images whose content is already attached to the same
+        line, and delete them when nothing else uses them. Identical images
+        of different lines keep their own attachment: the filestore stores
+        their content once."""
+        duplicates = self.env['ir.attachment']
+        for line in self:
+            checksums = set()
+            line_duplicates = self.env['ir.attachment']
+            for attachment in line.images.sudo().sorted('id'):
+                if attachment.checksum and attachment.checksum in checksums:
+                    line_duplicates |= attachment
+                checksums.add(attachment.checksum)
+            if line_duplicates:
+                line.images = [(3, attachment.id) for attachment in line_duplicates]
+                duplicates |= line_duplicates
+        if not duplicates:
+            return
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            "SELECT attachment_id FROM xray_line_attachment_rel WHERE attachment_id IN %s",
+            tuple(duplicates.ids),
+        ))
+        still_linked = {row[0] for row in self.env.cr.fetchall()}
+        duplicates.filtered(
+            lambda attachment: attachment.id not in still_linked and attachment.res_model in (False, self._name)
+        ).unlink()
+
+    def _extract_dicom_metadata(self):
+        """Read the DICOM headers of the new images and detach the images
+        whose SOP Instance UID is already on the line"""
+        duplicates = self.env['medical.xray.dicom']._extract(self)
+        for line, attachments in duplicates.items():
+            line.images = [(3, attachment.id) for attachment in attachments]
+
     @api.constrains('price')
     def _check_price(self):
         for line in self:
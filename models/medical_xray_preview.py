@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+from odoo.tools.image import ImageProcess
+
+_logger = logging.getLogger(__name__)
+
+# Preview levels, from the smallest, with the maximum width and height of
+# each one (0 for the full resolution)
+PREVIEW_LEVELS = [
+    ('thumbnail', 'Thumbnail'),
+    ('screen', 'Screen'),
+    ('full', 'Full'),
+]
+PREVIEW_SIZES = {
+    'thumbnail': 256,
+    'screen': 1920,
+    'full': 0,
+}
+# Images shown by the browsers as they are
+BROWSER_MIMETYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp')
+
+
+class MedicalXrayPreview(models.Model):
+    """Preview of an X-ray image at one resolution level.
+
+    The previews of the images of the X-ray lines are generated in the
+    background by the preview cron, ``_preview_batch_size`` images per run.
+    Each level is a derived attachment of the line: the views show the
+    thumbnails and the viewer loads the higher levels on demand, through the
+    ``/odoo_medical/xray_preview/<image>/<level>`` route. The full level of
+    an image the browsers can show is the image itself.
+
+    Images that cannot be decoded or resized get previews without
+    attachment, so that they are not processed again.
+    """
+    _name = 'medical.xray.preview'
+    _description = 'X-ray Image Preview'
+    _order = 'line_id, source_id, id'
+
+    # Number of images processed per cron run
+    _preview_batch_size = 20
+
+    line_id = fields.Many2one('medical.xray.order.line', string='X-ray Line', required=True, ondelete='cascade', index=True)
+    source_id = fields.Many2one('ir.attachment', string='Image', required=True, ondelete='cascade', index=True)
+    level = fields.Selection(PREVIEW_LEVELS, string='Level', required=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Preview', ondelete='set null')
+    image = fields.Binary(string='Preview Image', related='attachment_id.datas')
+    width = fields.Integer(string='Width')
+    height = fields.Integer(string='Height')
+    screen_url = fields.Char(string='Screen URL', compute='_compute_urls')
+    full_url = fields.Char(string='Full Resolution URL', compute='_compute_urls')
+
+    _sql_constraints = [
+        ('source_level_uniq', 'UNIQUE(line_id, source_id, level)', 'An image can only have one preview per level!'),
+    ]
+
+    @api.depends('source_id')
+    def _compute_urls(self):
+        for preview in self:
+            preview.screen_url = '/odoo_medical/xray_preview/%s/screen' % preview.source_id.id
+            preview.full_url = '/odoo_medical/xray_preview/%s/full' % preview.source_id.id
+
+    def unlink(self):
+        derived = self.attachment_id - self.source_id
+        res = super().unlink()
+        derived.sudo().unlink()
+        return res
+
+    def _schedule(self):
+        self.env.ref('odoo_medical.ir_cron_medical_xray_preview')._trigger()
+
+    @api.model
+    def _pending_images(self, limit=None):
+        """Return the (line id, image id) of the line images without previews"""
+        self.env.flush_all()
+        self.env.cr.execute(SQL("""
+            SELECT rel.line_id, rel.attachment_id
+              FROM xray_line_attachment_rel rel
+         LEFT JOIN medical_xray_preview preview
+                ON preview.line_id = rel.line_id AND preview.source_id = rel.attachment_id
+             WHERE preview.id IS NULL
+          ORDER BY rel.line_id, rel.attachment_id
+             %s
+        """, SQL("LIMIT %s", limit) if limit else SQL()))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _count_pending_images(self):
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT COUNT(*)
+              FROM xray_line_attachment_rel rel
+             WHERE NOT EXISTS (
+                   SELECT 1 FROM medical_xray_preview preview
+                    WHERE preview.line_id = rel.line_id AND preview.source_id = rel.attachment_id)
+        """)
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _cron_generate_previews(self):
+        """Generate the previews of the next images and report the progress"""
+        batch = self._pending_images(limit=self._preview_batch_size)
+        Line = self.env['medical.xray.order.line']
+        Attachment = self.env['ir.attachment']
+        for line_id, source_id in batch:
+            self._generate(Line.browse(line_id), Attachment.browse(source_id))
+        self.env['ir.cron']._notify_progress(done=len(batch), remaining=self._count_pending_images())
+
+    @api.model
+    def _generate(self, line, source):
+        """Create the previews of the image ``source`` of ``line``. Images
+        that cannot be decoded or resized get previews without attachment."""
+        values = [{'line_id': line.id, 'source_id': source.id, 'level': level} for level, _name in PREVIEW_LEVELS]
+        try:
+            with self.env.cr.savepoint():
+                return self.create(self._render_levels(line, source, values))
+        except (UserError, OSError, ValueError) as e:
+            _logger.info("X-ray image %s cannot be decoded, no previews generated: %s", source.id, e)
+        return self.create(values)
+
+    @api.model
+    def _render_levels(self, line, source, values):
+        """Return ``values`` completed with the preview attachment and size
+        of each level, raise if the image cannot be processed"""
+        processor = ImageProcess(source.raw)
+        if not processor.image:
+            raise ValueError("empty image")
+
+        # From the largest level, each one is resized from the previous one
+        values = [dict(vals) for vals in values]
+        for vals in reversed(values):
+            size = PREVIEW_SIZES[vals['level']]
+            if size:
+                processor.resize(max_width=size, max_height=size)
+            if not size and source.mimetype in BROWSER_MIMETYPES:
+                attachment = source
+            else:
+                image_format = 'JPEG' if size else 'PNG'
+                attachment = self.env['ir.attachment'].sudo().create({
+                    'name': '%s (%s).%s' % (source.name, vals['level'], image_format.lower()),
+                    'raw': processor.image_quality(quality=85 if size else 0, output_format=image_format),
+                    'mimetype': 'image/%s' % image_format.lower(),
+                    'res_model': line._name,
+                    'res_id': line.id,
+                })
+            width, height = processor.image.size
+            vals.update(attachment_id=attachment.id, width=width, height=height)
+        return values
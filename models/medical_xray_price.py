@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+
+class MedicalXrayPrice(models.Model):
+    """Price of an X-ray by area and projection type.
+
+    A price without company applies to every company, a price of a company
+    overrides it. The matrix of each company is cached in the registry by
+    :meth:`_get_price_matrix`, and the cache is cleared whenever a price is
+    created, changed or removed.
+    """
+    _name = 'medical.xray.price'
+    _description = 'X-ray Price'
+    _order = 'area_id, projection_type, company_id'
+
+    area_id = fields.Many2one('medical.xray.area', string='X-ray Area', required=True, ondelete='cascade')
+    projection_type = fields.Selection(
+        selection=lambda self: self.env['medical.xray.order.line']._fields['projection_type'].selection,
+        string='Projection Type', required=True)
+    company_id = fields.Many2one('res.company', string='Company', help='Leave empty to use this price in every company')
+    price = fields.Float(string='Price', digits='Product Price', required=True, default=0.0)
+
+    _sql_constraints = [
+        ('area_projection_company_uniq', 'UNIQUE(area_id, projection_type, company_id)',
+         'There is already a price for this area, projection type and company!'),
+    ]
+
+    def init(self):
+        super().init()
+        # The unique constraint does not cover the shared prices, without company
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS medical_xray_price_shared_uniq
+                ON medical_xray_price (area_id, projection_type)
+             WHERE company_id IS NULL
+        """)
+
+    @api.constrains('price')
+    def _check_price(self):
+        for record in self:
+            if record.price < 0:
+                raise ValidationError(_("Price cannot be negative"))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_price_matrix(self, company_id):
+        """Return the prices of ``company_id`` by (area id, projection type)"""
+        prices = self.sudo().search_read(
+            [('company_id', 'in', (False, company_id))], ['area_id', 'projection_type', 'company_id', 'price'])
+        matrix = {}
+        # Company prices come last and override the shared ones
+        for price in sorted(prices, key=lambda price: bool(price['company_id'])):
+            matrix[price['area_id'][0], price['projection_type']] = price['price']
+        return tools.frozendict(matrix)
+
+    @api.model
+    def _get_price(self, area, projection_type, company):
+        """Return the price of an X-ray, None when it has no price"""
+        return self._get_price_matrix(company.id).get((area.id, projection_type))
+
+    @api.model
+    def _reprice_draft_orders(self, orders=None):
+        """Apply the price matrix to the lines of the draft X-ray orders, in
+        one statement. The write date of the lines and orders is updated, and
+        the order totals are tracked like a write.
+
+        :param orders: optional X-ray orders to reprice, all draft ones by default
+        :return: the repriced lines
+        """
+        if orders is not None and not orders:
+            return self.env['medical.xray.order.line']
+        restriction = SQL("AND xray_order.id IN %s", tuple(orders.ids)) if orders is not None else SQL()
+        self.env.flush_all()
+        self.env.cr.execute(SQL("""
+          WITH repriced AS (
+            UPDATE medical_xray_order_line line
+               SET price = matrix.price, write_date = %(now)s, write_uid = %(uid)s
+              FROM medical_xray_order xray_order
+              JOIN (
+                  SELECT DISTINCT ON (company.id, price.area_id, price.projection_type)
+                         company.id AS company_id, price.area_id, price.projection_type, price.price
+                    FROM medical_xray_price price
+                    JOIN res_company company ON price.company_id IS NULL OR price.company_id = company.id
+                ORDER BY company.id, price.area_id, price.projection_type, price.company_id IS NULL
+              ) matrix ON matrix.company_id = xray_order.company_id
+             WHERE line.xray_order_id = xray_order.id
+               AND line.area_id = matrix.area_id
+               AND line.projection_type = matrix.projection_type
+               AND line.price IS DISTINCT FROM matrix.price
+               AND xray_order.state = 'draft'
+               %(restriction)s
+         RETURNING line.id, line.xray_order_id
+          ), touched AS (
+            UPDATE medical_xray_order
+               SET write_date = %(now)s, write_uid = %(uid)s
+             WHERE id IN (SELECT xray_order_id FROM repriced)
+          )
+          SELECT id FROM repriced
+        """, restriction=restriction, now=self.env.cr.now(), uid=self.env.uid))
+        lines = self.env['medical.xray.order.line'].browse(row[0] for row in self.env.cr.fetchall())
+        orders = lines.xray_order_id
+        # The order totals depend on the line prices, their change is logged
+        # in the chatter when they are recomputed
+        orders._track_prepare(['total_price'])
+        lines.invalidate_recordset(['price', 'write_date', 'write_uid'])
+        orders.invalidate_recordset(['write_date', 'write_uid'])
+        lines.modified(['price'])
+        return lines
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import os
+import secrets
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError, ValidationError
+
+_logger = logging.getLogger(__name__)
+
+# Size of the blocks copied between the request and the filestore
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+# Size of the chunks clients are asked to send
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Directory of the partial files, inside the filestore of the database
+UPLOAD_DIRECTORY = 'medical_xray_uploads'
+
+
+class MedicalXrayUpload(models.Model):
+    """Chunked, resumable upload of one X-ray image.
+
+    The client announces the file with its size and SHA-1 checksum, then
+    sends it in chunks of any size, in order. Each chunk is streamed to a
+    partial file in the filestore, so the memory used by the worker does not
+    depend on the size of the study. An interrupted upload resumes at
+    ``received``. When the last chunk is received, the checksum is verified,
+    the partial file is linked into the filestore and the attachment is
+    added to the images of the X-ray line.
+
+    Abandoned uploads are removed by the upload cleanup cron.
+    """
+    _name = 'medical.xray.upload'
+    _description = 'X-ray Image Upload'
+    _order = 'id desc'
+
+    # Uploads not resumed for this long are removed by the cleanup cron
+    _upload_expiry = timedelta(days=1)
+
+    name = fields.Char(string='File Name', required=True)
+    line_id = fields.Many2one('medical.xray.order.line', string='X-ray Line', required=True, ondelete='cascade')
+    token = fields.Char(string='Token', required=True, readonly=True, copy=False, index=True,
+                        default=lambda self: secrets.token_urlsafe(32))
+    mimetype = fields.Char(string='Mime Type')
+    file_size = fields.Integer(string='File Size', required=True)
+    checksum = fields.Char(string='Checksum', required=True, help='SHA-1 checksum of the file, in hexadecimal')
+    received = fields.Integer(string='Received', default=0, readonly=True)
+    state = fields.Selection([
+        ('uploading', 'Uploading'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='uploading', required=True, readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Attachment', readonly=True, ondelete='set null')
+
+    @api.constrains('file_size', 'checksum')
+    def _check_file(self):
+        for upload in self:
+            if upload.file_size <= 0:
+                raise ValidationError(_('The file to upload is empty.'))
+            if len(upload.checksum) != 40 or not all(c in '0123456789abcdef' for c in upload.checksum):
+                raise ValidationError(_('The checksum must be the SHA-1 of the file, in hexadecimal.'))
+
+    @api.model
+    def _start(self, line, filename, file_size, checksum, mimetype=None):
+        """Return the upload of the file to ``line``, resuming the pending
+        upload of the same file by the current user if any"""
+        line.check_access('write')
+        checksum = (checksum or '').lower()
+        upload = self.search([
+            ('line_id', '=', line.id),
+            ('checksum', '=', checksum),
+            ('file_size', '=', file_size),
+            ('state', '=', 'uploading'),
+            ('create_uid', '=', self.env.uid),
+        ], limit=1)
+        return upload or self.create({
+            'name': filename,
+            'line_id': line.id,
+            'file_size': file_size,
+            'checksum': checksum,
+            'mimetype': mimetype,
+        })
+
+    def _partial_path(self):
+        directory = os.path.join(self.env['ir.attachment']._filestore(), UPLOAD_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, '%s.part' % self.token)
+
+    def _write_chunk(self, offset, stream):
+        """Append the chunk read from ``stream`` at ``offset`` of the file.
+
+        A chunk written again, after a failed request, overwrites its
+        previous copy.
+
+        :return: True when the file is complete
+        """
+        self.ensure_one()
+        if self.state != 'uploading':
+            raise UserError(_('This upload is already finished.'))
+        if offset != self.received:
+            raise UserError(_('The upload must resume at byte %s.', self.received))
+
+        path = self._partial_path()
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as partial:
+            partial.seek(offset)
+            # Stop at the announced size, extra bytes are ignored
+            remaining = self.file_size - offset
+            while remaining > 0:
+                block = stream.read(min(UPLOAD_BUFFER_SIZE, remaining))
+                if not block:
+                    break
+                partial.write(block)
+                remaining -= len(block)
+            partial.truncate()
+            received = partial.tell()
+
+        self.received = received
+        if received >= self.file_size:
+            self._finalize()
+        return self.state == 'done'
+
+    def _finalize(self):
+        """Verify the complete file and attach it to the X-ray line"""
+        self.ensure_one()
+        path = self._partial_path()
+        sha = hashlib.sha1()
+        with open(path, 'rb') as partial:
+            for block in iter(lambda: partial.read(UPLOAD_BUFFER_SIZE), b''):
+                sha.update(block)
+        checksum = sha.hexdigest()
+        if checksum != self.checksum:
+            os.unlink(path)
+            self.write({'state': 'failed', 'received': 0})
+            _logger.warning("X-ray upload %s: checksum mismatch", self.id)
+            return
+
+        attachment = self.env['ir.attachment'].sudo()._medical_create_from_file(path, {
+            'name': self.name,
+            'mimetype': self.mimetype,
+            'res_model': self.line_id._name,
+            'res_id': self.line_id.id,
+        }, checksum=checksum)
+
+        self.line_id.write({'images': [(4, attachment.id)]})
+        # A copy of an image already on the line is detached, the line keeps the original
+        attachment = attachment.exists() or self.line_id.images.filtered(lambda image: image.checksum == checksum)[:1]
+        self.write({'state': 'done', 'attachment_id': attachment.id})
+
+    def _status(self):
+        self.ensure_one()
+        return {
+            'token': self.token,
+            'state': self.state,
+            'offset': self.received,
+            'chunk_size': UPLOAD_CHUNK_SIZE,
+            'attachment_id': self.attachment_id.id,
+        }
+
+    @api.model
+    def _cron_cleanup_uploads(self):
+        """Remove the expired uploads and the partial files of the abandoned ones"""
+        uploads = self.search([('write_date', '<', fields.Datetime.now() - self._upload_expiry)])
+        for upload in uploads:
+            path = upload._partial_path()
+            if os.path.exists(path):
+                os.unlink(path)
+        uploads.unlink()
@@ -1,5 +1,21 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
+from odoo.addons.base.models.res_partner import _tz_get
+
+from .medical_tracking_mixin import TRACKING_POLICIES
+
+SEQUENCE_IMPLEMENTATIONS = [
+    ('no_gap', 'Gapless (locked)'),
+    ('standard', 'Fast (no locking)'),
+]
+
+# Settings field -> medical sequence it configures
+MEDICAL_SEQUENCES = {
+    'medical_consultation_sequence_implementation': 'odoo_medical.seq_medical_consultation',
+    'medical_record_sequence_implementation': 'odoo_medical.seq_medical_record',
+    'medical_therapy_sequence_implementation': 'odoo_medical.seq_medical_therapy',
+    'medical_xray_sequence_implementation': 'odoo_medical.seq_medical_xray_order',
+}
 
 class ResConfigSettings(models.TransientModel):
     _inherit = 'res.config.settings'
@@ -58,3 +74,93 @@ class ResConfigSettings(models.TransientModel):
         config_parameter='odoo_medical.default_xray_journal_id',
         help='Default journal for X-ray invoicing'
     )
+
+    # Reference numbering
+    medical_consultation_sequence_implementation = fields.Selection(
+        SEQUENCE_IMPLEMENTATIONS,
+        string='Consultation Numbering'
+    )
+    medical_record_sequence_implementation = fields.Selection(
+        SEQUENCE_IMPLEMENTATIONS,
+        string='Medical Record Numbering'
+    )
+    medical_therapy_sequence_implementation = fields.Selection(
+        SEQUENCE_IMPLEMENTATIONS,
+        string='Therapy Numbering'
+    )
+    medical_xray_sequence_implementation = fields.Selection(
+        SEQUENCE_IMPLEMENTATIONS,
+        string='X-ray Order Numbering'
+    )
+
+    # Chatter tracking policies, see medical.tracking.mixin
+    medical_tracking_clinical = fields.Selection(
+        TRACKING_POLICIES,
+        string='Clinical Notes Tracking',
+        default='full',
+        config_parameter='odoo_medical.tracking_clinical',
+    )
+    medical_tracking_vitals = fields.Selection(
+        TRACKING_POLICIES,
+        string='Vital Signs Tracking',
+        default='full',
+        config_parameter='odoo_medical.tracking_vitals',
+    )
+    medical_tracking_leave = fields.Selection(
+        TRACKING_POLICIES,
+        string='Medical Leave Tracking',
+        default='full',
+        config_parameter='odoo_medical.tracking_leave',
+    )
+    medical_tracking_billing = fields.Selection(
+        TRACKING_POLICIES,
+        string='Billing Tracking',
+        default='full',
+        config_parameter='odoo_medical.tracking_billing',
+    )
+
+    # Consultation analysis
+    medical_clinic_tz = fields.Selection(
+        _tz_get,
+        string='Clinic Timezone',
+        config_parameter='odoo_medical.clinic_tz',
+    )
+    medical_consultation_report_materialized = fields.Boolean(
+        string='Materialized Consultation Analysis',
+        config_parameter='odoo_medical.consultation_report_materialized',
+    )
+
+    # X-ray cold storage, see medical.xray.archive
+    medical_xray_archive_days = fields.Integer(
+        string='Archive X-ray Images After (days)',
+        config_parameter='odoo_medical.xray_archive_days',
+        help='Images of the X-ray orders done for longer are moved to cold storage. 0 disables the archival.'
+    )
+    medical_xray_archive_path = fields.Char(
+        string='Cold Storage Directory',
+        config_parameter='odoo_medical.xray_archive_path',
+        help='Directory of the cold-storage bundles. Defaults to a directory of the filestore.'
+    )
+
+    @api.model
+    def get_values(self):
+        res = super().get_values()
+        for field_name, xmlid in MEDICAL_SEQUENCES.items():
+            sequence = self.env.ref(xmlid, raise_if_not_found=False)
+            res[field_name] = sequence.implementation if sequence else 'standard'
+        return res
+
+    def set_values(self):
+        settings = self.env['medical.settings']
+        report_params = ('odoo_medical.clinic_tz', 'odoo_medical.consultation_report_materialized')
+        previous_report_params = [settings.get_param(key) for key in report_params]
+        super().set_values()
+        for field_name, xmlid in MEDICAL_SEQUENCES.items():
+            sequence = self.env.ref(xmlid, raise_if_not_found=False)
+            if sequence and self[field_name] and sequence.implementation != self[field_name]:
+                sequence.sudo().implementation = self[field_name]
+        # Medical parameters are cached by medical.settings
+        self.env.registry.clear_cache()
+        if [settings.get_param(key) for key in report_params] != previous_report_params:
+            self.env['medical.consultation.report'].sudo().init()
+            self.env['medical.revenue.report'].sudo().init()
@@ -1,11 +1,29 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from .medical_consultation import CERTIFICATE_PARTNER_FIELDS
+
+# Sources of the clinical timeline:
+# (model, patient field, date field, title field, summary field)
+TIMELINE_SOURCES = [
+    ('medical.consultation', 'patient_id', 'consultation_date', 'name', 'consultation_reason'),
+    ('medical.therapy', 'patient_id', 'therapy_date', 'name', 'diagnosis'),
+    ('medical.session.record', 'patient_id', 'entry_datetime', 'name', 'evolution'),
+    ('medical.xray.order', 'patient_id', 'date', 'name', 'notes'),
+    ('medical.history', 'partner_id', 'date_record', 'name', 'description'),
+]
 
 
 class ResPartner(models.Model):
-    _inherit = 'res.partner'
+    _inherit = ['res.partner', 'medical.count.mixin']
 
+    _related_count_fields = {
+        'consultation_count': 'consultation_ids',
+        'therapy_count': 'therapy_ids',
+    }
 
     doctor_license = fields.Char(
         string='Doctor License Number',
@@ -24,14 +42,9 @@ class ResPartner(models.Model):
     # Campo computed para contar las consultas médicas
     consultation_count = fields.Integer(
         string='Consultation Count',
-        compute='_compute_consultation_count'
+        compute='_compute_related_counts'
     )
 
-    @api.depends('consultation_ids')
-    def _compute_consultation_count(self):
-        for partner in self:
-            partner.consultation_count = len(partner.consultation_ids)
-
     # Relación one2many con las consultas médicas
     consultation_ids = fields.One2many(
         'medical.consultation',
@@ -49,18 +62,126 @@ class ResPartner(models.Model):
     # Campo computed para contar las terapias médicas
     therapy_count = fields.Integer(
         string='Therapy Count',
-        compute='_compute_therapy_count'
+        compute='_compute_related_counts'
     )
 
-    @api.depends('therapy_ids')
-    def _compute_therapy_count(self):
-        for partner in self:
-            partner.therapy_count = len(partner.therapy_ids)
-
     @api.model_create_multi
     def create(self, vals_list):
         """Generar número de historia clínica secuencial al crear un partner"""
-        for vals in vals_list:
-            if not vals.get('medical_record_number'):
-                vals['medical_record_number'] = self.env['ir.sequence'].next_by_code('medical.record') or 'New'
-        return super(ResPartner, self).create(vals_list)
+        pending = [vals for vals in vals_list if not vals.get('medical_record_number')]
+        numbers = self.env['ir.sequence'].next_batch_by_code('medical.record', len(pending))
+        for vals, number in zip(pending, numbers):
+            vals['medical_record_number'] = number or 'New'
+        partners = super(ResPartner, self).create(vals_list)
+        partners.filtered('weight_kg')._append_weight()
+        return partners
+
+    def write(self, vals):
+        res = super(ResPartner, self).write(vals)
+        if 'weight_kg' in vals:
+            self.filtered('weight_kg')._append_weight()
+        if not vals.keys().isdisjoint(CERTIFICATE_PARTNER_FIELDS):
+            self._clear_certificate_cache()
+        return res
+
+    def _clear_certificate_cache(self):
+        """Drop the cached certificates printing self as patient or doctor"""
+        self.env['medical.consultation'].sudo().search(['|',
+            ('patient_id', 'in', self.ids),
+            ('doctor_id.partner_id', 'in', self.ids),
+        ])._clear_certificate_cache()
+
+    def _append_weight(self):
+        """Record the weight of the patient form in the vital signs series"""
+        if self:
+            self.env['medical.vitals.series'].sudo().create([{
+                'patient_id': partner.id,
+                'source': 'patient',
+                'weight_kg': partner.weight_kg,
+            } for partner in self])
+
+    def get_vitals_series(self, date_from=None, date_to=None):
+        """Return the vital signs of the patient as arrays for charting, see
+        ``medical.vitals.series.get_series``"""
+        self.ensure_one()
+        return self.env['medical.vitals.series'].get_series(self.id, date_from=date_from, date_to=date_to)
+
+    @api.model
+    def _timeline_text(self, Model, field_name, lang):
+        column = SQL.identifier(field_name)
+        if Model._fields[field_name].translate:
+            return SQL("COALESCE(%s->>%s, %s->>'en_US')", column, lang, column)
+        return SQL("%s::text", column)
+
+    def _parse_timeline_cursor(self, cursor):
+        try:
+            date, res_model, res_id = cursor.split('|')
+            return fields.Datetime.to_datetime(date), res_model, int(res_id)
+        except ValueError:
+            raise UserError(self.env._('Invalid timeline cursor.'))
+
+    def get_clinical_timeline(self, limit=20, cursor=None):
+        """Return one page of the patient clinical timeline, most recent first.
+
+        Consultations, therapies, session records, X-ray orders and history
+        entries are merged with a single UNION query. Pages are chained with
+        keyset pagination: pass the returned ``next_cursor`` to get the
+        following page.
+
+        :return: dict with the page ``entries`` and the ``next_cursor``
+                 (False on the last page)
+        """
+        self.ensure_one()
+        limit = max(1, int(limit))
+        lang = self.env.lang or 'en_US'
+        keyset = SQL("")
+        if cursor:
+            keyset = SQL("AND (event_date, res_model, res_id) < (%s, %s, %s)", *self._parse_timeline_cursor(cursor))
+
+        branches = []
+        for model_name, patient_field, date_field, title_field, summary_field in TIMELINE_SOURCES:
+            Model = self.env[model_name]
+            if not Model.has_access('read'):
+                continue
+            event_date = SQL.identifier(date_field)
+            if Model._fields[date_field].type == 'date':
+                event_date = SQL("%s::timestamp", event_date)
+            # Visible records only, each branch limited to one page
+            branches.append(SQL("""
+                (SELECT * FROM (
+                    SELECT %(date)s AS event_date, %(model)s AS res_model, id AS res_id,
+                           %(title)s AS title, state, left(%(summary)s, 200) AS summary
+                      FROM %(table)s
+                     WHERE id IN %(visible)s
+                ) branch
+                 WHERE event_date IS NOT NULL %(keyset)s
+              ORDER BY event_date DESC, res_model DESC, res_id DESC
+                 LIMIT %(limit)s)
+            """,
+                date=event_date,
+                model=model_name,
+                title=self._timeline_text(Model, title_field, lang),
+                summary=self._timeline_text(Model, summary_field, lang),
+                table=SQL.identifier(Model._table),
+                visible=Model._search([(patient_field, '=', self.id)]).subselect(),
+                keyset=keyset,
+                limit=limit + 1,
+            ))
+        if not branches:
+            return {'entries': [], 'next_cursor': False}
+
+        self.env.flush_all()
+        self.env.cr.execute(SQL("""
+            %s
+            ORDER BY event_date DESC, res_model DESC, res_id DESC
+            LIMIT %s
+        """, SQL(" UNION ALL ").join(branches), limit + 1))
+        rows = self.env.cr.dictfetchall()
+
+        next_cursor = False
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = '%s|%s|%s' % (fields.Datetime.to_string(last['event_date']), last['res_model'], last['res_id'])
+        entries = [dict(row, event_date=fields.Datetime.to_string(row['event_date'])) for row in rows]
+        return {'entries': entries, 'next_cursor': next_cursor}
@@ -0,0 +1,44 @@
+/** @odoo-module **/
+
+import { onWillUnmount } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { KanbanController } from "@web/views/kanban/kanban_controller";
+import { kanbanView } from "@web/views/kanban/kanban_view";
+
+/**
+ * Consultation kanban kept up to date by the server: the cards changed by
+ * other users are pushed on the bus and only those cards are reloaded. The
+ * board is reloaded when a card appears, disappears or changes column.
+ */
+export class WaitingRoomKanbanController extends KanbanController {
+    setup() {
+        super.setup();
+        this.busService = useService("bus_service");
+        const onUpdate = (payload) => this.applyWaitingRoomUpdate(payload);
+        this.busService.subscribe("odoo_medical.waiting_room", onUpdate);
+        onWillUnmount(() => this.busService.unsubscribe("odoo_medical.waiting_room", onUpdate));
+    }
+
+    async applyWaitingRoomUpdate({ cards, deleted_ids }) {
+        const root = this.model.root;
+        const records = new Map(root.records.map((record) => [record.resId, record]));
+        const moved = cards.some((card) => {
+            const record = records.get(card.id);
+            return !record || record.data.state !== card.state;
+        });
+        if (moved || deleted_ids.some((id) => records.has(id))) {
+            await root.load();
+        } else {
+            await Promise.all(cards.map((card) => records.get(card.id).load()));
+        }
+        this.render(true);
+    }
+}
+
+export const waitingRoomKanbanView = {
+    ...kanbanView,
+    Controller: WaitingRoomKanbanController,
+};
+
+registry.category("views").add("medical_waiting_room_kanban", waitingRoomKanbanView);
@@ -0,0 +1,85 @@
+/** @odoo-module **/
+
+import { Component, useEffect, useState } from "@odoo/owl";
+import { _t } from "@web/core/l10n/translation";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardWidgetProps } from "@web/views/widgets/standard_widget_props";
+
+// Number of entries loaded per page
+const PAGE_SIZE = 10;
+
+/**
+ * Latest page of the clinical timeline of the patient, read with
+ * res.partner.get_clinical_timeline. The following pages are loaded on
+ * demand with the cursor of the previous one. The patient is the record
+ * itself, or the many2one given by the ``partner_field`` option.
+ */
+export class ClinicalTimeline extends Component {
+    static template = "odoo_medical.ClinicalTimeline";
+    static props = { ...standardWidgetProps, partnerField: { type: String, optional: true } };
+
+    setup() {
+        this.orm = useService("orm");
+        this.action = useService("action");
+        this.state = useState({ entries: [], nextCursor: false, loading: false });
+        this.modelLabels = {
+            "medical.consultation": _t("Consultation"),
+            "medical.therapy": _t("Therapy"),
+            "medical.session.record": _t("Session"),
+            "medical.xray.order": _t("X-ray Order"),
+            "medical.history": _t("History"),
+        };
+        useEffect(
+            (partnerId) => {
+                this.state.entries = [];
+                this.state.nextCursor = false;
+                if (partnerId) {
+                    this.loadPage(partnerId);
+                }
+            },
+            () => [this.partnerId]
+        );
+    }
+
+    get partnerId() {
+        const { record, partnerField } = this.props;
+        if (!partnerField) {
+            return record.resId;
+        }
+        const value = record.data[partnerField];
+        return Array.isArray(value) ? value[0] : value?.id || false;
+    }
+
+    async loadPage(partnerId, cursor = null) {
+        this.state.loading = true;
+        try {
+            const page = await this.orm.call("res.partner", "get_clinical_timeline", [[partnerId]], {
+                limit: PAGE_SIZE,
+                cursor,
+            });
+            this.state.entries.push(...page.entries);
+            this.state.nextCursor = page.next_cursor;
+        } finally {
+            this.state.loading = false;
+        }
+    }
+
+    onLoadMore() {
+        this.loadPage(this.partnerId, this.state.nextCursor);
+    }
+
+    openEntry(entry) {
+        this.action.doAction({
+            type: "ir.actions.act_window",
+            res_model: entry.res_model,
+            res_id: entry.res_id,
+            views: [[false, "form"]],
+        });
+    }
+}
+
+registry.category("view_widgets").add("medical_clinical_timeline", {
+    component: ClinicalTimeline,
+    extractProps: ({ options }) => ({ partnerField: options.partner_field }),
+});
@@ -0,0 +1,68 @@
+/** @odoo-module **/
+
+import { Component, onWillStart, onWillUnmount, useEffect, useRef, useState } from "@odoo/owl";
+import { loadBundle } from "@web/core/assets";
+import { _t } from "@web/core/l10n/translation";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardWidgetProps } from "@web/views/widgets/standard_widget_props";
+
+/**
+ * Trend of the vital signs of the patient on the patient form: blood
+ * pressure on the left axis, weight on the right one. The series is read
+ * with res.partner.get_vitals_series.
+ */
+export class VitalsChart extends Component {
+    static template = "odoo_medical.VitalsChart";
+    static props = { ...standardWidgetProps };
+
+    setup() {
+        this.orm = useService("orm");
+        this.canvasRef = useRef("canvas");
+        this.state = useState({ empty: false });
+        this.chart = null;
+        onWillStart(() => loadBundle("web.chartjs_lib"));
+        useEffect(
+            (resId) => {
+                this.renderChart(resId);
+            },
+            () => [this.props.record.resId]
+        );
+        onWillUnmount(() => this.chart?.destroy());
+    }
+
+    async renderChart(resId) {
+        this.chart?.destroy();
+        this.chart = null;
+        if (!resId) {
+            this.state.empty = true;
+            return;
+        }
+        const series = await this.orm.call("res.partner", "get_vitals_series", [[resId]]);
+        this.state.empty = !series.dates.length;
+        if (this.state.empty || !this.canvasRef.el) {
+            return;
+        }
+        const dataset = (label, data, yAxisID) => ({ label, data, yAxisID, spanGaps: true, tension: 0.2 });
+        this.chart = new Chart(this.canvasRef.el, {
+            type: "line",
+            data: {
+                labels: series.dates.map((date) => date.slice(0, 10)),
+                datasets: [
+                    dataset(_t("Systolic Pressure (mmHg)"), series.systolic_pressure, "pressure"),
+                    dataset(_t("Diastolic Pressure (mmHg)"), series.diastolic_pressure, "pressure"),
+                    dataset(_t("Weight (Kg)"), series.weight_kg, "weight"),
+                ],
+            },
+            options: {
+                maintainAspectRatio: false,
+                scales: {
+                    pressure: { type: "linear", position: "left" },
+                    weight: { type: "linear", position: "right", grid: { drawOnChartArea: false } },
+                },
+            },
+        });
+    }
+}
+
+registry.category("view_widgets").add("medical_vitals_chart", { component: VitalsChart });
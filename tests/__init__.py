@@ -1,4 +1,22 @@
 # -*- coding: utf-8 -*-
 
 from . import test_component_session_relationship
+from . import test_count_mixin
 from . import test_therapy_pricing
+from . import test_bulk_invoicing
+from . import test_sequence_batch
+from . import test_icd10
+from . import test_patient_age
+from . import test_clinical_timeline
+from . import test_fulltext_search
+from . import test_certificate_batch
+from . import test_tracking_policy
+from . import test_waiting_room
+from . import test_consultation_report
+from . import test_revenue_report
+from . import test_vitals_series
+from . import test_xray_upload
+from . import test_xray_preview
+from . import test_xray_dicom
+from . import test_xray_archive
+from . import test_xray_price
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase
+
+
+class TestMedicalBulkInvoicing(TransactionCase):
+
+    def setUp(self):
+        super(TestMedicalBulkInvoicing, self).setUp()
+
+        self.patient_a = self.env['res.partner'].create({'name': 'Patient A'})
+        self.patient_b = self.env['res.partner'].create({'name': 'Patient B'})
+
+        self.apparatus = self.env['medical.affected.apparatus'].create({
+            'name': 'Bulk Invoicing Apparatus',
+        })
+        self.treatment = self.env['medical.treatment'].create({
+            'name': 'Bulk Invoicing Treatment',
+            'code': 'BIT001',
+            'price': 100.0,
+        })
+        self.product = self.env['product.product'].create({
+            'name': 'Therapy Service',
+            'type': 'service',
+        })
+        self.journal = self.env['account.journal'].create({
+            'name': 'Medical Sales Journal',
+            'code': 'MSJ',
+            'type': 'sale',
+        })
+
+    def _create_therapy(self, patient, price=100.0):
+        return self.env['medical.therapy'].create({
+            'patient_id': patient.id,
+            'affected_apparatus_id': self.apparatus.id,
+            'treatment_id': self.treatment.id,
+            'price': price,
+            'therapy_product_id': self.product.id,
+            'therapy_journal_id': self.journal.id,
+        })
+
+    def test_therapies_grouped_by_patient(self):
+        """One invoice is created per patient, with one line per therapy"""
+        therapies = self._create_therapy(self.patient_a) | self._create_therapy(self.patient_a, 50.0) \
+            | self._create_therapy(self.patient_b)
+
+        invoices = therapies._create_invoices()
+
+        self.assertEqual(len(invoices), 2)
+        invoice_a = invoices.filtered(lambda m: m.partner_id == self.patient_a)
+        self.assertEqual(len(invoice_a.invoice_line_ids), 2)
+        self.assertEqual(sorted(invoice_a.invoice_line_ids.mapped('price_unit')), [50.0, 100.0])
+        for therapy in therapies:
+            self.assertEqual(therapy.invoice_id.partner_id, therapy.patient_id)
+            self.assertEqual(therapy.invoice_state, 'draft')
+
+    def test_already_invoiced_records_are_skipped(self):
+        """Records linked to an invoice are not invoiced twice"""
+        therapy = self._create_therapy(self.patient_a)
+        invoice = therapy._create_invoices()
+        self.assertTrue(invoice)
+
+        other = self._create_therapy(self.patient_a)
+        invoices = (therapy | other)._create_invoices()
+
+        self.assertEqual(len(invoices), 1)
+        self.assertNotEqual(invoices, invoice)
+        self.assertEqual(therapy.invoice_id, invoice)
+        self.assertEqual(other.invoice_id, invoices)
+
+    def test_bulk_action_opens_invoice_list(self):
+        """The bulk action returns a list action when several invoices are created"""
+        therapies = self._create_therapy(self.patient_a) | self._create_therapy(self.patient_b)
+
+        action = therapies.action_create_invoices()
+
+        self.assertEqual(action['res_model'], 'account.move')
+        self.assertEqual(action['domain'], [('id', 'in', therapies.invoice_id.ids)])
+
+    def test_unfinished_consultations_are_not_invoiced(self):
+        """Consultations are only invoiced once finished"""
+        consultation = self.env['medical.consultation'].create({
+            'patient_id': self.patient_a.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_journal_id': self.journal.id,
+            'consultation_reason': 'Control',
+        })
+        with self.assertRaises(ValidationError):
+            consultation.action_create_invoices()
+        self.assertFalse(consultation.invoice_id)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import io
+import threading
+import zipfile
+
+from odoo.exceptions import AccessError, ValidationError
+from odoo.tests import TransactionCase, new_test_user
+
+
+class TestCertificateBatch(TransactionCase):
+
+    def setUp(self):
+        super(TestCertificateBatch, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Certificate Patient'})
+        self.product = self.env['product.product'].create({
+            'name': 'Consultation Service',
+            'type': 'service',
+        })
+        self.consultations = self.env['medical.consultation'].create([{
+            'patient_id': self.patient.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Reposo %s' % index,
+            'state': 'finished',
+        } for index in range(3)])
+
+    def test_report_lookup_is_cached(self):
+        Consultation = self.env['medical.consultation']
+        report = self.env.ref('odoo_medical.action_report_iess_medical_certificate')
+        self.assertEqual(Consultation._get_certificate_report('iess'), report)
+        with self.assertQueryCount(0):
+            Consultation._get_certificate_report('iess')
+
+    def test_batch_renders_one_zip(self):
+        """Every certificate of the batch ends up in the ZIP attachment, in chunks"""
+        action = self.consultations.action_create_certificate_batch('iess')
+        batch = self.env['medical.certificate.batch'].browse(action['res_id'])
+        self.patch(type(batch), '_batch_chunk_size', 2)
+
+        batch._process_chunk()
+        self.assertEqual(batch.state, 'running')
+        self.assertEqual(batch.done_count, 2)
+        batch._process_chunk()
+        self.assertEqual(batch.state, 'done')
+        self.assertEqual(batch.progress, 100.0)
+
+        with zipfile.ZipFile(io.BytesIO(batch.attachment_id.raw)) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+
+    def test_batch_resumes_after_changes(self):
+        """Consultations added to a running batch are rendered, the rendered
+        ones are not rendered twice"""
+        action = self.consultations[:2].action_create_certificate_batch('iess')
+        batch = self.env['medical.certificate.batch'].browse(action['res_id'])
+        self.patch(type(batch), '_batch_chunk_size', 1)
+
+        batch._process_chunk()
+        self.assertEqual(batch.rendered_consultation_ids, self.consultations[0])
+        batch.consultation_ids = [(4, self.consultations[2].id)]
+        batch._process_chunk()
+        batch._process_chunk()
+        self.assertEqual(batch.state, 'done')
+        self.assertEqual(batch.done_count, 3)
+        with zipfile.ZipFile(io.BytesIO(batch.attachment_id.raw)) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+
+    def test_render_with_worker_pool(self):
+        """The certificates rendered by the worker threads are returned in order"""
+        Batch = self.env['medical.certificate.batch']
+        self.patch(type(Batch), '_certificate_workers', lambda self: 2)
+        self.patch(type(Batch), '_render_certificates_worker', lambda self, report_name, ids: [
+            ('%s.pdf' % consultation_id, threading.current_thread().name.encode()) for consultation_id in ids
+        ])
+        ids = self.consultations.ids
+        certificates = Batch._render_certificates('odoo_medical.report_iess_medical_certificate', ids)
+        self.assertEqual([filename for filename, _content in certificates], ['%s.pdf' % i for i in ids])
+        self.assertTrue(all(content.startswith(b'medical_certificates') for _filename, content in certificates))
+
+    def test_batch_needs_read_access(self):
+        """The cron renders the batches as superuser, users can only queue
+        the consultations they can read"""
+        user = new_test_user(self.env, login='certificate_batch_user',
+                             groups='base.group_user,odoo_medical.group_medical_history_user')
+        self.env['ir.rule'].create({
+            'name': 'Own consultations',
+            'model_id': self.env['ir.model']._get_id('medical.consultation'),
+            'domain_force': "[('doctor_id', '=', user.id)]",
+        })
+        with self.assertRaises(AccessError):
+            self.env['medical.certificate.batch'].with_user(user).create({
+                'certificate_type': 'iess',
+                'consultation_ids': [(6, 0, self.consultations.ids)],
+            })
+
+    def test_only_finished_consultations(self):
+        self.consultations.write({'state': 'in_progress'})
+        with self.assertRaises(ValidationError):
+            self.consultations.action_create_certificate_batch('private')
+
+    def test_rendered_certificate_is_cached(self):
+        """Reprints read the cached rendering until the consultation changes"""
+        consultation = self.consultations[0]
+        Report = self.env['ir.actions.report']
+        report_name = 'odoo_medical.report_iess_medical_certificate'
+
+        content = Report._render_qweb_html(report_name, consultation.ids)[0]
+        cache_domain = [
+            ('res_model', '=', 'medical.consultation'),
+            ('res_id', '=', consultation.id),
+            ('res_field', '=', 'medical_certificate_cache'),
+            ('description', '=like', 'medical_certificate_cache:%'),
+        ]
+        self.assertEqual(self.env['ir.attachment'].search_count(cache_domain), 1)
+        self.assertEqual(str(Report._render_qweb_html(report_name, consultation.ids)[0]), str(content))
+        self.assertEqual(self.env['ir.attachment'].search_count(cache_domain), 1)
+
+        # Fields not shown on the certificate keep the cached rendering
+        consultation.write({'consultation_reason': 'Control'})
+        self.assertEqual(self.env['ir.attachment'].search_count(cache_domain), 1)
+        consultation.write({'diagnosis': 'Lumbalgia'})
+        self.assertFalse(self.env['ir.attachment'].search_count(cache_domain))
+
+        Report._render_qweb_html(report_name, consultation.ids)
+        self.patient.write({'name': 'Certificate Patient Renamed'})
+        self.assertFalse(self.env['ir.attachment'].search_count(cache_domain))
+
+    def test_cached_certificate_follows_recomputed_values(self):
+        """Values recomputed without a write, such as the age refreshed by the
+        daily job, miss the cached rendering"""
+        consultation = self.consultations[0]
+        report_name = 'odoo_medical.report_iess_medical_certificate'
+        consultation.birth_date = '1990-01-01'
+        self.env['ir.actions.report']._render_qweb_html(report_name, consultation.ids)
+        self.assertIsNotNone(consultation._get_cached_certificate(report_name))
+        # The cached rendering is not an attachment of the chatter
+        self.assertFalse(self.env['ir.attachment'].search([
+            ('res_model', '=', 'medical.consultation'),
+            ('res_id', '=', consultation.id),
+        ]))
+
+        self.env.cr.execute("UPDATE medical_consultation SET age = 0 WHERE id = %s", [consultation.id])
+        consultation.invalidate_recordset(['age'])
+        self.assertIsNone(consultation._get_cached_certificate(report_name))
+        consultation._recompute_age()
+        self.assertIsNotNone(consultation._get_cached_certificate(report_name))
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase
+
+
+class TestClinicalTimeline(TransactionCase):
+
+    def setUp(self):
+        super(TestClinicalTimeline, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Timeline Patient'})
+        self.other_patient = self.env['res.partner'].create({'name': 'Other Patient'})
+        self.histories = self.env['medical.history'].create([{
+            'partner_id': self.patient.id,
+            'category': 'medical',
+            'name': 'History %s' % day,
+            'date_record': date(2024, 1, day),
+        } for day in range(1, 6)])
+        self.env['medical.history'].create({
+            'partner_id': self.other_patient.id,
+            'category': 'medical',
+            'name': 'Other History',
+            'date_record': date(2024, 1, 3),
+        })
+
+    def test_keyset_pages(self):
+        """Pages are ordered by date, do not overlap and end with no cursor"""
+        first = self.patient.get_clinical_timeline(limit=3)
+        self.assertEqual([entry['title'] for entry in first['entries']], ['History 5', 'History 4', 'History 3'])
+        self.assertTrue(first['next_cursor'])
+
+        second = self.patient.get_clinical_timeline(limit=3, cursor=first['next_cursor'])
+        self.assertEqual([entry['title'] for entry in second['entries']], ['History 2', 'History 1'])
+        self.assertFalse(second['next_cursor'])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(UserError):
+            self.patient.get_clinical_timeline(cursor='not-a-cursor')
+
+    def test_limit_at_least_one(self):
+        page = self.patient.get_clinical_timeline(limit=0)
+        self.assertEqual([entry['title'] for entry in page['entries']], ['History 5'])
+        self.assertTrue(page['next_cursor'])
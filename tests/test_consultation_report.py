@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date, datetime
+
+from odoo.tests import TransactionCase
+
+
+class TestConsultationReport(TransactionCase):
+
+    def setUp(self):
+        super(TestConsultationReport, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Report Patient'})
+        self.product = self.env['product.product'].create({
+            'name': 'Consultation Service',
+            'type': 'service',
+        })
+        self.Report = self.env['medical.consultation.report']
+
+    def _create_consultation(self, consultation_date):
+        return self.env['medical.consultation'].create({
+            'patient_id': self.patient.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Control',
+            'consultation_date': consultation_date,
+            'consultation_fee': 40.0,
+        })
+
+    def _set_params(self, **params):
+        for key, value in params.items():
+            self.env['ir.config_parameter'].sudo().set_param('odoo_medical.%s' % key, value)
+        self.env.registry.clear_cache()
+        self.Report.init()
+
+    def test_buckets_in_clinic_timezone(self):
+        """A late evening consultation in Ecuador is bucketed on the local day"""
+        self._set_params(clinic_tz='America/Guayaquil')
+        consultation = self._create_consultation(datetime(2024, 3, 1, 2, 30))
+        self.env.flush_all()
+
+        row = self.Report.search([('consultation_id', '=', consultation.id)])
+        self.assertEqual(row.date_day, date(2024, 2, 29))
+        self.assertEqual(row.date_week, date(2024, 2, 26))
+        self.assertEqual(row.date_month, date(2024, 2, 1))
+        self.assertEqual(row.total_to_pay, 40.0)
+
+    def test_materialized_refresh(self):
+        """The materialized report picks up changed and deleted consultations"""
+        consultation = self._create_consultation(datetime(2024, 3, 1, 12, 0))
+        self._set_params(consultation_report_materialized='True')
+        self.assertTrue(self.Report.search([('consultation_id', '=', consultation.id)]))
+
+        other = self._create_consultation(datetime(2024, 3, 2, 12, 0))
+        consultation.consultation_fee = 60.0
+        self.Report._cron_refresh()
+        self.assertEqual(self.Report.search([('consultation_id', '=', consultation.id)]).total_to_pay, 60.0)
+        self.assertTrue(self.Report.search([('consultation_id', '=', other.id)]))
+
+        # Deleted consultations leave the report without waiting for the refresh
+        other.unlink()
+        self.assertFalse(self.Report.search([('consultation_id', '=', other.id)]))
+
+    def test_materialized_refresh_keeps_registry_caches(self):
+        """The refresh does not write config parameters, which would clear
+        the registry caches of every worker"""
+        self._set_params(consultation_report_materialized='True')
+        self._create_consultation(datetime(2024, 3, 1, 12, 0))
+        self.env.cr.execute("SELECT refreshed_at FROM medical_consultation_report_refresh")
+        refreshed_at = self.env.cr.fetchone()[0]
+        written = []
+        self.patch(type(self.env['ir.config_parameter']), 'set_param', lambda self, key, value: written.append(key))
+        self.Report._cron_refresh()
+        self.assertFalse(written)
+        self.env.cr.execute("SELECT refreshed_at FROM medical_consultation_report_refresh")
+        self.assertGreaterEqual(self.env.cr.fetchone()[0], refreshed_at)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase
+
+
+class TestMedicalCountMixin(TransactionCase):
+
+    def setUp(self):
+        super(TestMedicalCountMixin, self).setUp()
+        self.treatments = self.env['medical.treatment'].create([
+            {'name': 'Count Treatment A', 'code': 'CNT001'},
+            {'name': 'Count Treatment B', 'code': 'CNT002'},
+        ])
+
+    def test_one2many_counts(self):
+        treatment_a, treatment_b = self.treatments
+        self.env['medical.treatment.session'].create([
+            {'name': 'Session %s' % sequence, 'treatment_id': treatment_a.id, 'sequence': sequence}
+            for sequence in (1, 2, 3)
+        ])
+        self.treatments.invalidate_recordset(['session_count'])
+        self.assertEqual(treatment_a.session_count, 3)
+        self.assertEqual(treatment_b.session_count, 0)
+
+    def test_many2many_counts_without_reverse_field(self):
+        """Many2many fields are counted even when the comodel has no field
+        pointing back"""
+        self.addCleanup(self.registry.reset_changes)
+        self.env['ir.model.fields'].create({
+            'name': 'x_category_ids',
+            'model_id': self.env['ir.model']._get_id('medical.treatment'),
+            'ttype': 'many2many',
+            'relation': 'res.partner.category',
+        })
+        categories = self.env['res.partner.category'].create([{'name': 'Count Tag 1'}, {'name': 'Count Tag 2'}])
+        treatment_a, treatment_b = self.treatments
+        treatment_a.x_category_ids = categories
+        treatment_b.x_category_ids = categories[0]
+
+        counts = self.treatments._read_related_counts('x_category_ids')
+        self.assertEqual(counts, {treatment_a.id: 2, treatment_b.id: 1})
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase
+
+
+class TestFulltextSearch(TransactionCase):
+
+    def setUp(self):
+        super(TestFulltextSearch, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Fulltext Patient'})
+        self.product = self.env['product.product'].create({
+            'name': 'Consultation Service',
+            'type': 'service',
+        })
+        self.lumbar = self.env['medical.consultation'].create({
+            'patient_id': self.patient.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Dolor lumbar persistente',
+            'diagnosis': 'Lumbalgia mecánica',
+        })
+        self.cephalea = self.env['medical.consultation'].create({
+            'patient_id': self.patient.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Cefalea',
+            'observations': 'Refiere dolor lumbar leve',
+        })
+        self.history = self.env['medical.history'].create({
+            'partner_id': self.patient.id,
+            'category': 'medical',
+            'name': 'Hernia discal',
+            'description': 'Dolor lumbar desde 2019',
+        })
+
+    def test_search_view_filter(self):
+        """The search field matches the narrative fields"""
+        consultations = self.env['medical.consultation'].search([
+            ('patient_id', '=', self.patient.id),
+            ('fulltext_search', 'ilike', 'dolor lumbar'),
+        ])
+        self.assertEqual(consultations, self.lumbar | self.cephalea)
+
+    def test_search_view_filter_operators(self):
+        Consultation = self.env['medical.consultation']
+        patient_domain = [('patient_id', '=', self.patient.id)]
+        self.assertEqual(Consultation.search(patient_domain + [('fulltext_search', 'not ilike', 'lumbalgia')]),
+                         self.cephalea)
+        self.assertEqual(Consultation.search(patient_domain + [('fulltext_search', 'ilike', '')]),
+                         self.lumbar | self.cephalea)
+        with self.assertRaises(UserError):
+            Consultation.search([('fulltext_search', 'in', ['dolor'])])
+
+    def test_ranked_hits(self):
+        """Matches in the reason rank above matches in the observations"""
+        hits = self.env['medical.consultation'].search_fulltext('dolor lumbar', domain=[('patient_id', '=', self.patient.id)])
+        self.assertEqual([hit['res_id'] for hit in hits], [self.lumbar.id, self.cephalea.id])
+        self.assertIn('<b>', hits[0]['snippet'])
+
+    def test_search_across_models(self):
+        hits = self.env['medical.fulltext.mixin'].search_clinical_text('"dolor lumbar" hernia')
+        self.assertIn(('medical.history', self.history.id), [(hit['res_model'], hit['res_id']) for hit in hits])
+
+    def test_snippet_escaped(self):
+        """The clinical text is escaped in the snippets, only the matches are HTML"""
+        self.lumbar.observations = 'Dolor lumbar <img src=x onerror=alert(1)>'
+        hits = self.env['medical.consultation'].search_fulltext('lumbar', domain=[('id', '=', self.lumbar.id)])
+        self.assertIn('<b>', hits[0]['snippet'])
+        self.assertNotIn('<img', hits[0]['snippet'])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+from odoo.tests import TransactionCase
+
+
+class TestMedicalIcd10(TransactionCase):
+
+    def setUp(self):
+        super(TestMedicalIcd10, self).setUp()
+        Group = self.env['medical.icd10.group']
+        self.chapter = Group.create({'name': 'Test Chapter', 'code': 'TST'})
+        self.block = Group.create({'name': 'Test Block', 'code': 'TST1', 'parent_id': self.chapter.id})
+        self.empty = Group.create({'name': 'Empty Block', 'code': 'TST2', 'parent_id': self.chapter.id})
+
+        self.env['medical.icd10'].create([
+            {'code': 'T00', 'description': 'Chapter code', 'group_id': self.chapter.id},
+            {'code': 'T10', 'description': 'Block code 1', 'group_id': self.block.id},
+            {'code': 'T11', 'description': 'Block code 2', 'group_id': self.block.id},
+        ])
+
+    def test_group_counts(self):
+        """Direct and total counts roll up through the group hierarchy"""
+        groups = self.chapter | self.block | self.empty
+        self.assertEqual(groups.mapped('icd10_count'), [1, 2, 0])
+        self.assertEqual(groups.mapped('total_icd10_count'), [3, 2, 0])
+
+    def test_catalogue_loader(self):
+        """The catalogue loader builds the hierarchy and is idempotent"""
+        catalogue = (
+            "kind\tcode\tparent\tname\tdescription\n"
+            "group\tZZ\t\tCAPITULO DE PRUEBA\tCapitulo cargado en bloque\n"
+            "group\tZZ1\tZZ\tBLOQUE DE PRUEBA\t\n"
+            "code\tZZ1.0\tZZ1\tEnfermedad de prueba\t\n"
+            "code\tZZ1.1\tZZ1\tOtra enfermedad de prueba\t\n"
+        )
+        Loader = self.env['medical.icd10.loader']
+        result = Loader.load_catalogue(io.StringIO(catalogue), lang='en_US')
+        self.assertEqual(result, {'groups': 2, 'codes': 2})
+
+        block = self.env['medical.icd10.group'].search([('code', '=', 'ZZ1')])
+        chapter = self.env['medical.icd10.group'].search([('code', '=', 'ZZ')])
+        self.assertEqual(block.parent_id, chapter)
+        self.assertEqual(block.parent_path, '%s/%s/' % (chapter.id, block.id))
+        self.assertEqual(chapter.total_icd10_count, 2)
+
+        code = self.env['medical.icd10'].search([('code', '=', 'ZZ1.0')])
+        self.assertEqual(code.group_id, block)
+        self.assertEqual(code.display_name, 'ZZ1.0 - Enfermedad de prueba')
+
+        Loader.load_catalogue(io.StringIO(catalogue), lang='en_US')
+        self.assertEqual(self.env['medical.icd10'].search_count([('code', '=like', 'ZZ1.%')]), 2)
+
+    def test_catalogue_loader_translation(self):
+        """Loading a catalogue in another language keeps the English names,
+        and a group the file no longer nests loses its parent"""
+        Loader = self.env['medical.icd10.loader']
+        Loader.load_catalogue(io.StringIO(
+            "kind\tcode\tparent\tname\n"
+            "group\tZZ\t\tTest chapter\n"
+            "group\tZZ1\tZZ\tTest block\n"
+            "code\tZZ1.0\tZZ1\tTest disease\n"
+        ), lang='en_US')
+        Loader.load_catalogue(io.StringIO(
+            "kind\tcode\tparent\tname\n"
+            "group\tZZ1\t\tBloque de prueba\n"
+            "code\tZZ1.0\tZZ1\tEnfermedad de prueba\n"
+        ), lang='es_EC')
+
+        self.env.cr.execute(
+            "SELECT name->>'en_US', name->>'es_EC', parent_id FROM medical_icd10_group WHERE code = 'ZZ1'")
+        self.assertEqual(self.env.cr.fetchone(), ('Test block', 'Bloque de prueba', None))
+        self.env.cr.execute("SELECT description->>'en_US', description->>'es_EC' FROM medical_icd10 WHERE code = 'ZZ1.0'")
+        self.assertEqual(self.env.cr.fetchone(), ('Test disease', 'Enfermedad de prueba'))
+
+    def test_search_ranked(self):
+        """Exact codes and code prefixes rank before description matches"""
+        self.env['medical.icd10'].create([
+            {'code': 'T20', 'description': 'Infección sin código T1'},
+            {'code': 'T1', 'description': 'Código exacto'},
+        ])
+        results = self.env['medical.icd10'].search_ranked('t1')
+        self.assertEqual(results.mapped('code')[:3], ['T1', 'T10', 'T11'])
+        self.assertIn('T20', results.mapped('code'))
+
+        # Case is ignored on descriptions, and accents too when unaccent is installed
+        results = self.env['medical.icd10'].search_ranked('INFECCIÓN')
+        self.assertEqual(results.mapped('code'), ['T20'])
+        if self.env.registry.has_unaccent:
+            results = self.env['medical.icd10'].search_ranked('infeccion')
+            self.assertEqual(results.mapped('code'), ['T20'])
+
+        # Many2one autocompletion goes through the ranked search
+        names = self.env['medical.icd10'].name_search('T1')
+        exact = self.env['medical.icd10'].search([('code', '=', 'T1')])
+        self.assertEqual(names[0][0], exact.id)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase
+
+
+class TestPatientAge(TransactionCase):
+
+    def setUp(self):
+        super(TestPatientAge, self).setUp()
+        today = fields.Date.today()
+        self.birthday_patient = self.env['res.partner'].create({
+            'name': 'Birthday Patient',
+            'birthdate_date': today - relativedelta(years=30),
+        })
+        self.other_patient = self.env['res.partner'].create({
+            'name': 'Other Patient',
+            'birthdate_date': today - relativedelta(years=40, days=-10),
+        })
+        # Simulate ages computed yesterday
+        self.env.cr.execute(
+            "UPDATE res_partner SET age = age - 1 WHERE id IN %s",
+            [(self.birthday_patient.id, self.other_patient.id)])
+        self.env.invalidate_all()
+        self.env['ir.config_parameter'].sudo().set_param(
+            'odoo_medical.age_last_update', fields.Date.to_string(today - timedelta(days=1)))
+
+    def test_daily_update_only_touches_birthdays(self):
+        """Only the patients whose birthday is today get a new age"""
+        self.env['res.partner']._cron_update_patient_ages()
+        self.assertEqual(self.birthday_patient.age, 30)
+        self.assertEqual(self.other_patient.age, 38)
+        self.assertEqual(
+            self.env['ir.config_parameter'].sudo().get_param('odoo_medical.age_last_update'),
+            fields.Date.to_string(fields.Date.today()))
+
+    def test_catch_up_in_batches(self):
+        """A catch-up after a long downtime resumes batch after batch"""
+        self.env['ir.config_parameter'].sudo().set_param('odoo_medical.age_last_update', '2000-01-01')
+        Partner = self.env['res.partner']
+        while self.env['ir.config_parameter'].sudo().get_param('odoo_medical.age_last_update') != \
+                fields.Date.to_string(fields.Date.today()):
+            Partner._cron_update_patient_ages(batch_size=1)
+        self.assertEqual(self.birthday_patient.age, 30)
+        self.assertEqual(self.other_patient.age, 39)
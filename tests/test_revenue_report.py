@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, new_test_user
+
+
+class TestRevenueReport(TransactionCase):
+
+    def setUp(self):
+        super(TestRevenueReport, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Revenue Patient'})
+        self.product = self.env['product.product'].create({
+            'name': 'Medical Service',
+            'type': 'service',
+        })
+        self.journal = self.env['account.journal'].create({
+            'name': 'Medical Revenue Journal',
+            'code': 'MRJ',
+            'type': 'sale',
+        })
+        self.consultation = self.env['medical.consultation'].create({
+            'patient_id': self.patient.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Control',
+            'consultation_fee': 30.0,
+        })
+        self.therapy = self.env['medical.therapy'].create({
+            'patient_id': self.patient.id,
+            'affected_apparatus_id': self.env['medical.affected.apparatus'].create({'name': 'Revenue Apparatus'}).id,
+            'treatment_id': self.env['medical.treatment'].create({
+                'name': 'Revenue Treatment',
+                'code': 'REV001',
+                'price': 80.0,
+            }).id,
+            'price': 80.0,
+            'therapy_product_id': self.product.id,
+            'therapy_journal_id': self.journal.id,
+        })
+
+    def _rows(self):
+        self.env.flush_all()
+        return self.env['medical.revenue.report'].search([('patient_id', '=', self.patient.id)])
+
+    def test_sources_are_unioned(self):
+        rows = self._rows()
+        self.assertEqual(
+            sorted((row.res_model, row.res_id, row.amount) for row in rows),
+            [('medical.consultation', self.consultation.id, 30.0), ('medical.therapy', self.therapy.id, 80.0)])
+        self.assertEqual(set(rows.mapped('invoice_state')), {'not_invoiced'})
+        self.assertFalse(sum(rows.mapped('posted_amount')))
+
+    def test_invoice_state(self):
+        invoice = self.therapy._create_invoices()
+        row = self._rows().filtered(lambda r: r.res_model == 'medical.therapy')
+        self.assertEqual(row.invoice_id, invoice)
+        self.assertEqual(row.invoice_state, 'draft')
+        self.assertEqual(row.company_id, self.journal.company_id)
+
+    def test_company_rule(self):
+        """Rows of the other companies are hidden"""
+        self.consultation.company_id = self.env['res.company'].create({'name': 'Other Revenue Clinic'})
+        user = new_test_user(self.env, login='revenue_report_user', groups='base.group_user,odoo_medical.group_medical_history_user')
+        self.env.flush_all()
+        rows = self.env['medical.revenue.report'].with_user(user).search([('patient_id', '=', self.patient.id)])
+        self.assertEqual(rows.mapped('res_model'), ['medical.therapy'])
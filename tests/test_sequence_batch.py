@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase
+
+
+class TestSequenceBatch(TransactionCase):
+
+    def _create_sequence(self, implementation):
+        return self.env['ir.sequence'].create({
+            'name': 'Test Batch Sequence',
+            'code': 'test.medical.batch.%s' % implementation,
+            'prefix': 'TB',
+            'padding': 4,
+            'implementation': implementation,
+            'company_id': False,
+        })
+
+    def test_batch_standard_sequence(self):
+        """A standard sequence hands out consecutive references"""
+        self._create_sequence('standard')
+        names = self.env['ir.sequence'].next_batch_by_code('test.medical.batch.standard', 3)
+        self.assertEqual(names, ['TB0001', 'TB0002', 'TB0003'])
+        self.assertEqual(self.env['ir.sequence'].next_by_code('test.medical.batch.standard'), 'TB0004')
+
+    def test_batch_no_gap_sequence(self):
+        """A no-gap sequence is advanced by the whole batch at once"""
+        sequence = self._create_sequence('no_gap')
+        names = self.env['ir.sequence'].next_batch_by_code('test.medical.batch.no_gap', 3)
+        self.assertEqual(names, ['TB0001', 'TB0002', 'TB0003'])
+        self.assertEqual(sequence.number_next_actual, 4)
+
+    def test_batch_unknown_code(self):
+        """An unknown code yields one False per requested number"""
+        self.assertEqual(self.env['ir.sequence'].next_batch_by_code('test.medical.unknown', 2), [False, False])
+
+    def test_bulk_create_uses_sequence(self):
+        """Partners created in bulk receive distinct medical record numbers"""
+        partners = self.env['res.partner'].create([{'name': 'Patient %s' % i} for i in range(5)])
+        numbers = partners.mapped('medical_record_number')
+        self.assertEqual(len(set(numbers)), 5)
+        self.assertNotIn('New', numbers)
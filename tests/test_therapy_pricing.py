@@ -141,3 +141,27 @@ class TestMedicalTreatmentTherapyPricing(TransactionCase):
         therapy.therapy_product_id = False
         with self.assertRaises(UserError):
             therapy.action_create_invoice()
+
+    def test_create_from_treatment(self):
+        """Therapies created in bulk from a treatment get their session records"""
+        self.env['medical.treatment.session'].create([{
+            'name': 'Session %s' % i,
+            'treatment_id': self.treatment.id,
+            'sequence': i,
+        } for i in range(1, 4)])
+        other_patient = self.env['res.partner'].create({
+            'name': 'Other Patient',
+        })
+        
+        therapies = self.env['medical.therapy'].create_from_treatment(
+            self.patient | other_patient, self.treatment,
+            {'affected_apparatus_id': self.apparatus.id},
+        )
+        
+        self.assertEqual(len(therapies), 2)
+        self.assertEqual(therapies.patient_id, self.patient | other_patient)
+        for therapy in therapies:
+            self.assertEqual(therapy.price, self.treatment.price)
+            self.assertEqual(therapy.total_sessions, 3)
+            self.assertEqual(therapy.session_record_ids.mapped('session_sequence'), [1, 2, 3])
+            self.assertFalse(therapy.session_record_ids.message_ids)
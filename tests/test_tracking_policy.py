@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase
+
+
+class TestTrackingPolicy(TransactionCase):
+
+    def setUp(self):
+        super(TestTrackingPolicy, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Tracking Patient'})
+        self.product = self.env['product.product'].create({
+            'name': 'Consultation Service',
+            'type': 'service',
+        })
+        self.consultation = self.env['medical.consultation'].create({
+            'patient_id': self.patient.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Control',
+        })
+        self._flush_tracking()
+
+    def _flush_tracking(self):
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+    def _set_policy(self, group, policy):
+        self.env['ir.config_parameter'].sudo().set_param('odoo_medical.tracking_%s' % group, policy)
+        self.env.registry.clear_cache()
+
+    def _tracking_values(self, field_names):
+        return self.env['mail.tracking.value'].sudo().search([
+            ('mail_message_id.model', '=', 'medical.consultation'),
+            ('mail_message_id.res_id', '=', self.consultation.id),
+            ('field_id.name', 'in', field_names),
+        ])
+
+    def test_full_policy(self):
+        self._set_policy('vitals', 'full')
+        self.consultation.write({'systolic_pressure': 120, 'diastolic_pressure': 80})
+        self._flush_tracking()
+        self.assertEqual(len(self._tracking_values(['systolic_pressure', 'diastolic_pressure'])), 2)
+
+    def test_summary_policy(self):
+        """Summary changes are logged in one message without tracking values"""
+        self._set_policy('vitals', 'summary')
+        messages = self.consultation.message_ids
+        self.consultation.write({'systolic_pressure': 120, 'diastolic_pressure': 80})
+        self._flush_tracking()
+
+        self.assertFalse(self._tracking_values(['systolic_pressure', 'diastolic_pressure']))
+        new_messages = self.consultation.message_ids - messages
+        self.assertEqual(len(new_messages), 1)
+        self.assertIn('o_medical_tracking_summary', new_messages.body)
+        self.assertIn('120', new_messages.body)
+
+    def test_off_policy(self):
+        self._set_policy('vitals', 'off')
+        messages = self.consultation.message_ids
+        self.consultation.write({'systolic_pressure': 120})
+        self._flush_tracking()
+        self.assertEqual(self.consultation.message_ids, messages)
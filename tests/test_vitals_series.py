@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from odoo.exceptions import AccessError
+from odoo.tests import TransactionCase, new_test_user
+
+
+class TestVitalsSeries(TransactionCase):
+
+    def setUp(self):
+        super(TestVitalsSeries, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Vitals Patient'})
+        self.product = self.env['product.product'].create({
+            'name': 'Consultation Service',
+            'type': 'service',
+        })
+        self.consultations = self.env['medical.consultation'].create([{
+            'patient_id': self.patient.id,
+            'consultation_type': 'follow_up',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Control',
+            'consultation_date': consultation_date,
+            'state': 'in_progress',
+            'systolic_pressure': systolic,
+            'diastolic_pressure': 80,
+            'weight_kg': weight,
+        } for consultation_date, systolic, weight in [
+            (datetime(2024, 3, 1, 9, 0), 130, 82.0),
+            (datetime(2024, 1, 1, 9, 0), 140, 85.0),
+        ]])
+
+    def test_finished_consultations_are_appended(self):
+        series = self.patient.get_vitals_series()
+        self.assertEqual(series['dates'], [])
+
+        self.consultations.action_finish_consultation()
+        series = self.patient.get_vitals_series()
+        self.assertEqual(series['dates'], ['2024-01-01 09:00:00', '2024-03-01 09:00:00'])
+        self.assertEqual(series['systolic_pressure'], [140, 130])
+        self.assertEqual(series['diastolic_pressure'], [80, 80])
+        self.assertEqual(series['weight_kg'], [85.0, 82.0])
+
+        # Corrections of a finished consultation replace its measurement
+        self.consultations[0].systolic_pressure = 125
+        series = self.patient.get_vitals_series(date_from='2024-02-01')
+        self.assertEqual(series['systolic_pressure'], [125])
+
+    def test_patient_weight_is_appended(self):
+        self.patient.weight_kg = 90.0
+        series = self.patient.get_vitals_series()
+        self.assertEqual(series['weight_kg'], [90.0])
+        self.assertEqual(series['systolic_pressure'], [None])
+
+    def test_series_requires_medical_access(self):
+        """Internal users outside the medical groups cannot read the series"""
+        user = new_test_user(self.env, login='vitals_no_medical', groups='base.group_user')
+        with self.assertRaises(AccessError):
+            self.patient.with_user(user).get_vitals_series()
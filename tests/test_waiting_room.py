@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import json
+from datetime import datetime
+
+from odoo.tests import TransactionCase, new_test_user
+
+
+class TestWaitingRoom(TransactionCase):
+
+    def setUp(self):
+        super(TestWaitingRoom, self).setUp()
+        self.patient = self.env['res.partner'].create({'name': 'Waiting Patient'})
+        self.product = self.env['product.product'].create({
+            'name': 'Consultation Service',
+            'type': 'service',
+        })
+        self.doctor = new_test_user(self.env, login='waiting_room_doctor', groups='base.group_user,odoo_medical.group_medical_history_user')
+        self.env['medical.consultation'].search([('state', '=', 'waiting')]).write({'state': 'finished'})
+        self.late, self.early = self.env['medical.consultation'].create([{
+            'patient_id': self.patient.id,
+            'consultation_type': 'first_time',
+            'consultation_product_id': self.product.id,
+            'consultation_reason': 'Control',
+            'consultation_date': consultation_date,
+        } for consultation_date in (datetime(2024, 5, 1, 10, 0), datetime(2024, 5, 1, 9, 0))])
+
+    def test_call_next_patient_by_arrival(self):
+        """Patients are called in order of arrival by the calling doctor"""
+        Consultation = self.env['medical.consultation'].with_user(self.doctor)
+        first = Consultation.call_next_patient()
+        self.assertEqual(first, self.early)
+        self.assertEqual(first.state, 'in_progress')
+        self.assertEqual(first.doctor_id, self.doctor)
+        self.assertTrue(first.start_datetime)
+
+        self.assertEqual(Consultation.call_next_patient(), self.late)
+        self.assertFalse(Consultation.call_next_patient())
+
+    def test_start_consultation(self):
+        self.late.action_start_consultation()
+        self.assertEqual(self.late.state, 'in_progress')
+        self.assertEqual(self.env['medical.consultation'].call_next_patient(), self.early)
+
+    def test_board_notified_once_per_transaction(self):
+        """The cards changed in a transaction are pushed in one bus message"""
+        self.env.cr.precommit.run()
+        last_id = self.env['bus.bus'].search([], order='id desc', limit=1).id
+        self.late.action_start_consultation()
+        self.early.action_start_consultation()
+        self.env.cr.precommit.run()
+
+        messages = [json.loads(bus.message) for bus in self.env['bus.bus'].search([('id', '>', last_id)])]
+        messages = [message for message in messages if message['type'] == 'odoo_medical.waiting_room']
+        self.assertEqual(len(messages), 1)
+        self.assertEqual({card['id'] for card in messages[0]['payload']['cards']}, {self.late.id, self.early.id})
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from odoo.tests import TransactionCase
+
+from odoo.addons.odoo_medical.models.medical_xray_archive import _remove_hot_copies
+from odoo.addons.odoo_medical.tests.test_xray_dicom import _dicom_file
+
+
+class TestXrayArchive(TransactionCase):
+
+    def setUp(self):
+        super(TestXrayArchive, self).setUp()
+        patient = self.env['res.partner'].create({'name': 'Archive Patient'})
+        area = self.env['medical.xray.area'].create({'name': 'Archive Area'})
+        self.orders = self.env['medical.xray.order'].create([{
+            'patient_id': patient.id,
+            'date': datetime(2020, 1, 1),
+            'line_ids': [(0, 0, {'area_id': area.id, 'projection_type': 'ap'})],
+        } for _index in range(2)])
+        self.content = b'archived x-ray %s' % self.env.cr.dbname.encode() * 1000
+
+        # The bundles of the tests are written out of the filestore
+        archive_path = tempfile.mkdtemp(prefix='medical_xray_archive_test_')
+        self.addCleanup(shutil.rmtree, archive_path, ignore_errors=True)
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('odoo_medical.xray_archive_path', archive_path)
+        ICP.set_param('odoo_medical.xray_archive_days', 365)
+        self.env.registry.clear_cache()
+
+    def _attachment(self, line=None):
+        return self.env['ir.attachment'].create({
+            'name': 'study.dcm',
+            'raw': self.content,
+            'res_model': line and line._name,
+            'res_id': line and line.id,
+        })
+
+    def test_deduplication(self):
+        """Copies of an image are removed from a line, the other lines keep
+        their own attachment of the same file"""
+        first_line, second_line = self.orders.line_ids
+        original = self._attachment(first_line)
+        first_line.images = [(4, original.id)]
+        copy = self._attachment(first_line)
+        first_line.images = [(4, copy.id)]
+        self.assertEqual(first_line.images, original)
+        self.assertFalse(copy.exists())
+
+        other = self._attachment(second_line)
+        second_line.images = [(4, other.id)]
+        self.assertEqual(second_line.images, other)
+        self.assertEqual(other.store_fname, original.store_fname)
+        # Deleting the first order deletes its attachments, not the image of the other line
+        self.orders[0].unlink()
+        self.assertFalse(original.exists())
+        self.assertEqual(other.raw, self.content)
+
+    def test_archive_and_restore(self):
+        line = self.orders[0].line_ids
+        image = self._attachment()
+        line.images = [(4, image.id)]
+        self.orders.write({'state': 'done'})
+
+        self.env['medical.xray.archive']._cron_archive_images()
+        bundle = image.medical_archive_id
+        self.assertTrue(bundle)
+        self.assertEqual(bundle.file_count, 1)
+        self.assertTrue(os.path.exists(bundle.path))
+
+        # Cold images are restored when they are read
+        full_path = image._full_path(image.store_fname)
+        _remove_hot_copies([full_path])
+        self.assertFalse(os.path.exists(full_path))
+        image.invalidate_recordset(['raw'])
+        self.assertEqual(image.raw, self.content)
+        self.assertTrue(os.path.exists(full_path))
+
+    def test_archived_image_is_indexed(self):
+        """The DICOM header of an archived image is read from cold storage,
+        without restoring the image"""
+        first_line, second_line = self.orders.line_ids
+        image = self.env['ir.attachment'].create({'name': 'study.dcm', 'raw': _dicom_file(b'1.2.826.0.1.1.9')})
+        first_line.images = [(4, image.id)]
+        self.orders[0].state = 'done'
+        self.env['medical.xray.archive']._cron_archive_images()
+        self.assertTrue(image.medical_archive_id)
+        full_path = image._full_path(image.store_fname)
+        _remove_hot_copies([full_path])
+
+        second_line.images = [(4, image.id)]
+        self.assertEqual(second_line.dicom_ids.sop_instance_uid, '1.2.826.0.1.1.9')
+        self.assertFalse(os.path.exists(full_path))
+
+    def test_missing_files_are_skipped(self):
+        """Images missing from the filestore are flagged, no empty bundle is created"""
+        line = self.orders[0].line_ids
+        image = self.env['ir.attachment'].create({'name': 'missing.dcm', 'raw': b'missing x-ray %s' % self.env.cr.dbname.encode()})
+        line.images = [(4, image.id)]
+        self.orders.write({'state': 'done'})
+        _remove_hot_copies([image._full_path(image.store_fname)])
+
+        Archive = self.env['medical.xray.archive']
+        bundles = Archive.search([])
+        Archive._cron_archive_images()
+        self.assertEqual(Archive.search([]), bundles)
+        self.assertTrue(image.medical_archive_missing)
+        self.assertNotIn(image.store_fname, Archive._archivable_files(datetime(2030, 1, 1)))
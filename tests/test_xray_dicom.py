@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import io
+import struct
+from datetime import date
+
+from odoo.tests import TransactionCase
+
+from odoo.addons.odoo_medical.models.medical_xray_dicom import parse_dicom_header
+
+
+def _element(group, element, vr, value):
+    if len(value) % 2:
+        value += b' '
+    tag = struct.pack('<HH', group, element)
+    if vr in (b'OB', b'OW', b'SQ'):
+        return tag + vr + b'\0\0' + struct.pack('<I', len(value)) + value
+    return tag + vr + struct.pack('<H', len(value)) + value
+
+
+def _dicom_file(sop_instance_uid):
+    """Explicit VR little endian file whose pixel data is cut off"""
+    meta = _element(0x0002, 0x0010, b'UI', b'1.2.840.10008.1.2.1\0')
+    dataset = b''.join([
+        _element(0x0008, 0x0018, b'UI', sop_instance_uid),
+        _element(0x0008, 0x0020, b'DA', b'20240115'),
+        _element(0x0008, 0x0030, b'TM', b'101530'),
+        _element(0x0008, 0x0060, b'CS', b'DX'),
+        _element(0x0010, 0x0010, b'PN', b'PEREZ^JUAN'),
+        _element(0x0018, 0x0015, b'CS', b'CHEST'),
+        _element(0x0020, 0x000D, b'UI', b'1.2.826.0.1.1'),
+        _element(0x0028, 0x0010, b'US', struct.pack('<H', 2048)),
+        _element(0x0028, 0x0011, b'US', struct.pack('<H', 1536)),
+        # Pixel data announcing 1 GB
+        struct.pack('<HH', 0x7FE0, 0x0010) + b'OW\0\0' + struct.pack('<I', 1 << 30),
+    ])
+    return (b'\0' * 128 + b'DICM' + _element(0x0002, 0x0000, b'UL', struct.pack('<I', len(meta)))
+            + meta + dataset)
+
+
+class TestXrayDicom(TransactionCase):
+
+    def setUp(self):
+        super(TestXrayDicom, self).setUp()
+        patient = self.env['res.partner'].create({'name': 'DICOM Patient'})
+        area = self.env['medical.xray.area'].create({'name': 'DICOM Area'})
+        order = self.env['medical.xray.order'].create({
+            'patient_id': patient.id,
+            'line_ids': [(0, 0, {'area_id': area.id, 'projection_type': projection}) for projection in ('ap', 'lateral')],
+        })
+        self.line, self.other_line = order.line_ids
+
+    def _attachment(self, content):
+        return self.env['ir.attachment'].create({'name': 'study.dcm', 'raw': content, 'mimetype': 'application/dicom'})
+
+    def test_parse_header(self):
+        header = parse_dicom_header(io.BytesIO(_dicom_file(b'1.2.826.0.1.1.1')))
+        self.assertEqual(header['sop_instance_uid'], '1.2.826.0.1.1.1')
+        self.assertEqual(header['modality'], 'DX')
+        self.assertEqual(header['patient_name'], 'PEREZ JUAN')
+        self.assertEqual((header['rows'], header['columns']), (2048, 1536))
+        self.assertIsNone(parse_dicom_header(io.BytesIO(b'\x89PNG\r\n')))
+
+    def test_metadata_and_deduplication(self):
+        image = self._attachment(_dicom_file(b'1.2.826.0.1.1.1'))
+        self.line.images = [(4, image.id)]
+        dicom = self.line.dicom_ids
+        self.assertEqual(dicom.attachment_id, image)
+        self.assertEqual(dicom.study_date, date(2024, 1, 15))
+        self.assertEqual(dicom.body_part, 'CHEST')
+        self.assertEqual(
+            self.env['medical.xray.dicom'].search([('study_instance_uid', '=', '1.2.826.0.1.1')]), dicom)
+
+        # The same instance uploaded again to the line is detached
+        self.line.images = [(4, self._attachment(_dicom_file(b'1.2.826.0.1.1.1')).id)]
+        self.assertEqual(self.line.images, image)
+        self.assertEqual(len(self.line.dicom_ids), 1)
+
+        # On another line, it is flagged as a duplicate
+        self.other_line.images = [(4, self._attachment(_dicom_file(b'1.2.826.0.1.1.1')).id)]
+        self.assertEqual(self.other_line.dicom_ids.duplicate_of_id, dicom)
+
+    def test_other_images_are_ignored(self):
+        self.line.images = [(4, self._attachment(b'\x89PNG\r\n').id)]
+        self.assertFalse(self.line.dicom_ids)
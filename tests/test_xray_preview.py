@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import io
+
+from PIL import Image
+
+from odoo.tests import TransactionCase
+
+
+class TestXrayPreview(TransactionCase):
+
+    def setUp(self):
+        super(TestXrayPreview, self).setUp()
+        patient = self.env['res.partner'].create({'name': 'Preview Patient'})
+        order = self.env['medical.xray.order'].create({
+            'patient_id': patient.id,
+            'line_ids': [(0, 0, {
+                'area_id': self.env['medical.xray.area'].create({'name': 'Preview Area'}).id,
+                'projection_type': 'pa',
+            })],
+        })
+        self.line = order.line_ids
+        buffer = io.BytesIO()
+        Image.new('L', (3000, 2000), color=128).save(buffer, format='PNG')
+        self.image = self.env['ir.attachment'].create({
+            'name': 'chest.png',
+            'datas': base64.b64encode(buffer.getvalue()),
+        })
+
+    def test_preview_pyramid(self):
+        self.line.images = [(4, self.image.id)]
+        self.env['medical.xray.preview']._cron_generate_previews()
+
+        previews = {preview.level: preview for preview in self.line.preview_ids}
+        self.assertEqual(set(previews), {'thumbnail', 'screen', 'full'})
+        self.assertEqual((previews['thumbnail'].width, previews['thumbnail'].height), (256, 171))
+        self.assertEqual((previews['screen'].width, previews['screen'].height), (1920, 1280))
+        # The browsers show the PNG image as it is
+        self.assertEqual(previews['full'].attachment_id, self.image)
+        self.assertEqual(self.line.thumbnail_ids, previews['thumbnail'])
+        self.assertTrue(self.line.thumbnail)
+        self.assertFalse(self.env['medical.xray.preview']._pending_images())
+
+        # Removing the image removes its derived previews
+        thumbnail = previews['thumbnail'].attachment_id
+        self.line.images = [(3, self.image.id)]
+        self.assertFalse(self.line.preview_ids)
+        self.assertFalse(thumbnail.exists())
+        self.assertTrue(self.image.exists())
+
+    def test_deleting_the_image_removes_its_previews(self):
+        self.line.images = [(4, self.image.id)]
+        self.env['medical.xray.preview']._cron_generate_previews()
+        derived = self.line.preview_ids.attachment_id - self.image
+        self.assertTrue(derived)
+
+        self.image.unlink()
+        self.assertFalse(self.line.preview_ids.exists())
+        self.assertFalse(derived.exists())
+
+    def test_undecodable_image(self):
+        dicom = self.env['ir.attachment'].create({
+            'name': 'study.dcm',
+            'raw': b'\0' * 128 + b'DICM',
+            'mimetype': 'application/dicom',
+        })
+        self.line.images = [(4, dicom.id)]
+        self.env['medical.xray.preview']._cron_generate_previews()
+        self.assertEqual(len(self.line.preview_ids), 3)
+        self.assertFalse(self.line.preview_ids.attachment_id)
+        self.assertFalse(self.line.thumbnail_ids)
+
+    def test_broken_image_does_not_block_the_queue(self):
+        """A truncated image gets empty previews, the next images are processed"""
+        buffer = io.BytesIO()
+        Image.effect_noise((100, 100), 50).save(buffer, format='PNG')
+        broken = self.env['ir.attachment'].create({
+            'name': 'broken.png',
+            'raw': buffer.getvalue()[:len(buffer.getvalue()) // 2],
+        })
+        self.line.images = [(4, broken.id), (4, self.image.id)]
+        self.env['medical.xray.preview']._cron_generate_previews()
+
+        broken_previews = self.line.preview_ids.filtered(lambda preview: preview.source_id == broken)
+        self.assertEqual(len(broken_previews), 3)
+        self.assertFalse(broken_previews.attachment_id)
+        self.assertEqual(len(self.line.thumbnail_ids), 1)
+        self.assertFalse(self.env['medical.xray.preview']._count_pending_images())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase
+
+
+class TestXrayPrice(TransactionCase):
+
+    def setUp(self):
+        super(TestXrayPrice, self).setUp()
+        self.Price = self.env['medical.xray.price']
+        self.company = self.env.company
+        self.other_company = self.env['res.company'].create({'name': 'Other Clinic'})
+        self.patient = self.env['res.partner'].create({'name': 'Price Patient'})
+        self.area = self.env['medical.xray.area'].create({
+            'name': 'Price Area',
+            'price_ids': [
+                (0, 0, {'projection_type': 'ap', 'price': 40.0}),
+                (0, 0, {'projection_type': 'lateral', 'price': 45.0}),
+                (0, 0, {'projection_type': 'ap', 'price': 55.0, 'company_id': self.other_company.id}),
+            ],
+        })
+
+    def _order(self, company, projections=('ap', 'lateral')):
+        return self.env['medical.xray.order'].create({
+            'patient_id': self.patient.id,
+            'company_id': company.id,
+            'line_ids': [(0, 0, {'area_id': self.area.id, 'projection_type': projection}) for projection in projections],
+        })
+
+    def test_line_price_from_matrix(self):
+        order = self._order(self.company)
+        self.assertEqual(order.line_ids.mapped('price'), [40.0, 45.0])
+        self.assertEqual(order.total_price, 85.0)
+        # The company price overrides the shared one
+        other_order = self._order(self.other_company)
+        self.assertEqual(other_order.line_ids.mapped('price'), [55.0, 45.0])
+
+    def test_line_price_without_matrix(self):
+        order = self._order(self.company, projections=('oblique',))
+        self.assertEqual(order.line_ids.price, 0.0)
+        order.line_ids.price = 30.0
+        self.assertEqual(order.line_ids.price, 30.0)
+
+    def test_cached_lookup(self):
+        self.Price._get_price(self.area, 'ap', self.company)
+        with self.assertQueryCount(0):
+            for projection in ('ap', 'pa', 'lateral', 'oblique'):
+                self.Price._get_price(self.area, projection, self.company)
+        self.area.price_ids.filtered(lambda price: not price.company_id and price.projection_type == 'ap').price = 42.0
+        self.assertEqual(self.Price._get_price(self.area, 'ap', self.company), 42.0)
+
+    def test_reprice_draft_orders(self):
+        draft_order = self._order(self.company)
+        done_order = self._order(self.company)
+        done_order.state = 'done'
+        self.area.price_ids.filtered(lambda price: price.projection_type == 'lateral').price = 50.0
+
+        self.env.cr.precommit.run()
+        message_count = len(draft_order.message_ids)
+
+        lines = self.Price._reprice_draft_orders()
+        self.assertEqual(lines, draft_order.line_ids.filtered(lambda line: line.projection_type == 'lateral'))
+        self.assertEqual(draft_order.line_ids.mapped('price'), [40.0, 50.0])
+        self.assertEqual(draft_order.total_price, 90.0)
+        self.assertEqual(done_order.line_ids.mapped('price'), [40.0, 45.0])
+        # The new total is tracked in the chatter
+        self.env.cr.precommit.run()
+        draft_order.invalidate_recordset(['message_ids'])
+        self.assertEqual(len(draft_order.message_ids), message_count + 1)
+
+    def test_confirmed_orders_keep_their_prices(self):
+        order = self._order(self.company)
+        order.state = 'done'
+        order.company_id = self.other_company
+        self.assertEqual(order.line_ids.mapped('price'), [40.0, 45.0])
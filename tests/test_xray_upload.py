@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import io
+
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase
+
+
+class TestXrayUpload(TransactionCase):
+
+    def setUp(self):
+        super(TestXrayUpload, self).setUp()
+        patient = self.env['res.partner'].create({'name': 'X-ray Patient'})
+        order = self.env['medical.xray.order'].create({
+            'patient_id': patient.id,
+            'line_ids': [(0, 0, {
+                'area_id': self.env['medical.xray.area'].create({'name': 'Upload Area'}).id,
+                'projection_type': 'ap',
+            })],
+        })
+        self.line = order.line_ids
+        self.content = b'DICM' * 100000
+        self.checksum = hashlib.sha1(self.content).hexdigest()
+
+    def _start(self, checksum=None):
+        return self.env['medical.xray.upload']._start(
+            self.line, 'study.dcm', len(self.content), checksum or self.checksum, 'application/dicom')
+
+    def test_chunked_upload(self):
+        upload = self._start()
+        half = len(self.content) // 2
+        self.assertFalse(upload._write_chunk(0, io.BytesIO(self.content[:half])))
+        self.assertEqual(upload.received, half)
+        self.assertFalse(self.line.images)
+
+        # An interrupted upload resumes where it stopped
+        self.assertEqual(self._start(), upload)
+        with self.assertRaises(UserError):
+            upload._write_chunk(0, io.BytesIO(self.content[half:]))
+        self.assertTrue(upload._write_chunk(half, io.BytesIO(self.content[half:])))
+
+        self.assertEqual(upload.state, 'done')
+        self.assertEqual(self.line.images, upload.attachment_id)
+        self.assertEqual(upload.attachment_id.raw, self.content)
+        self.assertEqual(upload.attachment_id.checksum, self.checksum)
+        self.assertEqual(upload.attachment_id.file_size, len(self.content))
+
+    def test_checksum_mismatch(self):
+        upload = self._start(checksum=hashlib.sha1(b'other').hexdigest())
+        self.assertFalse(upload._write_chunk(0, io.BytesIO(self.content)))
+        self.assertEqual(upload.state, 'failed')
+        self.assertFalse(upload.attachment_id)
+        self.assertFalse(self.line.images)
+
+    def test_upload_of_a_file_already_stored(self):
+        """A file already in the filestore is reused by the new attachment"""
+        self.env['ir.attachment'].create({'name': 'stored.dcm', 'raw': self.content})
+        upload = self._start()
+        self.assertTrue(upload._write_chunk(0, io.BytesIO(self.content)))
+        self.assertEqual(self.line.images, upload.attachment_id)
+        self.assertEqual(upload.attachment_id.raw, self.content)